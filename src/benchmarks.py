@@ -0,0 +1,581 @@
+"""Microbenchmarks for data-path hot spots.
+
+Benchmarks run on synthetic IMS-shaped data so they do not depend on the
+raw dataset being present:
+
+    python -m src.benchmarks parser --files 20
+    python -m src.benchmarks storage-drift --files 8
+    python -m src.benchmarks stream-eval --files 12
+    python -m src.benchmarks if-scoring --files 12 --workers 1 2 4
+    python -m src.benchmarks if-inference --rows 200000 --batch-sizes 250 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from .config import CONFIG, configure_logging
+from .ims_reader import ENGINES, read_ims_file
+from .logging_utils import fmt_seconds, log_note, log_ok, log_section
+
+
+def write_synthetic_ims_files(folder: str, num_files: int, rows: int = 20480, columns: int = 8, seed: int = 0):
+    """Write tab-separated files shaped like IMS `1st_test` snapshots."""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for idx in range(num_files):
+        path = os.path.join(folder, f"2003.10.22.{idx // 60:02d}.{idx % 60:02d}.00")
+        values = rng.normal(scale=0.1, size=(rows, columns))
+        np.savetxt(path, values, fmt="%.3f", delimiter="\t")
+        paths.append(path)
+    return paths
+
+
+def _time_per_file(fn, paths, repeats: int) -> float:
+    """Return best-of-`repeats` mean seconds per file for `fn`."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        best = min(best, (time.perf_counter() - start) / len(paths))
+    return best
+
+
+def bench_parser(num_files: int = 10, rows: int = 20480, columns: int = 8, repeats: int = 3) -> dict:
+    """Compare np.loadtxt defaults against each `read_ims_file` engine."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_synthetic_ims_files(tmp, num_files, rows=rows, columns=columns)
+        mb_per_file = sum(os.path.getsize(p) for p in paths) / len(paths) / 1e6
+        candidates = {"np.loadtxt (baseline)": lambda p: np.loadtxt(p, dtype=np.float32)}
+        for engine in ENGINES:
+            candidates[f"read_ims_file[{engine}]"] = lambda p, e=engine: read_ims_file(p, engine=e)
+        results = {name: _time_per_file(fn, paths, repeats) for name, fn in candidates.items()}
+
+    baseline = results["np.loadtxt (baseline)"]
+    log_section(f"IMS parser benchmark ({num_files} files, {rows}x{columns}, {mb_per_file:.2f} MB each)")
+    for name, sec in results.items():
+        log_note(
+            f"{name:<28} {sec * 1e3:8.2f} ms/file | {mb_per_file / sec:7.1f} MB/s | "
+            f"speedup={baseline / sec:.2f}x"
+        )
+    return results
+
+
+@contextlib.contextmanager
+def _config_overrides(overrides: dict):
+    """Temporarily apply CONFIG overrides, restoring the originals on exit."""
+    saved = {key: CONFIG[key] for key in overrides if key in CONFIG}
+    CONFIG.update(overrides)
+    try:
+        yield
+    finally:
+        for key in overrides:
+            if key in saved:
+                CONFIG[key] = saved[key]
+            else:
+                CONFIG.pop(key, None)
+
+
+def _scratch_config(folder: str, num_files: int) -> dict:
+    """CONFIG overrides that keep preprocessing artifacts in `folder`."""
+    healthy = max(2, num_files // 2)
+    return {
+        "healthy_files": healthy,
+        "healthy_train_files": healthy - max(1, healthy // 4),
+        "healthy_val_files": max(1, healthy // 4),
+        "num_files_to_process": num_files,
+        "processed_folder": folder,
+        "memmap_file": os.path.join(folder, "all_sequences.dat"),
+        "healthy_train_memmap_file": os.path.join(folder, "healthy_train_sequences.dat"),
+        "healthy_val_memmap_file": os.path.join(folder, "healthy_val_sequences.dat"),
+        "split_metadata_file": os.path.join(folder, "split_metadata.json"),
+        "scaler_file": os.path.join(folder, "global_scaler.save"),
+        "raw_cache_folder": os.path.join(folder, "raw_cache"),
+        "create_all_memmap": True,
+        "max_all_memmap_bytes": 1 << 62,
+    }
+
+
+def _ae_reconstruction_errors(train: np.ndarray, datasets: dict, seed: int, epochs: int = 2):
+    """Briefly train a dense AE on float32 windows; return errors per dataset."""
+    try:
+        import torch
+
+        from .models import DenseAutoencoder
+    except ImportError as exc:
+        log_note(f"Skipping reconstruction-error drift ({exc})")
+        return None
+
+    torch.manual_seed(seed)
+    model = DenseAutoencoder(input_dim=train.shape[1], latent_dim=CONFIG["dense_latent_dim"])
+    optimizer = torch.optim.Adam(model.parameters(), lr=CONFIG["learning_rate"])
+    x_train = torch.from_numpy(np.ascontiguousarray(train, dtype=np.float32))
+    for _ in range(epochs):
+        for start in range(0, len(x_train), 256):
+            batch = x_train[start : start + 256]
+            loss = torch.mean((model(batch) - batch) ** 2)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+    model.eval()
+    errors = {}
+    with torch.no_grad():
+        for name, data in datasets.items():
+            x = torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32))
+            errors[name] = torch.mean((model(x) - x) ** 2, dim=1).numpy()
+    return errors
+
+
+def bench_storage_drift(
+    num_files: int = 8,
+    rows: int = 4096,
+    columns: int = 4,
+    dtypes=("float16", "int16"),
+    seed: int = 0,
+    output: str | None = None,
+) -> dict:
+    """Report storage size and model drift of quantized memmaps vs float32.
+
+    The same synthetic files are ingested once per storage dtype. An
+    IsolationForest and a briefly trained dense AE are fitted on the
+    float32 healthy_train windows, then each dtype's `all` windows are
+    scored and compared with the float32 scores.
+    """
+    from sklearn.ensemble import IsolationForest
+
+    from .dataset import load_memmap_dataset
+    from .preprocessing import run_ingest
+
+    datasets = {}
+    sizes = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, "raw")
+        os.makedirs(raw_dir)
+        files = write_synthetic_ims_files(raw_dir, num_files, rows=rows, columns=columns, seed=seed)
+        for dtype in ("float32",) + tuple(dtypes):
+            out_dir = os.path.join(tmp, dtype)
+            os.makedirs(out_dir)
+            with _config_overrides(dict(_scratch_config(out_dir, num_files), storage_dtype=dtype)):
+                run_ingest(files)
+                datasets[dtype] = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="all"))
+                if dtype == "float32":
+                    train = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                sizes[dtype] = os.path.getsize(CONFIG["memmap_file"])
+
+    forest = IsolationForest(n_estimators=CONFIG["n_estimators"], random_state=seed).fit(train)
+    if_scores = {name: forest.decision_function(data) for name, data in datasets.items()}
+    threshold = float(np.percentile(if_scores["float32"], CONFIG["score_threshold_percentile"]))
+    ae_errors = _ae_reconstruction_errors(train, datasets, seed)
+
+    report = {}
+    log_section(f"Storage drift vs float32 ({num_files} files, {datasets['float32'].shape[0]} windows)")
+    for dtype in dtypes:
+        entry = {
+            "bytes": int(sizes[dtype]),
+            "size_ratio": sizes[dtype] / sizes["float32"],
+            "window_max_abs_error": float(np.max(np.abs(datasets[dtype] - datasets["float32"]))),
+            "if_score_max_abs_diff": float(np.max(np.abs(if_scores[dtype] - if_scores["float32"]))),
+            "if_alert_flip_rate": float(
+                np.mean((if_scores[dtype] <= threshold) != (if_scores["float32"] <= threshold))
+            ),
+        }
+        if ae_errors is not None:
+            rel = np.abs(ae_errors[dtype] - ae_errors["float32"]) / np.maximum(ae_errors["float32"], 1e-12)
+            entry["ae_error_max_rel_diff"] = float(np.max(rel))
+            entry["ae_error_mean_rel_diff"] = float(np.mean(rel))
+        report[dtype] = entry
+        log_note(
+            f"{dtype:<8} size={entry['size_ratio']:.2f}x | max|dx|={entry['window_max_abs_error']:.2e} | "
+            f"IF max|ds|={entry['if_score_max_abs_diff']:.2e} flips={entry['if_alert_flip_rate']:.4%}"
+            + (
+                f" | AE rel err diff mean={entry['ae_error_mean_rel_diff']:.2e} max={entry['ae_error_max_rel_diff']:.2e}"
+                if "ae_error_max_rel_diff" in entry
+                else ""
+            )
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        log_note(f"Drift report saved to {output}")
+    return report
+
+
+def _timed_peak(fn):
+    """Return `(seconds, peak traced bytes, result)` of calling `fn`."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def bench_stream_eval(num_files: int = 12, rows: int = 20480, columns: int = 8, seed: int = 0) -> dict:
+    """Compare the legacy two-pass streaming IF evaluation with single pass.
+
+    The streaming fallback is what `machine_health_curve` runs when the
+    `all` memmap is disabled. The legacy flow scored every file in pass
+    one and again in pass two; the baseline reproduces that by running
+    `stream_file_scores` twice. Both run without prefetch; a third run
+    adds the configured background prefetch (`eval_prefetch_*`).
+    """
+    import joblib
+    from sklearn.ensemble import IsolationForest
+
+    from .dataset import load_memmap_dataset, load_split_metadata
+    from .evaluate import stream_file_scores
+    from .preprocessing import run_ingest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, "raw")
+        os.makedirs(raw_dir)
+        files = write_synthetic_ims_files(raw_dir, num_files, rows=rows, columns=columns, seed=seed)
+        with _config_overrides(dict(_scratch_config(tmp, num_files), create_all_memmap=False)):
+            run_ingest(files)
+            train = load_memmap_dataset(flatten_for_tree=True, split="healthy_train")
+            sample = np.random.default_rng(seed).choice(len(train), min(len(train), CONFIG["max_train_samples"]), replace=False)
+            forest = IsolationForest(n_estimators=CONFIG["n_estimators"], random_state=seed).fit(train[np.sort(sample)])
+            scaler = joblib.load(CONFIG["scaler_file"])
+            records = load_split_metadata()["file_records"]
+
+            def single_pass():
+                return sum(len(scores) for _, _, scores in stream_file_scores(forest, scaler, records))
+
+            def legacy_two_pass():
+                return single_pass() + single_pass()
+
+            # Parse raw text on every load, as on a host without the raw cache.
+            results = {}
+            with _config_overrides({"use_raw_cache": False, "eval_prefetch_depth": 0}):
+                results["legacy_two_pass"] = _timed_peak(legacy_two_pass)
+                results["single_pass"] = _timed_peak(single_pass)
+            with _config_overrides({"use_raw_cache": False}):
+                results["single_pass+prefetch"] = _timed_peak(single_pass)
+
+    log_section(f"Streaming IF evaluation ({num_files} files, {rows}x{columns})")
+    baseline = results["legacy_two_pass"][0]
+    for name, (seconds, peak, windows) in results.items():
+        log_note(
+            f"{name:<22} {seconds:7.2f} s | windows scored={windows} | peak traced={peak / 1e6:7.1f} MB | "
+            f"speedup={baseline / seconds:.2f}x"
+        )
+    return {name: {"seconds": sec, "peak_bytes": peak, "windows_scored": n} for name, (sec, peak, n) in results.items()}
+
+
+def bench_if_scoring(num_files: int = 12, rows: int = 20480, columns: int = 8, workers=(1, 2, 4), seed: int = 0) -> dict:
+    """Compare serial batched IF scoring of the `all` memmap with the process pool."""
+    import joblib
+    from sklearn.ensemble import IsolationForest
+
+    from .dataset import load_memmap_dataset
+    from .evaluate import _decision_scores_batched
+    from .parallel_scoring import score_split_parallel
+    from .preprocessing import run_ingest
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, "raw")
+        os.makedirs(raw_dir)
+        files = write_synthetic_ims_files(raw_dir, num_files, rows=rows, columns=columns, seed=seed)
+        with _config_overrides(_scratch_config(tmp, num_files)):
+            run_ingest(files)
+            train = load_memmap_dataset(flatten_for_tree=True, split="healthy_train")
+            sample = np.random.default_rng(seed).choice(len(train), min(len(train), CONFIG["max_train_samples"]), replace=False)
+            model = IsolationForest(n_estimators=CONFIG["n_estimators"], random_state=seed).fit(train[np.sort(sample)])
+            model_path = os.path.join(tmp, "isolation_forest.model")
+            joblib.dump(model, model_path)
+            X_all = load_memmap_dataset(flatten_for_tree=True, split="all")
+
+            start = time.perf_counter()
+            reference = _decision_scores_batched(model, X_all)
+            results["serial"] = time.perf_counter() - start
+            for count in workers:
+                start = time.perf_counter()
+                scores = score_split_parallel(model_path, split="all", workers=count)
+                results[f"workers={count}"] = time.perf_counter() - start
+                if not np.array_equal(np.asarray(scores), reference):
+                    raise AssertionError(f"Parallel scores with {count} workers differ from serial")
+            num_rows = len(X_all)
+
+    log_section(f"IF scoring of all memmap ({num_rows} windows, {os.cpu_count()} CPUs)")
+    for name, seconds in results.items():
+        log_note(
+            f"{name:<12} {seconds:7.2f} s | {num_rows / seconds:10.0f} windows/s | "
+            f"speedup={results['serial'] / seconds:.2f}x"
+        )
+    return results
+
+
+def bench_if_inference(
+    rows: int = 200_000,
+    features: int | None = None,
+    batch_sizes=(250, 200_000),
+    max_features: float = 1.0,
+    seed: int = 0,
+) -> dict:
+    """Compare sklearn and compiled-forest IF inference at several call sizes.
+
+    Small batches mirror per-file streaming evaluation; large ones mirror
+    scoring the `all` memmap. Scores are checked for exact equality.
+    """
+    from sklearn.ensemble import IsolationForest
+
+    from .compiled_forest import compile_forest
+
+    features = int(features or CONFIG["sequence_length"])
+    rng = np.random.default_rng(seed)
+    train = rng.normal(size=(min(rows, CONFIG["max_train_samples"]), features)).astype(np.float32)
+    data = rng.normal(scale=1.5, size=(rows, features)).astype(np.float32)
+    model = IsolationForest(
+        n_estimators=CONFIG["n_estimators"], max_features=max_features, random_state=seed
+    ).fit(train)
+    start = time.perf_counter()
+    compiled = compile_forest(model)
+    compile_seconds = time.perf_counter() - start
+
+    results = {}
+    for batch_size in batch_sizes:
+        timings = {}
+        outputs = {}
+        for name, scorer in (("sklearn", model), ("compiled", compiled)):
+            start = time.perf_counter()
+            outputs[name] = np.concatenate(
+                [scorer.decision_function(data[lo : lo + batch_size]) for lo in range(0, rows, batch_size)]
+            )
+            timings[name] = time.perf_counter() - start
+        if not np.array_equal(outputs["sklearn"], outputs["compiled"]):
+            raise AssertionError(f"Compiled scores differ from sklearn at batch size {batch_size}")
+        results[batch_size] = timings
+
+    log_section(
+        f"IF inference ({rows} rows x {features} features, {CONFIG['n_estimators']} trees, "
+        f"compile={fmt_seconds(compile_seconds)})"
+    )
+    for batch_size, timings in results.items():
+        log_note(
+            f"batch={batch_size:<8} sklearn={timings['sklearn']:7.2f} s | compiled={timings['compiled']:7.2f} s | "
+            f"speedup={timings['sklearn'] / timings['compiled']:.2f}x"
+        )
+    return {"compile_seconds": compile_seconds, "batches": results}
+
+
+def bench_loader_throughput(
+    num_files: int = 12, rows: int = 20480, columns: int = 8, flatten: bool = True, epochs: int = 2, seed: int = 0
+) -> dict:
+    """Compare AE train-loader throughput in samples/sec.
+
+    `item` is the per-window `MemmapTorchDataset` with the default collate;
+    the batched loaders read whole batches with `MemmapBatchDataset` in
+    each `torch_batch_order`, from the memmap or from the in-RAM cache
+    (`torch_data_cache`). Only loading is timed (no model step); the
+    one-off loader setup, which includes filling the RAM cache, is
+    reported separately.
+    """
+    import torch.utils.data  # noqa: F401  (keep the import out of the first setup time)
+
+    from .dataset import make_torch_dataloaders, resolve_num_workers
+    from .preprocessing import run_ingest
+
+    variants = {
+        "item": {"torch_loader": "item"},
+        "memmap/sorted": {"torch_loader": "batched", "torch_batch_order": "sorted", "torch_data_cache": "memmap"},
+        "memmap/blocks": {"torch_loader": "batched", "torch_batch_order": "blocks", "torch_data_cache": "memmap"},
+        "ram/sorted": {"torch_loader": "batched", "torch_batch_order": "sorted", "torch_data_cache": "ram"},
+        "ram/blocks": {"torch_loader": "batched", "torch_batch_order": "blocks", "torch_data_cache": "ram"},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, "raw")
+        os.makedirs(raw_dir)
+        files = write_synthetic_ims_files(raw_dir, num_files, rows=rows, columns=columns, seed=seed)
+        with _config_overrides(_scratch_config(tmp, num_files)):
+            run_ingest(files)
+            for name, overrides in variants.items():
+                with _config_overrides(overrides):
+                    start = time.perf_counter()
+                    train_loader, _ = make_torch_dataloaders(flatten=flatten)
+                    setup = time.perf_counter() - start
+                    samples = 0
+                    start = time.perf_counter()
+                    for _ in range(epochs):
+                        for batch in train_loader:
+                            samples += batch.shape[0]
+                    results[name] = {"samples_per_sec": samples / (time.perf_counter() - start), "setup_sec": setup}
+
+    log_section(
+        f"AE train loader throughput ({samples // epochs} windows/epoch, batch={CONFIG['torch_batch_size']}, "
+        f"workers={resolve_num_workers()}, {'flattened' if flatten else 'sequence'} windows)"
+    )
+    baseline = results["item"]["samples_per_sec"]
+    for name, row in results.items():
+        rate = row["samples_per_sec"]
+        log_note(
+            f"{name:<15} {rate:12.0f} samples/s | speedup={rate / baseline:6.2f}x | setup={fmt_seconds(row['setup_sec'])}"
+        )
+    return results
+
+
+def bench_loader_workers(
+    num_files: int = 12,
+    rows: int = 20480,
+    columns: int = 8,
+    workers=(0, 1, 2, 4),
+    loaders=("item", "batched"),
+    epochs: int = 2,
+    seed: int = 0,
+) -> dict:
+    """Training-loop throughput in samples/sec as DataLoader workers grow.
+
+    Each configuration runs `epochs` epochs of a stand-in dense
+    autoencoder step (forward, MSE, backward, Adam) over the flattened
+    healthy_train loader, including worker start-up. Batched loaders
+    stream from the memmap (`torch_data_cache="memmap"`) so workers have
+    reads to overlap.
+    """
+    import torch
+    from torch import nn
+
+    from .dataset import load_memmap_dataset, make_torch_dataloaders
+    from .preprocessing import run_ingest
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, "raw")
+        os.makedirs(raw_dir)
+        files = write_synthetic_ims_files(raw_dir, num_files, rows=rows, columns=columns, seed=seed)
+        with _config_overrides(_scratch_config(tmp, num_files)):
+            run_ingest(files)
+            for loader in loaders:
+                for count in workers:
+                    overrides = {"torch_loader": loader, "torch_data_cache": "memmap", "num_workers": count}
+                    with _config_overrides(overrides):
+                        torch.manual_seed(seed)
+                        train_loader, _ = make_torch_dataloaders(flatten=True)
+                        features = load_memmap_dataset(flatten_for_tree=True, split="healthy_train").shape[1]
+                        model = nn.Sequential(
+                            nn.Linear(features, 64),
+                            nn.ReLU(),
+                            nn.Linear(64, 32),
+                            nn.ReLU(),
+                            nn.Linear(32, 64),
+                            nn.ReLU(),
+                            nn.Linear(64, features),
+                        )
+                        optimizer = torch.optim.Adam(model.parameters(), lr=CONFIG["learning_rate"])
+                        samples = 0
+                        start = time.perf_counter()
+                        for _ in range(epochs):
+                            for batch in train_loader:
+                                optimizer.zero_grad()
+                                loss = nn.functional.mse_loss(model(batch), batch)
+                                loss.backward()
+                                optimizer.step()
+                                samples += batch.shape[0]
+                        results[(loader, count)] = samples / (time.perf_counter() - start)
+                        del train_loader
+
+    log_section(f"AE training loop vs DataLoader workers ({os.cpu_count()} CPUs, {epochs} epochs)")
+    for (loader, count), rate in results.items():
+        baseline = results.get((loader, min(workers)), rate)
+        log_note(f"{loader:<8} workers={count:<3} {rate:10.0f} samples/s | vs {min(workers)} workers={rate / baseline:.2f}x")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run data-path microbenchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_parser = sub.add_parser("parser", help="IMS text parsing engines vs np.loadtxt")
+    p_parser.add_argument("--files", type=int, default=10)
+    p_parser.add_argument("--rows", type=int, default=20480)
+    p_parser.add_argument("--columns", type=int, default=8)
+    p_parser.add_argument("--repeats", type=int, default=3)
+
+    p_drift = sub.add_parser("storage-drift", help="float16/int16 memmap storage drift vs float32")
+    p_drift.add_argument("--files", type=int, default=8)
+    p_drift.add_argument("--rows", type=int, default=4096)
+    p_drift.add_argument("--columns", type=int, default=4)
+    p_drift.add_argument("--output", type=str, default=None, help="Optional JSON report path")
+
+    p_stream = sub.add_parser("stream-eval", help="single-pass vs legacy two-pass streaming IF evaluation")
+    p_stream.add_argument("--files", type=int, default=12)
+    p_stream.add_argument("--rows", type=int, default=20480)
+    p_stream.add_argument("--columns", type=int, default=8)
+
+    p_score = sub.add_parser("if-scoring", help="serial vs process-parallel IF scoring of the all memmap")
+    p_score.add_argument("--files", type=int, default=12)
+    p_score.add_argument("--rows", type=int, default=20480)
+    p_score.add_argument("--columns", type=int, default=8)
+    p_score.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+
+    p_infer = sub.add_parser("if-inference", help="sklearn vs compiled-forest IF inference")
+    p_infer.add_argument("--rows", type=int, default=200_000)
+    p_infer.add_argument("--features", type=int, default=None, help="Defaults to sequence_length")
+    p_infer.add_argument("--batch-sizes", type=int, nargs="+", default=[250, 200_000])
+    p_infer.add_argument("--max-features", type=float, default=1.0)
+
+    p_loader = sub.add_parser("loader-throughput", help="per-item vs batched AE train loaders (samples/sec)")
+    p_loader.add_argument("--files", type=int, default=12)
+    p_loader.add_argument("--rows", type=int, default=20480)
+    p_loader.add_argument("--columns", type=int, default=8)
+    p_loader.add_argument("--epochs", type=int, default=2)
+    p_loader.add_argument("--sequence", action="store_true", help="Load (seq, channels) windows as the LSTM AE does")
+
+    p_workers = sub.add_parser("loader-workers", help="AE training-loop throughput from 0 to N DataLoader workers")
+    p_workers.add_argument("--files", type=int, default=12)
+    p_workers.add_argument("--rows", type=int, default=20480)
+    p_workers.add_argument("--columns", type=int, default=8)
+    p_workers.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    p_workers.add_argument("--loaders", nargs="+", choices=["item", "batched"], default=["item", "batched"])
+    p_workers.add_argument("--epochs", type=int, default=2)
+
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.bench == "parser":
+        bench_parser(num_files=args.files, rows=args.rows, columns=args.columns, repeats=args.repeats)
+    elif args.bench == "storage-drift":
+        bench_storage_drift(num_files=args.files, rows=args.rows, columns=args.columns, output=args.output)
+    elif args.bench == "stream-eval":
+        bench_stream_eval(num_files=args.files, rows=args.rows, columns=args.columns)
+    elif args.bench == "if-scoring":
+        bench_if_scoring(num_files=args.files, rows=args.rows, columns=args.columns, workers=tuple(args.workers))
+    elif args.bench == "if-inference":
+        bench_if_inference(
+            rows=args.rows,
+            features=args.features,
+            batch_sizes=tuple(args.batch_sizes),
+            max_features=args.max_features,
+        )
+    elif args.bench == "loader-throughput":
+        bench_loader_throughput(
+            num_files=args.files, rows=args.rows, columns=args.columns, flatten=not args.sequence, epochs=args.epochs
+        )
+    elif args.bench == "loader-workers":
+        bench_loader_workers(
+            num_files=args.files,
+            rows=args.rows,
+            columns=args.columns,
+            workers=tuple(args.workers),
+            loaders=tuple(args.loaders),
+            epochs=args.epochs,
+        )
+    log_ok("Benchmark complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from .config import CONFIG, configure_logging
+from .score_store import stored_file_anomaly_rates
 
 
 def _safe_read_json(path: str):
@@ -33,12 +34,30 @@ def _normalize(values):
     return (arr - min_v) / (max_v - min_v)
 
 
-def run() -> str:
-    """Build normalized anomaly-rate comparison figure across available models."""
+def _store_metrics(model_name: str):
+    """Per-file anomaly rates from the score store, shaped like *_file_metrics.json."""
+    try:
+        rates = stored_file_anomaly_rates(model_name)
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+    return [{"anomaly_rate": float(rate)} for rate in rates]
+
+
+def run(source: str = "metrics") -> str:
+    """Build normalized anomaly-rate comparison figure across available models.
+
+    `source="store"` reads per-window scores from the score store instead
+    of the per-file metrics JSON written by each evaluator.
+    """
     diagnostics_dir = os.path.join(CONFIG["processed_folder"], "diagnostics")
-    if_metrics = _safe_read_json(os.path.join(diagnostics_dir, "isolation_forest_file_metrics.json"))
-    dense_metrics = _safe_read_json(os.path.join(diagnostics_dir, "dense_autoencoder_file_metrics.json"))
-    lstm_metrics = _safe_read_json(os.path.join(diagnostics_dir, "lstm_autoencoder_file_metrics.json"))
+    if source == "store":
+        if_metrics = _store_metrics("isolation_forest")
+        dense_metrics = _store_metrics("dense_autoencoder")
+        lstm_metrics = _store_metrics("lstm_autoencoder")
+    else:
+        if_metrics = _safe_read_json(os.path.join(diagnostics_dir, "isolation_forest_file_metrics.json"))
+        dense_metrics = _safe_read_json(os.path.join(diagnostics_dir, "dense_autoencoder_file_metrics.json"))
+        lstm_metrics = _safe_read_json(os.path.join(diagnostics_dir, "lstm_autoencoder_file_metrics.json"))
 
     fig, ax = plt.subplots(figsize=(12, 5))
     plotted = False
@@ -72,10 +91,11 @@ def run() -> str:
 
 def main():
     parser = argparse.ArgumentParser(description="Compare model anomaly trends")
+    parser.add_argument("--source", choices=["metrics", "store"], default="metrics")
     parser.add_argument("--verbose", action="store_true")
     args = parser.parse_args()
     configure_logging(logging.DEBUG if args.verbose else logging.INFO)
-    out_path = run()
+    out_path = run(source=args.source)
     logging.info("Saved model comparison figure to %s", out_path)
 
 
@@ -0,0 +1,203 @@
+"""Vectorized IsolationForest inference compiled from the fitted trees.
+
+`compile_forest` flattens every tree of a fitted `IsolationForest` into
+shared NumPy arrays:
+
+- split feature (already mapped through `estimators_features_`),
+- threshold,
+- a `(left, right)` child table (leaves point to themselves),
+- per-node path length: depth plus the `c(n)` correction, minus one.
+
+`CompiledForest.decision_function` then advances every (tree, sample)
+pair one level per step for the whole batch. That is at most `max_depth`
+vectorized steps per batch instead of one `tree.apply` call per tree.
+Per-tree path lengths are accumulated in tree order, exactly as sklearn
+does, so scores are bit-identical to `IsolationForest.decision_function`.
+
+Compiled arrays are cached next to the model as `<model>.compiled.npz`
+and rebuilt whenever the model file changes.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+import joblib
+import numpy as np
+
+from .config import CONFIG
+
+ENGINES = ("compiled", "sklearn")
+
+
+def _average_path_length(n_samples) -> np.ndarray:
+    """Average path length `c(n)` of an unsuccessful BST search (sklearn's formula)."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    out = np.zeros_like(n_samples)
+    out[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    n = n_samples[mask]
+    out[mask] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return out
+
+
+class CompiledForest:
+    """Flat-array IsolationForest scorer exposing `decision_function`."""
+
+    FIELDS = ("feature", "threshold", "children", "leaf_value", "roots")
+
+    def __init__(self, feature, threshold, children, leaf_value, roots, max_depth, n_features, denominator, offset):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        # children[2 * node] is the left child, children[2 * node + 1] the right.
+        self.children = np.asarray(children, dtype=np.int32)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.denominator = float(denominator)
+        self.offset_ = float(offset)
+
+    @property
+    def n_estimators(self) -> int:
+        return int(self.roots.shape[0])
+
+    def save(self, path: str, source_stat=None) -> None:
+        meta = np.array([self.max_depth, self.n_features_in_, self.denominator, self.offset_], dtype=np.float64)
+        # Kept apart from `meta`: a nanosecond mtime does not fit a float64 exactly.
+        stamp = [source_stat.st_size, source_stat.st_mtime_ns] if source_stat is not None else [-1, -1]
+        source = np.array(stamp, dtype=np.int64)
+        # Write through a handle (np.savez would append ".npz") and swap in
+        # atomically so concurrent scoring workers never see a partial file.
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as fh:
+            np.savez(fh, meta=meta, source=source, **{name: getattr(self, name) for name in self.FIELDS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple["CompiledForest", tuple[int, int]]:
+        """Return the compiled forest and the `(size, mtime_ns)` it was built from."""
+        with np.load(path) as data:
+            meta = data["meta"]
+            forest = cls(
+                *(data[name] for name in cls.FIELDS),
+                max_depth=int(meta[0]),
+                n_features=int(meta[1]),
+                denominator=float(meta[2]),
+                offset=float(meta[3]),
+            )
+            source = tuple(int(value) for value in data["source"]) if "source" in data else (-1, -1)
+        return forest, source
+
+    def _path_lengths(self, X: np.ndarray) -> np.ndarray:
+        """Return per-sample summed path lengths over all trees."""
+        n_samples, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.int64) * n_features)[None, :]
+        nodes = np.repeat(self.roots[:, None], n_samples, axis=1)
+        # One vectorized step per level for all (tree, sample) pairs; nodes
+        # that already reached a leaf loop back to themselves.
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self.feature.take(nodes))
+            nodes = self.children.take(2 * nodes + ~(x <= self.threshold.take(nodes)))
+        values = self.leaf_value.take(nodes)
+        # Sum tree by tree (not pairwise) to match sklearn's accumulation order.
+        depths = np.zeros(n_samples, dtype=np.float64)
+        for tree_values in values:
+            depths += tree_values
+        return depths
+
+    def score_samples(self, X, batch_size: int | None = None) -> np.ndarray:
+        if not hasattr(X, "shape"):
+            X = np.asarray(X)
+        if len(X.shape) != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected X with {self.n_features_in_} features, got shape {X.shape}")
+        batch_size = int(batch_size or CONFIG.get("if_compiled_batch_size", 2048))
+        scores = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], batch_size):
+            # Convert per batch so memmapped inputs are never copied whole;
+            # sklearn likewise compares float32 inputs to float64 thresholds.
+            batch = np.ascontiguousarray(X[start : start + batch_size], dtype=np.float32)
+            depths = self._path_lengths(batch)
+            if self.denominator != 0:
+                scores[start : start + batch_size] = -(2.0 ** (-(depths / self.denominator)))
+            else:
+                # Single-sample forests: sklearn scores every row as 2 ** -1.
+                scores[start : start + batch_size] = -0.5
+        return scores
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.score_samples(X) - self.offset_
+
+
+def compile_forest(model) -> CompiledForest:
+    """Flatten a fitted sklearn `IsolationForest` into a `CompiledForest`."""
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    subsample = model._max_features != model.n_features_in_
+    for tree_idx, (estimator, tree_features) in enumerate(zip(model.estimators_, model.estimators_features_)):
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(n_nodes)
+        feature = np.where(is_leaf, 0, tree.feature)
+        if subsample:
+            feature = np.asarray(tree_features)[feature]
+        features.append(feature)
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+        children.append(np.stack([left, right], axis=1).ravel())
+        values.append(
+            model._decision_path_lengths[tree_idx] + model._average_path_length_per_tree[tree_idx] - 1.0
+        )
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, int(tree.max_depth))
+    denominator = len(model.estimators_) * _average_path_length([model._max_samples])[0]
+    return CompiledForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(children),
+        np.concatenate(values),
+        np.asarray(roots),
+        max_depth=max_depth,
+        n_features=model.n_features_in_,
+        denominator=denominator,
+        offset=model.offset_,
+    )
+
+
+def compiled_path_for(model_path: str) -> str:
+    return f"{model_path}.compiled.npz"
+
+
+def load_compiled_forest(model_path: str) -> CompiledForest:
+    """Load the cached compiled forest for `model_path`, rebuilding if stale."""
+    st = os.stat(model_path)
+    cache_path = compiled_path_for(model_path)
+    if os.path.exists(cache_path):
+        try:
+            forest, source = CompiledForest.load(cache_path)
+            if source == (st.st_size, st.st_mtime_ns):
+                return forest
+        except Exception:
+            logging.warning("Ignoring unreadable compiled forest %s", cache_path)
+    forest = compile_forest(joblib.load(model_path))
+    try:
+        forest.save(cache_path, source_stat=st)
+    except OSError as exc:
+        logging.warning("Unable to cache compiled forest: %s", exc)
+    return forest
+
+
+def load_if_scorer(model_path: str, engine: str | None = None):
+    """Return an object with `decision_function` for the saved IF model."""
+    engine = engine or CONFIG.get("if_inference_engine", "compiled")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown IF inference engine: {engine}")
+    if engine == "compiled":
+        return load_compiled_forest(model_path)
+    return joblib.load(model_path)
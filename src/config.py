@@ -23,13 +23,71 @@ CONFIG = {
     # Data paths
     "data_folder": os.path.join(BASE_DIR, "data/raw/IMS/1st_test"),
     "processed_folder": os.path.join(BASE_DIR, "data/processed"),
+    "raw_cache_folder": os.path.join(BASE_DIR, "data/processed/raw_cache"),
     "memmap_file": os.path.join(BASE_DIR, "data/processed/all_sequences.dat"),
     "healthy_train_memmap_file": os.path.join(BASE_DIR, "data/processed/healthy_train_sequences.dat"),
     "healthy_val_memmap_file": os.path.join(BASE_DIR, "data/processed/healthy_val_sequences.dat"),
     "split_metadata_file": os.path.join(BASE_DIR, "data/processed/split_metadata.json"),
     "scaler_file": os.path.join(BASE_DIR, "data/processed/global_scaler.save"),
+    # "dense" stores every (seq_len, 1) window; "virtual" stores each scaled
+    # signal once plus an offset index (~stride/seq_len of the size).
+    "dataset_layout": "dense",
+    # "flatten" interleaves all file columns into one series (legacy);
+    # "per_channel" keeps (samples, columns) and writes (n, seq_len, C).
+    "channel_mode": "flatten",
+    # Memmap storage: "float32", "float16" or "int16" (scale recorded in
+    # .meta.json; z-scores clipped to +/- storage_int16_clip_sigma).
+    "storage_dtype": "float32",
+    "storage_int16_clip_sigma": 8.0,
+    # > 0 splits each memmap into shard files of about this many bytes
+    # (see sharded_memmap.py); the "all" size cap then no longer applies.
+    "memmap_shard_bytes": 0,
+    # Streaming evaluation loads/scales up to `depth` files ahead of the
+    # model ("thread" or "process" workers; depth 0 disables prefetch).
+    "eval_prefetch_depth": 2,
+    "eval_prefetch_workers": 1,
+    "eval_prefetch_executor": "thread",
+    # IF scoring of the "all" memmap: > 1 shards rows across processes.
+    "if_score_workers": 1,
+    "if_score_batch_size": 200_000,
+    # "compiled" scores with flat arrays exported from the fitted trees
+    # (compiled_forest.py, identical scores); "sklearn" uses the model as is.
+    "if_inference_engine": "compiled",
+    "if_compiled_batch_size": 2048,
+    # Per-window scores persist in <processed>/score_store (one column per
+    # model checkpoint; see score_store.py) so re-runs only score missing
+    # windows. The legacy monolithic *_scores.npy / *_all_errors.npy
+    # diagnostics are still exported unless disabled.
+    "score_store_keep_columns": 3,
+    "score_store_export_npy": True,
+    # pipeline.run restores IF/AE diagnostics from <processed>/eval_cache
+    # when checkpoint, scaler, memmap metadata and eval config are unchanged
+    # (see eval_cache.py); least-recently-used entries go past the budget.
+    "eval_cache_enabled": True,
+    "eval_cache_max_bytes": 2_000_000_000,
+    # pipeline.run schedules steps as a DAG (see pipeline_dag.py); this many
+    # independent steps may run at once.
+    "pipeline_max_parallel_steps": 2,
     "create_all_memmap": True,
     "max_all_memmap_bytes": 3_500_000_000,
+    # "single_pass" parses each raw file once; "two_pass" is the legacy
+    # fit-scaler-then-count-then-write flow kept for comparison.
+    "ingest_mode": "single_pass",
+    "preprocess_workers": 1,
+    # "moments" merges per-file (count, mean, M2) and parallelizes;
+    # "partial_fit" is the legacy serial StandardScaler.partial_fit loop.
+    "scaler_fit_engine": "moments",
+    # Raw text parser used by src.ims_reader ("loadtxt" or "fromstring").
+    "ims_parser_engine": "loadtxt",
+    # Parsed raw files are cached as memory-mappable .npy (see raw_cache.py).
+    "use_raw_cache": True,
+    "raw_cache_verify_hash": False,
+    # File discovery: "manifest" caches per-file size/mtime/rows (see
+    # discovery.py); "scan" re-reads every file line by line.
+    "discovery_engine": "manifest",
+    "discovery_manifest_file": os.path.join(BASE_DIR, "data/processed/ims_manifest.json"),
+    "discovery_workers": 8,
+    "discovery_probe_bytes": 65536,
     
     # Isolation Forest baseline parameters
     "max_train_samples": 50000,
@@ -41,11 +99,44 @@ CONFIG = {
 
     # Autoencoder training parameters
     "torch_batch_size": 512,
-    "num_workers": 0,
+    # DataLoader workers: an int, or "auto" for one per spare CPU (usable
+    # CPUs - 1, capped at torch_max_auto_workers). Workers map the memmaps
+    # themselves (dataset.py worker_init_fn).
+    "num_workers": "auto",
+    "torch_max_auto_workers": 4,
+    "persistent_workers": True,
+    "prefetch_factor": 2,
+    "pin_memory": "auto",  # "auto" pins batches when CUDA is available
+    # "batched" reads whole batches with one gather per batch (see
+    # dataset.MemmapBatchDataset); "item" reads one window per __getitem__.
+    "torch_loader": "batched",
+    # Batched train order: "sorted" (shuffled batches, sorted for the
+    # gather) or "blocks" (contiguous windows, blocks in shuffled order).
+    "torch_batch_order": "sorted",
+    # Batched loaders copy a split into one in-RAM tensor: "auto" when it
+    # fits in torch_ram_cache_max_fraction of available memory, "ram"
+    # always, "memmap" never. With num_workers > 0 the tensor is placed in
+    # shared memory so workers map it instead of copying it.
+    "torch_data_cache": "auto",
+    "torch_ram_cache_max_fraction": 0.5,
+    "torch_ram_cache_shared": True,
+    "torch_ram_cache_chunk_rows": 65536,
     "learning_rate": 1e-3,
     "weight_decay": 0.0,
     "epochs": 20,
     "early_stopping_patience": 5,
+    # Shared AE training engine (trainer.py). bf16 autocast works on CPU
+    # and CUDA; torch.compile falls back to eager mode if it fails. Thread
+    # counts of 0 keep torch's defaults.
+    "torch_amp_bf16": False,
+    "torch_compile": False,
+    "grad_accumulation_steps": 1,
+    "torch_num_threads": 0,
+    "torch_interop_threads": 0,
+    # Full resumable checkpoints (<model file>.resume.pt) are written after
+    # every epoch and every this many train batches, at the next optimizer
+    # step when gradients are accumulated (0: epochs only).
+    "train_checkpoint_every_batches": 1000,
     "dense_latent_dim": 32,
     "lstm_hidden_size": 64,
     "lstm_num_layers": 1,
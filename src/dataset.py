@@ -19,7 +19,14 @@ from typing import Optional
 import numpy as np
 
 from .config import CONFIG
+from .logging_utils import log_note
+from .quantization import DequantizedArray, params_from_meta
+from .sharded_memmap import ShardedMemmap, is_sharded
 from .utils import read_memmap_metadata
+from .virtual_windows import VirtualWindowDataset
+
+BATCH_ORDERS = ("sorted", "blocks")
+DATA_CACHE_MODES = ("auto", "ram", "memmap")
 
 
 def _memmap_path_for_split(split: str) -> str:
@@ -36,10 +43,15 @@ def _memmap_path_for_split(split: str) -> str:
 def load_memmap_dataset(flatten_for_tree: bool = True, split: str = "all") -> np.ndarray:
     """Load the memmap dataset from disk.
 
+    Datasets written with `dataset_layout="virtual"` are returned as a
+    `VirtualWindowDataset`, which supports the same shape/slicing API.
+    float16/int16 datasets are wrapped in `DequantizedArray`, so reads
+    always yield float32. Sharded datasets load as a `ShardedMemmap`.
+
     Args:
         flatten_for_tree: If True, return a 2D array (n_samples, features)
             suitable for tree-based models. If False, return the raw
-            memmap shape (n_sequences, seq_length, 1).
+            memmap shape (n_sequences, seq_length, n_channels).
         split: one of {"all", "healthy_train", "healthy_val"}.
 
     Raises:
@@ -51,7 +63,7 @@ def load_memmap_dataset(flatten_for_tree: bool = True, split: str = "all") -> np
     """
     memmap_path = _memmap_path_for_split(split)
 
-    if not os.path.exists(memmap_path):
+    if not (os.path.exists(memmap_path) or is_sharded(memmap_path)):
         raise FileNotFoundError(
             f"Memmap file not found: {memmap_path}. Run preprocessing to create it."
         )
@@ -61,12 +73,24 @@ def load_memmap_dataset(flatten_for_tree: bool = True, split: str = "all") -> np
         try:
             num_sequences = int(meta.get("num_sequences"))
             seq_length = int(meta.get("sequence_length"))
+            n_channels = int(meta.get("n_channels", 1))
             dtype = meta.get("dtype", "float32")
         except Exception as exc:
             logging.exception("Invalid memmap metadata for %s", memmap_path)
             raise ValueError("Corrupt or invalid memmap metadata") from exc
 
-        dataset = np.memmap(memmap_path, dtype=dtype, mode="r", shape=(num_sequences, seq_length, 1))
+        params = params_from_meta(meta)
+        if meta.get("layout", "dense") == "virtual":
+            dataset = VirtualWindowDataset.open(memmap_path, meta, flatten=flatten_for_tree)
+            return dataset if dtype == "float32" else DequantizedArray(dataset, params)
+        if meta.get("sharded"):
+            dataset = ShardedMemmap.open(memmap_path)
+            if dataset.shape != (num_sequences, seq_length, n_channels):
+                raise ValueError(f"Shard manifest shape {dataset.shape} disagrees with metadata for {memmap_path}")
+        else:
+            dataset = np.memmap(memmap_path, dtype=dtype, mode="r", shape=(num_sequences, seq_length, n_channels))
+        if dtype != "float32":
+            dataset = DequantizedArray(dataset, params)
     else:
         # Fallback: compute from file size (assumes contiguous float32 values)
         filesize = os.path.getsize(memmap_path)
@@ -83,6 +107,12 @@ def load_memmap_dataset(flatten_for_tree: bool = True, split: str = "all") -> np
     return dataset
 
 
+def dataset_channels(split: str = "healthy_train") -> int:
+    """Return the channel count recorded for a split (1 for legacy memmaps)."""
+    meta = read_memmap_metadata(_memmap_path_for_split(split)) or {}
+    return int(meta.get("n_channels", 1))
+
+
 def load_split_metadata() -> Optional[dict]:
     """Load split metadata generated during preprocessing, if present."""
     path = CONFIG["split_metadata_file"]
@@ -92,12 +122,46 @@ def load_split_metadata() -> Optional[dict]:
         return json.load(fh)
 
 
-class MemmapTorchDataset:
-    """PyTorch dataset backed by project memmaps.
+def resolve_num_workers(value=None) -> int:
+    """DataLoader worker count from CONFIG["num_workers"] (an int or "auto").
 
-    This dataset is intentionally thin: split policy and sequence shapes
-    are defined upstream in preprocessing/config so training scripts can
-    stay focused on optimization logic.
+    "auto" leaves one CPU to the training loop: `usable CPUs - 1`, capped
+    at `torch_max_auto_workers` (so 0 on a single-CPU machine).
+    """
+    value = CONFIG.get("num_workers", 0) if value is None else value
+    if value == "auto":
+        try:
+            cpus = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cpus = os.cpu_count() or 1
+        return max(0, min(cpus - 1, int(CONFIG.get("torch_max_auto_workers", 4))))
+    return max(0, int(value))
+
+
+def _pin_memory() -> bool:
+    import torch
+
+    pin = CONFIG.get("pin_memory", "auto")
+    return torch.cuda.is_available() if pin == "auto" else bool(pin)
+
+
+def _worker_init(worker_id: int) -> None:
+    """DataLoader `worker_init_fn`: map the split in this worker."""
+    import torch
+    from torch.utils.data import get_worker_info
+
+    # Workers only copy rows; leave the intra-op threads to training.
+    torch.set_num_threads(1)
+    get_worker_info().dataset.open()
+
+
+class _LazyMemmapDataset:
+    """Base for torch datasets that map a split lazily in each process.
+
+    The open memmap (and any batch buffer) is dropped when the dataset is
+    pickled, so spawned DataLoader workers receive only the split name
+    and shape instead of a copy of the data. Each worker maps the file
+    itself in `worker_init_fn` (or on first access).
     """
 
     def __init__(self, split: str, flatten: bool):
@@ -109,37 +173,304 @@ class MemmapTorchDataset:
         self._split = split
         self._flatten = flatten
         self._data = load_memmap_dataset(flatten_for_tree=flatten, split=split)
+        self._shape = tuple(self._data.shape)
+
+    def open(self):
+        """(Re)map the split in the current process."""
+        self._data = load_memmap_dataset(flatten_for_tree=self._flatten, split=self._split)
+        return self._data
+
+    def _array(self):
+        return self._data if self._data is not None else self.open()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
 
     def __len__(self):
-        return self._data.shape[0]
+        return self._shape[0]
+
+
+class MemmapTorchDataset(_LazyMemmapDataset):
+    """PyTorch dataset backed by project memmaps.
+
+    This dataset is intentionally thin: split policy and sequence shapes
+    are defined upstream in preprocessing/config so training scripts can
+    stay focused on optimization logic.
+    """
 
     def __getitem__(self, idx):
         import torch
 
-        x = self._data[idx]
+        x = self._array()[idx]
         # Memmap-backed slices are read-only; return a writable copy for PyTorch.
         return torch.from_numpy(np.array(x, dtype=np.float32, copy=True))
 
 
+class MemmapBatchSampler:
+    """Yield whole batches of window indices for `MemmapBatchDataset`.
+
+    Orders (`torch_batch_order`):
+
+    - `"sorted"`: a random permutation cut into batches, each sorted so the
+      gather walks the memmap front to back. Batch contents are as random
+      as with `shuffle=True`; only the order inside a batch changes.
+    - `"blocks"`: every batch is a contiguous run of windows, visited in
+      shuffled order. Reads are sequential, but overlapping windows land
+      in the same batch, so batches are less diverse.
+
+    Without shuffling, batches are contiguous slices in order.
+
+    The shuffle is drawn from the torch RNG when the iterator is created
+    (not on the first batch), and `skip_batches` drops that many batches
+    from the next iterator without reading them; resumed training uses
+    both to replay an epoch from its batch cursor.
+    """
+
+    def __init__(self, num_rows: int, batch_size: int, shuffle: bool, order: str = "sorted", generator=None):
+        if order not in BATCH_ORDERS:
+            raise ValueError(f"Unknown batch order {order!r}; expected one of {BATCH_ORDERS}")
+        self.num_rows = int(num_rows)
+        self.batch_size = int(batch_size)
+        self.shuffle = shuffle
+        self.order = order
+        self.generator = generator
+        self.skip_batches = 0
+
+    def __len__(self):
+        return -(-self.num_rows // self.batch_size)
+
+    def __iter__(self):
+        import torch
+
+        skip, self.skip_batches = self.skip_batches, 0
+        if not self.shuffle:
+            return self._slices(range(skip, len(self)))
+        if self.order == "blocks":
+            return self._slices(torch.randperm(len(self), generator=self.generator).tolist()[skip:])
+        perm = torch.randperm(self.num_rows, generator=self.generator).numpy()
+        starts = range(skip * self.batch_size, self.num_rows, self.batch_size)
+        return (np.sort(perm[lo : lo + self.batch_size]) for lo in starts)
+
+    def _slices(self, blocks):
+        for block in blocks:
+            lo = block * self.batch_size
+            yield slice(lo, min(lo + self.batch_size, self.num_rows))
+
+
+def available_memory_bytes() -> Optional[int]:
+    """Memory the OS reports as available for new allocations, or None."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return int(os.sysconf("SC_AVPHYS_PAGES")) * int(os.sysconf("SC_PAGE_SIZE"))
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def load_split_tensor(split: str, flatten: bool, data=None, shared: bool = False):
+    """Copy a split into one contiguous float32 tensor.
+
+    Reads go through `load_memmap_dataset` in chunks of
+    `torch_ram_cache_chunk_rows`, so quantized and virtual layouts never
+    materialize a second full-size array. With `shared=True` the tensor
+    lives in shared memory and DataLoader workers map it instead of
+    receiving a copy.
+    """
+    import torch
+
+    data = load_memmap_dataset(flatten_for_tree=flatten, split=split) if data is None else data
+    tensor = torch.empty(tuple(data.shape), dtype=torch.float32)
+    if shared:
+        tensor.share_memory_()
+    target = tensor.numpy()
+    chunk = max(1, int(CONFIG.get("torch_ram_cache_chunk_rows", 65536)))
+    for lo in range(0, len(data), chunk):
+        target[lo : lo + chunk] = data[lo : lo + chunk]
+    return tensor
+
+
+def _use_ram_cache(split: str, data) -> bool:
+    """Apply `torch_data_cache` and the memory fit-check to one split."""
+    mode = CONFIG.get("torch_data_cache", "auto")
+    if mode not in DATA_CACHE_MODES:
+        raise ValueError(f"Unknown torch_data_cache {mode!r}; expected one of {DATA_CACHE_MODES}")
+    if mode != "auto":
+        return mode == "ram"
+    needed = int(np.prod(data.shape, dtype=np.int64)) * 4
+    available = available_memory_bytes()
+    budget = None if available is None else int(available * float(CONFIG.get("torch_ram_cache_max_fraction", 0.5)))
+    if budget is None or needed > budget:
+        log_note(
+            f"{split}: streaming from memmap ({needed / 1e6:.1f} MB does not fit the RAM cache budget"
+            f"{'' if budget is None else f' of {budget / 1e6:.1f} MB'})"
+        )
+        return False
+    return True
+
+
+class MemmapBatchDataset(_LazyMemmapDataset):
+    """Batch-level PyTorch dataset backed by project memmaps.
+
+    Indexed with a whole batch (a slice or an index array from
+    `MemmapBatchSampler`) and returns one float32 tensor per batch.
+
+    When the split fits in RAM (`torch_data_cache`), it is loaded once
+    into a contiguous tensor: slices are then zero-copy views of it and
+    index arrays are one `index_select`. Treat batches as read-only.
+    Otherwise each batch is gathered from the memmap in a single
+    vectorized read.
+
+    Gathers in the main process are written into a reusable buffer, so
+    each returned tensor is overwritten by a later batch; clone it to
+    keep it. When `pin_memory` applies there are two pinned buffers,
+    so the caller may copy a batch to the GPU with `non_blocking=True`
+    while the next one is gathered. DataLoader workers allocate a fresh
+    tensor per batch, since batches are handed to the main process
+    through shared memory.
+    """
+
+    def __init__(self, split: str, flatten: bool, batch_size: int):
+        import torch
+
+        super().__init__(split, flatten)
+        self._batch_size = int(batch_size)
+        self._pin = torch.cuda.is_available() and _pin_memory()
+        self._buffers = []
+        self._copied = []
+        self._last = None
+        self._tensor = None
+        if _use_ram_cache(split, self._data):
+            shared = bool(CONFIG.get("torch_ram_cache_shared", True)) and resolve_num_workers() > 0
+            try:
+                self._tensor = load_split_tensor(split, flatten, data=self._data, shared=shared)
+            except RuntimeError as exc:
+                # Typically /dev/shm too small for a shared tensor.
+                logging.warning("Loading %s into shared memory failed (%s); using a private copy", split, exc)
+                self._tensor = load_split_tensor(split, flatten, data=self._data)
+            self._data = None
+            log_note(f"{split}: cached {self._tensor.nbytes / 1e6:.1f} MB in RAM{' (shared)' if shared else ''}")
+
+    @property
+    def in_memory(self) -> bool:
+        return self._tensor is not None
+
+    def open(self):
+        # A RAM-cached split never touches the memmap again.
+        return None if self._tensor is not None else super().open()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(_buffers=[], _copied=[], _last=None)
+        return state
+
+    def _out(self, rows: int):
+        import torch
+        from torch.utils.data import get_worker_info
+
+        shape = (rows,) + self._shape[1:]
+        if get_worker_info() is not None:
+            return torch.empty(shape, dtype=torch.float32)
+        if not self._buffers or self._buffers[0].shape[0] < rows:
+            capacity = (max(rows, self._batch_size),) + shape[1:]
+            count = 2 if self._pin else 1
+            self._buffers = [torch.empty(capacity, dtype=torch.float32, pin_memory=self._pin) for _ in range(count)]
+            self._copied = [None] * count
+            self._last = None
+        if self._pin and self._last is not None:
+            # The last pinned batch may still be feeding an async H2D copy
+            # (the trainer uses `non_blocking=True`). That copy is queued by
+            # the time the next batch is requested, so an event recorded now
+            # on the current stream marks it done; a buffer is only refilled
+            # after its event completes.
+            self._copied[self._last] = torch.cuda.Event()
+            self._copied[self._last].record()
+        turn = 0 if self._last is None else (self._last + 1) % len(self._buffers)
+        if self._copied[turn] is not None:
+            self._copied[turn].synchronize()
+        self._last = turn
+        return self._buffers[turn][:rows]
+
+    def __getitem__(self, key):
+        import torch
+
+        if isinstance(key, slice):
+            if self._tensor is not None:
+                return self._tensor[key]
+            rows = len(range(*key.indices(len(self))))
+        else:
+            key = np.asarray(key, dtype=np.int64)
+            rows = len(key)
+        out = self._out(rows)
+        if self._tensor is not None:
+            return torch.index_select(self._tensor, 0, torch.from_numpy(key), out=out)
+        data = self._array()
+        target = out.numpy()
+        if isinstance(data, np.ndarray) and not isinstance(key, slice) and data.dtype == np.float32:
+            # Dense float32 memmap: gather straight into the output buffer.
+            np.take(data, key, axis=0, out=target)
+        else:
+            target[...] = data[key]
+        return out
+
+
+def loader_kwargs() -> dict:
+    """DataLoader worker/pinning arguments from CONFIG."""
+    workers = resolve_num_workers()
+    kwargs = {"num_workers": workers, "pin_memory": _pin_memory()}
+    if workers > 0:
+        kwargs.update(
+            persistent_workers=bool(CONFIG.get("persistent_workers", True)),
+            prefetch_factor=int(CONFIG.get("prefetch_factor", 2)),
+            worker_init_fn=_worker_init,
+        )
+    return kwargs
+
+
 def make_torch_dataloaders(flatten: bool = False):
-    """Create healthy-only train/validation dataloaders for AE training."""
+    """Create healthy-only train/validation dataloaders for AE training.
+
+    `torch_loader="batched"` (default) reads whole batches through
+    `MemmapBatchDataset`; `"item"` keeps the per-window dataset and the
+    default collate. Worker settings come from `loader_kwargs`.
+    """
     try:
         from torch.utils.data import DataLoader
     except Exception as exc:
         raise ImportError("PyTorch is required for dataloaders. Install `torch`.") from exc
 
+    batch_size = CONFIG["torch_batch_size"]
+    kwargs = loader_kwargs()
+    if CONFIG.get("torch_loader", "batched") == "batched":
+        loaders = []
+        for split, shuffle in (("healthy_train", True), ("healthy_val", False)):
+            dataset = MemmapBatchDataset(split=split, flatten=flatten, batch_size=batch_size)
+            sampler = MemmapBatchSampler(
+                len(dataset), batch_size, shuffle=shuffle, order=CONFIG.get("torch_batch_order", "sorted")
+            )
+            # batch_size=None: the sampler yields whole batches and the
+            # dataset returns them already stacked.
+            loaders.append(DataLoader(dataset, sampler=sampler, batch_size=None, **kwargs))
+        return loaders[0], loaders[1]
+
     train_ds = MemmapTorchDataset(split="healthy_train", flatten=flatten)
     val_ds = MemmapTorchDataset(split="healthy_val", flatten=flatten)
     train_loader = DataLoader(
         train_ds,
-        batch_size=CONFIG["torch_batch_size"],
+        batch_size=batch_size,
         shuffle=True,
-        num_workers=CONFIG["num_workers"],
+        **kwargs,
     )
     val_loader = DataLoader(
         val_ds,
-        batch_size=CONFIG["torch_batch_size"],
+        batch_size=batch_size,
         shuffle=False,
-        num_workers=CONFIG["num_workers"],
+        **kwargs,
     )
     return train_loader, val_loader
@@ -0,0 +1,182 @@
+"""Manifest-backed discovery of usable IMS snapshot files.
+
+`list_ims_files` must know which snapshots hold at least `seq_length`
+rows. Instead of iterating every file line by line, each file is
+classified from its size plus a bounded head read, and the result
+(path, size, mtime, confirmed rows) is cached in a JSON manifest under
+`data/processed`. Warm runs only `stat` files; cold runs stat and probe
+them in a thread pool since the work is I/O bound.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import CONFIG
+
+MANIFEST_VERSION = 1
+
+
+def is_ims_name(filename: str) -> bool:
+    """IMS snapshot names end with `.##` where ## are digits."""
+    return len(filename) >= 3 and filename[-3] == "." and filename[-2:].isdigit()
+
+
+def walk_ims_names(folder: str) -> list[str]:
+    """Return sorted candidate IMS paths under `folder`."""
+    files = []
+    for root, _dirs, filenames in os.walk(folder):
+        for name in filenames:
+            if is_ims_name(name):
+                files.append(os.path.join(root, name))
+    files.sort()
+    return files
+
+
+def raw_listing_digest(folder: str) -> str:
+    """Digest of the IMS names, sizes and mtimes under `folder`.
+
+    Pipeline preprocessing uses this as its fingerprint instead of the
+    folder mtime: it changes exactly when snapshots are added, removed or
+    rewritten (same-size rewrites included, via `st_mtime_ns`), even in
+    append mode where no file here is written.
+    """
+    digest = hashlib.sha1()
+    for path in walk_ims_names(folder):
+        st = os.stat(path)
+        digest.update(f"{os.path.relpath(path, folder)}\t{st.st_size}\t{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _count_rows(data: bytes) -> int:
+    """Count non-empty lines in a byte buffer."""
+    return sum(1 for line in data.splitlines() if line.strip())
+
+
+def probe_rows(file_path: str, size: int, min_rows: int) -> tuple[int, bool]:
+    """Return `(confirmed_rows, exact)` for a file using bounded reads.
+
+    A row needs at least one value byte and, except for the last row, a
+    newline, so files smaller than `2 * min_rows - 1` bytes are rejected
+    from their size alone. Otherwise
+    only the first `discovery_probe_bytes` are read; that is enough to
+    confirm `min_rows` for IMS snapshots, whose rows are a few dozen bytes.
+    Files with unusually long rows fall back to an incremental scan that
+    stops as soon as `min_rows` is reached.
+    """
+    if size < 2 * min_rows - 1:
+        return 0, False
+    probe_bytes = int(CONFIG.get("discovery_probe_bytes", 1 << 16))
+    rows = 0
+    exact = False
+    with open(file_path, "rb") as fh:
+        tail = b""
+        while True:
+            chunk = fh.read(probe_bytes)
+            if not chunk:
+                exact = True
+                break
+            data = tail + chunk
+            # Keep a partial trailing line for the next chunk.
+            cut = data.rfind(b"\n") + 1
+            rows += _count_rows(data[:cut])
+            tail = data[cut:]
+            if rows >= min_rows:
+                break
+        if exact and tail.strip():
+            rows += 1
+    return rows, exact
+
+
+def _entry_is_fresh(entry: dict | None, st: os.stat_result) -> bool:
+    return bool(entry) and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns
+
+
+def _classify(task):
+    """Worker: stat a file and reuse or refresh its manifest entry."""
+    file_path, entry, min_rows = task
+    try:
+        st = os.stat(file_path)
+        # A cached entry decides the file when it is exact, already confirms
+        # enough rows, or the size alone rules the file out.
+        decided = entry and (entry["exact"] or entry["rows"] >= min_rows or st.st_size < 2 * min_rows - 1)
+        if _entry_is_fresh(entry, st) and decided:
+            return file_path, entry, False
+        rows, exact = probe_rows(file_path, st.st_size, min_rows)
+        fresh = {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns), "rows": int(rows), "exact": bool(exact)}
+        return file_path, fresh, True
+    except Exception as exc:
+        logging.warning("Unable to read %s: %s", file_path, exc)
+        return file_path, None, False
+
+
+def load_manifest(path: str | None = None) -> dict:
+    """Return `{abspath: entry}` from the discovery manifest, or `{}`."""
+    path = path or CONFIG["discovery_manifest_file"]
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            payload = json.load(fh)
+    except Exception:
+        logging.warning("Ignoring unreadable discovery manifest %s", path)
+        return {}
+    if payload.get("version") != MANIFEST_VERSION:
+        return {}
+    return payload.get("files", {})
+
+
+def save_manifest(entries: dict, path: str | None = None) -> None:
+    """Atomically write the discovery manifest."""
+    path = path or CONFIG["discovery_manifest_file"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump({"version": MANIFEST_VERSION, "files": entries}, fh)
+    os.replace(tmp_path, path)
+
+
+def discover_ims_files(folder: str, seq_length: int = 100, workers: int | None = None, stats: dict | None = None):
+    """Return IMS paths under `folder` with at least `seq_length` rows.
+
+    Args:
+        folder: root folder to walk.
+        seq_length: minimum number of rows a file must hold.
+        workers: stat/probe threads (defaults to CONFIG["discovery_workers"]).
+        stats: optional dict updated with `candidates` and `probed` counts.
+    """
+    workers = max(1, int(workers or CONFIG.get("discovery_workers", 8)))
+    candidates = walk_ims_names(folder)
+    manifest = load_manifest()
+    tasks = [(path, manifest.get(os.path.abspath(path)), seq_length) for path in candidates]
+    if workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_classify, tasks))
+    else:
+        results = [_classify(task) for task in tasks]
+
+    folder_prefix = os.path.join(os.path.abspath(folder), "")
+    # Entries under other folders (e.g. other IMS test runs) are kept as-is.
+    updated = {key: value for key, value in manifest.items() if not key.startswith(folder_prefix)}
+    valid_files = []
+    probed = 0
+    for file_path, entry, was_probed in results:
+        if entry is None:
+            continue
+        probed += int(was_probed)
+        updated[os.path.abspath(file_path)] = entry
+        if entry["rows"] >= seq_length:
+            valid_files.append(file_path)
+    if probed or len(updated) != len(manifest):
+        try:
+            save_manifest(updated)
+        except OSError as exc:
+            logging.warning("Unable to write discovery manifest: %s", exc)
+    if stats is not None:
+        stats["candidates"] = len(candidates)
+        stats["probed"] = probed
+    return valid_files
@@ -0,0 +1,188 @@
+"""Checkpoint-aware memoization of evaluation runs.
+
+`cached_evaluation` wraps an evaluator (`machine_health_curve`,
+`evaluate_autoencoder`) and keys it on content hashes of everything the
+evaluation reads:
+
+- the model checkpoint and the scaler,
+- the split metadata and the `.meta.json` of the evaluated memmaps,
+- the CONFIG keys that change scores, thresholds or diagnostics,
+- the evaluator's own arguments (e.g. `limit`).
+
+On a miss the evaluator runs, and the diagnostics files it wrote are
+copied into `<processed>/eval_cache/<key>/`. On a hit those files are
+restored into the diagnostics directory and the evaluator is skipped.
+Entries are evicted least-recently-used first once the cache exceeds
+CONFIG["eval_cache_max_bytes"].
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from .config import CONFIG
+from .dataset import _memmap_path_for_split, load_split_metadata
+from .logging_utils import log_note
+from .score_store import checkpoint_hash
+from .utils import read_memmap_metadata
+
+# CONFIG keys that change evaluation outputs for every model.
+_COMMON_KEYS = (
+    "sequence_length",
+    "stride",
+    "dataset_layout",
+    "channel_mode",
+    "storage_dtype",
+    "storage_int16_clip_sigma",
+)
+_MODEL_KEYS = {
+    "isolation_forest": ("score_threshold_percentile",),
+    "dense_autoencoder": ("ae_error_threshold_percentile",),
+    "lstm_autoencoder": ("ae_error_threshold_percentile",),
+}
+_MODEL_FILES = {
+    "isolation_forest": lambda: os.path.join(CONFIG["processed_folder"], "isolation_forest.model"),
+    "dense_autoencoder": lambda: CONFIG["dense_autoencoder_model_file"],
+    "lstm_autoencoder": lambda: CONFIG["lstm_autoencoder_model_file"],
+}
+
+
+def cache_dir() -> str:
+    return os.path.join(CONFIG["processed_folder"], "eval_cache")
+
+
+def _diagnostics_dir() -> str:
+    return os.path.join(CONFIG["processed_folder"], "diagnostics")
+
+
+def evaluation_key(model: str, params: dict | None = None) -> str:
+    """Return the cache key of evaluating `model` on the current dataset."""
+    parts = {
+        "model": model,
+        "checkpoint": checkpoint_hash(_MODEL_FILES[model]()),
+        "scaler": checkpoint_hash(CONFIG["scaler_file"]) if os.path.exists(CONFIG["scaler_file"]) else None,
+        "split_metadata": load_split_metadata(),
+        "memmaps": {split: read_memmap_metadata(_memmap_path_for_split(split)) for split in ("all", "healthy_val")},
+        "config": {key: CONFIG.get(key) for key in _COMMON_KEYS + _MODEL_KEYS[model]},
+        "params": params or {},
+    }
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _snapshot(folder: str) -> dict[str, tuple[int, int]]:
+    if not os.path.isdir(folder):
+        return {}
+    out = {}
+    for entry in os.scandir(folder):
+        if entry.is_file():
+            st = entry.stat()
+            out[entry.name] = (st.st_size, st.st_mtime_ns)
+    return out
+
+
+class EvalCache:
+    """On-disk evaluation cache with an LRU index (`index.json`)."""
+
+    def __init__(self, root: str | None = None, max_bytes: int | None = None):
+        self.root = root or cache_dir()
+        self.max_bytes = int(CONFIG.get("eval_cache_max_bytes", 2_000_000_000) if max_bytes is None else max_bytes)
+        self.index_path = os.path.join(self.root, "index.json")
+        self.index = {"clock": 0, "entries": {}}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as fh:
+                    self.index = json.load(fh)
+            except (OSError, ValueError):
+                logging.warning("Ignoring unreadable eval cache index %s", self.index_path)
+
+    @property
+    def total_bytes(self) -> int:
+        return int(sum(entry["bytes"] for entry in self.index["entries"].values()))
+
+    def _touch(self, key: str) -> None:
+        self.index["clock"] = int(self.index.get("clock", 0)) + 1
+        self.index["entries"][key]["last_used"] = self.index["clock"]
+
+    def _save_index(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.index, fh, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def restore(self, key: str, target_dir: str) -> dict | None:
+        """Copy a cached entry into `target_dir`; return its result or None."""
+        entry = self.index["entries"].get(key)
+        entry_dir = os.path.join(self.root, key)
+        if entry is None or not all(os.path.exists(os.path.join(entry_dir, name)) for name in entry["files"]):
+            return None
+        os.makedirs(target_dir, exist_ok=True)
+        for name in entry["files"]:
+            # Fresh mtimes: restored diagnostics count as produced now, so
+            # pipeline steps see them as newer than their inputs.
+            shutil.copyfile(os.path.join(entry_dir, name), os.path.join(target_dir, name))
+        self._touch(key)
+        self._save_index()
+        return dict(entry["result"])
+
+    def store(self, key: str, model: str, source_dir: str, files: list[str], result: dict) -> None:
+        """Copy `files` from `source_dir` into a new entry and evict to fit."""
+        entry_dir = os.path.join(self.root, key)
+        os.makedirs(entry_dir, exist_ok=True)
+        size = 0
+        for name in files:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(entry_dir, name))
+            size += os.path.getsize(os.path.join(entry_dir, name))
+        self.index["entries"][key] = {"model": model, "files": sorted(files), "bytes": size, "result": result}
+        self._touch(key)
+        self.evict()
+        self._save_index()
+
+    def evict(self) -> list[str]:
+        """Drop least-recently-used entries until the cache fits `max_bytes`."""
+        evicted = []
+        by_age = sorted(self.index["entries"].items(), key=lambda item: item[1]["last_used"])
+        total = self.total_bytes
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            del self.index["entries"][key]
+            total -= entry["bytes"]
+            evicted.append(key)
+        return evicted
+
+
+def cached_evaluation(model: str, fn, params: dict | None = None) -> dict:
+    """Run `fn()` (an evaluator returning a result dict) through the cache.
+
+    The returned dict carries `cache_hit`. Cached results keep only the
+    JSON-serializable fields (figures are not cached).
+    """
+    if not CONFIG.get("eval_cache_enabled", True):
+        return dict(fn(), cache_hit=False)
+    diagnostics_dir = _diagnostics_dir()
+    key = evaluation_key(model, params)
+    cache = EvalCache()
+    restored = cache.restore(key, diagnostics_dir)
+    if restored is not None:
+        log_note(f"{model} evaluation cache hit ({key[:12]}); restored diagnostics")
+        return dict(restored, diagnostics_dir=diagnostics_dir, cache_hit=True)
+
+    before = _snapshot(diagnostics_dir)
+    result = fn()
+    after = _snapshot(diagnostics_dir)
+    written = [name for name, stat in after.items() if before.get(name) != stat]
+    serializable = {
+        name: value for name, value in result.items() if isinstance(value, (str, int, float, bool, type(None)))
+    }
+    try:
+        cache.store(key, model, diagnostics_dir, written, serializable)
+    except OSError as exc:
+        logging.warning("Unable to cache %s evaluation: %s", model, exc)
+    return dict(result, cache_hit=False)
@@ -22,10 +22,16 @@ import joblib
 import numpy as np
 import matplotlib.pyplot as plt
 
+from .compiled_forest import load_if_scorer
 from .config import CONFIG, configure_logging
 from .dataset import load_memmap_dataset, load_split_metadata
+from .file_index import FileIndex
+from .parallel_scoring import score_split_parallel
 from .logging_utils import fmt_seconds, log_note, log_progress
-from .preprocessing import create_sequences
+from .prefetch import prefetch_scaled_signals
+from .preprocessing import load_signal
+from .score_store import ScoreColumn, ScoreStore, checkpoint_hash
+from .windowing import count_sequences, window_view
 from .utils import plot_health_curve, list_ims_files
 
 
@@ -47,6 +53,41 @@ def _decision_scores_batched(model, data: np.ndarray, batch_size: int = 200_000,
     return np.concatenate(parts, axis=0) if parts else np.array([], dtype=np.float32)
 
 
+def stream_file_scores(model, scaler, file_records):
+    """Yield `(file_pos, record, scores)` scoring each raw file once.
+
+    The next files are loaded and scaled in the background (see
+    `prefetch.py`) while the current one is scored. At most
+    `eval_prefetch_depth` files are held, so peak memory stays bounded.
+    """
+    seq_len = CONFIG["sequence_length"]
+    for file_pos, record, scaled in prefetch_scaled_signals(file_records, scaler):
+        seqs = window_view(scaled, seq_len, CONFIG["stride"])
+        if len(seqs) <= 0:
+            continue
+        yield file_pos, record, model.decision_function(seqs.reshape(len(seqs), -1))
+
+
+def _record_window_bounds(file_records):
+    """Return `(starts, ends)` of each record's windows in the `all` memmap."""
+    if file_records and "global_start_idx" in file_records[0]:
+        return FileIndex.load().window_bounds(slice(0, len(file_records)))
+    # Records discovered from raw files carry counts only; files are contiguous.
+    ends = np.cumsum([int(record["num_sequences"]) for record in file_records], dtype=np.int64)
+    return ends - np.asarray([int(record["num_sequences"]) for record in file_records], dtype=np.int64), ends
+
+
+def _score_column(model_file: str, split_meta, num_windows: int) -> ScoreColumn:
+    """Return the score-store column of this checkpoint.
+
+    Without split metadata there is no file index to align with, so scores
+    go to a throwaway in-memory column instead.
+    """
+    if split_meta and split_meta.get("file_records"):
+        return ScoreStore.open().column("isolation_forest", checkpoint_hash(model_file))
+    return ScoreColumn.in_memory(num_windows)
+
+
 def machine_health_curve(
     limit: int | None = None,
     save_path: str | None = None,
@@ -56,14 +97,14 @@ def machine_health_curve(
 
     The function supports two data access modes:
     1) Fast path with prebuilt full memmap ("all")
-    2) Streaming fallback from raw files when full memmap is unavailable
-       due to platform/storage constraints.
+    2) Single-pass streaming fallback from raw files when the full memmap
+       is unavailable due to platform/storage constraints.
     """
     model_file = os.path.join(CONFIG["processed_folder"], "isolation_forest.model")
     if not os.path.exists(model_file):
         raise FileNotFoundError(f"Model not found: {model_file}. Run training first.")
 
-    model = joblib.load(model_file)
+    model = load_if_scorer(model_file)
 
     scaler = joblib.load(CONFIG["scaler_file"])
     # Threshold must come from healthy holdout data, not mixed/test data.
@@ -90,11 +131,11 @@ def machine_health_curve(
             files = files[:limit]
         for file_idx, f in enumerate(files[: CONFIG["num_files_to_process"]]):
             try:
-                signal = np.loadtxt(f, dtype=np.float32).reshape(-1, 1)
+                signal = load_signal(f)
             except Exception:
                 logging.exception("Failed to read file %s", f)
                 continue
-            n_seqs = (len(signal) - seq_len) // CONFIG["stride"] + 1
+            n_seqs = count_sequences(len(signal), seq_len, CONFIG["stride"])
             if n_seqs <= 0:
                 continue
             file_records.append(
@@ -103,21 +144,40 @@ def machine_health_curve(
 
     use_all_memmap = bool((split_meta or {}).get("all_memmap_enabled", True))
     log_note(f"IF eval context: files={len(file_records)}, all_memmap={use_all_memmap}")
+    starts, ends = _record_window_bounds(file_records)
+    needed = int(ends[-1]) if len(ends) else 0
+    column = _score_column(model_file, split_meta, needed)
+    missing = column.missing_ranges(0, needed)
+    log_note(f"IF score store: {sum(hi - lo for lo, hi in missing)}/{needed} windows to score")
     eval_start = time.perf_counter()
     if use_all_memmap:
-        X_flat = load_memmap_dataset(flatten_for_tree=True, split="all")
-        scores = _decision_scores_batched(
-            model,
-            X_flat,
-            progress_label="IF decision scores (all memmap)",
-        )
-        seq_counter = 0
+        if missing and int(CONFIG.get("if_score_workers", 1)) > 1 and column.values_path:
+            column.flush()
+            score_split_parallel(
+                model_file,
+                split="all",
+                out_path=column.values_path,
+                ranges=missing,
+                progress_label="IF decision scores (all memmap, parallel)",
+            )
+            column.mark_computed(missing)
+        elif missing:
+            X_flat = load_memmap_dataset(flatten_for_tree=True, split="all")
+            for lo, hi in missing:
+                column.write(
+                    lo,
+                    _decision_scores_batched(
+                        model,
+                        X_flat[lo:hi],
+                        batch_size=int(CONFIG.get("if_score_batch_size", 200_000)),
+                        progress_label="IF decision scores (all memmap)",
+                    ),
+                )
+        column.flush()
         for file_pos, record in enumerate(file_records):
-            n_seqs = int(record["num_sequences"])
-            if n_seqs <= 0:
+            if ends[file_pos] <= starts[file_pos]:
                 continue
-            file_scores = scores[seq_counter : seq_counter + n_seqs]
-            seq_counter += n_seqs
+            file_scores = column.values[starts[file_pos] : ends[file_pos]]
             all_scores_parts.append(file_scores)
             file_mean_scores.append(float(np.nanmean(file_scores)))
             file_anomaly_rates.append(float(np.mean(file_scores <= threshold)))
@@ -129,46 +189,44 @@ def machine_health_curve(
                     f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
                 )
     else:
-        # First pass: collect scores to derive threshold.
+        # Single streaming pass: the threshold already comes from
+        # healthy_val, so per-file metrics are aggregated while scoring and
+        # each file missing from the store is read, scaled, windowed and
+        # scored exactly once.
+        todo = [
+            record
+            for file_pos, record in enumerate(file_records)
+            if ends[file_pos] > starts[file_pos] and not column.is_complete(starts[file_pos], ends[file_pos])
+        ]
+        streamed = stream_file_scores(model, scaler, todo)
         for file_pos, record in enumerate(file_records):
-            signal = np.loadtxt(record["file_path"], dtype=np.float32).reshape(-1, 1)
-            scaled = scaler.transform(signal)
-            seqs = create_sequences(scaled, seq_len, CONFIG["stride"])
-            if len(seqs) <= 0:
+            lo, hi = int(starts[file_pos]), int(ends[file_pos])
+            if hi <= lo:
                 continue
-            file_scores = model.decision_function(seqs.reshape(len(seqs), -1))
+            if column.is_complete(lo, hi):
+                file_scores = column.values[lo:hi]
+            else:
+                _, streamed_record, file_scores = next(streamed)
+                if streamed_record is not record or len(file_scores) != hi - lo:
+                    raise ValueError(f"Window count changed for {record['file_path']}; re-run preprocessing")
+                column.write(lo, file_scores)
             all_scores_parts.append(file_scores)
-            if log_interval_files and (file_pos + 1) % log_interval_files == 0:
-                elapsed = time.perf_counter() - eval_start
-                eta_sec = (elapsed / (file_pos + 1)) * max(len(file_records) - (file_pos + 1), 0)
-                log_progress(
-                    f"IF eval (stream pass1): file {file_pos + 1}/{len(file_records)} | "
-                    f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
-                )
-        scores = np.concatenate(all_scores_parts, axis=0) if all_scores_parts else np.array([], dtype=np.float32)
-
-        # Second pass: per-file metrics. This keeps thresholding consistent
-        # with the global score distribution built in pass one.
-        for file_pos, record in enumerate(file_records):
-            signal = np.loadtxt(record["file_path"], dtype=np.float32).reshape(-1, 1)
-            scaled = scaler.transform(signal)
-            seqs = create_sequences(scaled, seq_len, CONFIG["stride"])
-            if len(seqs) <= 0:
-                continue
-            file_scores = model.decision_function(seqs.reshape(len(seqs), -1))
             file_mean_scores.append(float(np.nanmean(file_scores)))
             file_anomaly_rates.append(float(np.mean(file_scores <= threshold)))
             if log_interval_files and (file_pos + 1) % log_interval_files == 0:
                 elapsed = time.perf_counter() - eval_start
                 eta_sec = (elapsed / (file_pos + 1)) * max(len(file_records) - (file_pos + 1), 0)
                 log_progress(
-                    f"IF eval (stream pass2): file {file_pos + 1}/{len(file_records)} | "
+                    f"IF eval (stream): file {file_pos + 1}/{len(file_records)} | "
                     f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
                 )
+        column.flush()
+    scores = np.concatenate(all_scores_parts, axis=0) if all_scores_parts else np.array([], dtype=np.float64)
 
     diagnostics_dir = os.path.join(CONFIG["processed_folder"], "diagnostics")
     os.makedirs(diagnostics_dir, exist_ok=True)
-    np.save(os.path.join(diagnostics_dir, "isolation_forest_scores.npy"), scores)
+    if CONFIG.get("score_store_export_npy", True):
+        np.save(os.path.join(diagnostics_dir, "isolation_forest_scores.npy"), scores)
     file_scores_arr = np.asarray(file_anomaly_rates, dtype=np.float32)
     file_alerts_arr = (file_scores_arr > 0.0).astype(np.uint8)
     np.save(os.path.join(diagnostics_dir, "isolation_forest_file_scores.npy"), file_scores_arr)
@@ -247,10 +305,16 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=None, help="Limit number of files to aggregate (demo)")
     parser.add_argument("--save", type=str, default=None, help="Save plot to given path instead of returning/displaying")
     parser.add_argument("--log-interval-files", type=int, default=CONFIG["log_interval_files"])
+    parser.add_argument("--workers", type=int, default=None, help="Processes for IF scoring of the all memmap")
+    parser.add_argument("--if-engine", choices=["compiled", "sklearn"], default=None, help="IsolationForest inference engine")
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     args = parser.parse_args()
 
     configure_logging(logging.DEBUG if args.verbose else logging.INFO)
+    if args.workers is not None:
+        CONFIG["if_score_workers"] = args.workers
+    if args.if_engine:
+        CONFIG["if_inference_engine"] = args.if_engine
 
     try:
         output = machine_health_curve(
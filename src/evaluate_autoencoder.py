@@ -15,9 +15,12 @@ import joblib
 
 from .config import CONFIG, configure_logging
 from .dataset import load_memmap_dataset, load_split_metadata
+from .file_index import FileIndex
 from .logging_utils import fmt_seconds, log_note, log_progress
 from .models import DenseAutoencoder, LSTMAutoencoder
-from .preprocessing import create_sequences
+from .prefetch import prefetch_scaled_signals
+from .score_store import ScoreColumn, ScoreStore, checkpoint_hash
+from .windowing import window_view
 
 
 def _load_model(model_type: str, device: torch.device):
@@ -105,20 +108,37 @@ def evaluate(model_type: str, log_interval_files: int | None = None) -> dict:
     eval_start = time.perf_counter()
     scaler = joblib.load(CONFIG["scaler_file"])
     file_metrics = []
+    starts, ends = FileIndex.load().window_bounds() if file_records else ([], [])
+    num_windows = int(ends[-1]) if len(ends) else 0
+    if file_records:
+        checkpoint_file = CONFIG[f"{model_type}_autoencoder_model_file"]
+        column = ScoreStore.open().column(
+            f"{model_type}_autoencoder", checkpoint_hash(checkpoint_file), dtype=np.float32
+        )
+    else:
+        column = ScoreColumn.in_memory(num_windows, dtype=np.float32)
+    missing = column.missing_ranges(0, num_windows)
+    log_note(f"{model_type.upper()} AE score store: {sum(hi - lo for lo, hi in missing)}/{num_windows} windows to score")
     if all_memmap_enabled:
         # Fast path when full memmap exists.
-        X_all = load_memmap_dataset(flatten_for_tree=flatten, split="all")
-        all_errors = _reconstruction_errors(
-            model,
-            X_all,
-            device=device,
-            flatten=flatten,
-            progress_label=f"{model_type.upper()} AE all reconstruction",
-            log_interval_batches=log_interval_batches,
-        )
+        if missing:
+            X_all = load_memmap_dataset(flatten_for_tree=flatten, split="all")
+            for lo, hi in missing:
+                column.write(
+                    lo,
+                    _reconstruction_errors(
+                        model,
+                        X_all[lo:hi],
+                        device=device,
+                        flatten=flatten,
+                        progress_label=f"{model_type.upper()} AE all reconstruction",
+                        log_interval_batches=log_interval_batches,
+                    ),
+                )
+            column.flush()
+        all_errors = np.asarray(column.values[:num_windows])
         for file_pos, record in enumerate(file_records):
-            start = int(record.get("global_start_idx", 0))
-            end = int(record.get("global_end_idx", 0))
+            start, end = int(starts[file_pos]), int(ends[file_pos])
             if end <= start or end > all_errors.shape[0]:
                 continue
             file_errs = all_errors[start:end]
@@ -138,16 +158,34 @@ def evaluate(model_type: str, log_interval_files: int | None = None) -> dict:
                     f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
                 )
     else:
-        # Fallback path for environments where full "all" memmap is skipped.
+        # Fallback path for environments where full "all" memmap is skipped;
+        # only files with windows missing from the store are loaded.
         all_error_parts = []
+        todo = [
+            record
+            for file_pos, record in enumerate(file_records)
+            if ends[file_pos] > starts[file_pos] and not column.is_complete(starts[file_pos], ends[file_pos])
+        ]
+        streamed = prefetch_scaled_signals(todo, scaler)
         for file_pos, record in enumerate(file_records):
-            signal = np.loadtxt(record["file_path"], dtype=np.float32).reshape(-1, 1)
-            scaled = scaler.transform(signal)
-            seqs = create_sequences(scaled, CONFIG["sequence_length"], CONFIG["stride"])
-            if len(seqs) <= 0:
+            lo, hi = int(starts[file_pos]), int(ends[file_pos])
+            if hi <= lo:
                 continue
-            model_in = seqs.reshape(len(seqs), -1) if flatten else seqs
-            file_errs = _reconstruction_errors(model, model_in, device=device, flatten=flatten)
+            if column.is_complete(lo, hi):
+                file_errs = np.asarray(column.values[lo:hi])
+            else:
+                _, streamed_record, scaled = next(streamed, (None, None, None))
+                if streamed_record is not record:
+                    # Prefetch must yield `todo` in file order; never attach
+                    # one file's errors to another.
+                    streamed_path = None if streamed_record is None else streamed_record["file_path"]
+                    raise ValueError(f"Prefetched {streamed_path} while evaluating {record['file_path']}")
+                seqs = window_view(scaled, CONFIG["sequence_length"], CONFIG["stride"])
+                if len(seqs) != hi - lo:
+                    raise ValueError(f"Window count changed for {record['file_path']}; re-run preprocessing")
+                model_in = seqs.reshape(len(seqs), -1) if flatten else seqs
+                file_errs = _reconstruction_errors(model, model_in, device=device, flatten=flatten)
+                column.write(lo, file_errs)
             all_error_parts.append(file_errs)
             file_metrics.append(
                 {
@@ -164,12 +202,14 @@ def evaluate(model_type: str, log_interval_files: int | None = None) -> dict:
                     f"{model_type.upper()} AE eval (stream): file {file_pos + 1}/{len(file_records)} | "
                     f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
                 )
+        column.flush()
         all_errors = np.concatenate(all_error_parts, axis=0) if all_error_parts else np.array([], dtype=np.float32)
 
     diagnostics_dir = os.path.join(CONFIG["processed_folder"], "diagnostics")
     os.makedirs(diagnostics_dir, exist_ok=True)
     prefix = f"{model_type}_autoencoder"
-    np.save(os.path.join(diagnostics_dir, f"{prefix}_all_errors.npy"), all_errors)
+    if CONFIG.get("score_store_export_npy", True):
+        np.save(os.path.join(diagnostics_dir, f"{prefix}_all_errors.npy"), all_errors)
     np.save(os.path.join(diagnostics_dir, f"{prefix}_val_errors.npy"), val_errors)
     with open(os.path.join(diagnostics_dir, f"{prefix}_threshold.json"), "w", encoding="utf-8") as fh:
         json.dump(
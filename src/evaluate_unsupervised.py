@@ -7,12 +7,13 @@ import csv
 import json
 import logging
 import os
-from typing import Dict, List
+from typing import Dict
 
 import numpy as np
 
 from .config import CONFIG, configure_logging
-from .dataset import load_split_metadata
+from .file_index import FileIndex
+from .score_store import stored_file_anomaly_rates
 
 
 MODEL_ALIASES = {
@@ -109,7 +110,9 @@ def _resolve_model_name(model_type: str) -> str:
     return MODEL_ALIASES[key]
 
 
-def _load_file_artifacts(model_name: str, diagnostics_dir: str) -> np.ndarray:
+def _load_file_artifacts(model_name: str, diagnostics_dir: str, source: str = "artifacts") -> np.ndarray:
+    if source == "store":
+        return stored_file_anomaly_rates(model_name).astype(np.float32)
     scores_path = os.path.join(diagnostics_dir, f"{model_name}_file_scores.npy")
     if not os.path.exists(scores_path):
         raise FileNotFoundError(
@@ -120,27 +123,30 @@ def _load_file_artifacts(model_name: str, diagnostics_dir: str) -> np.ndarray:
     return scores
 
 
-def _indices_for_split(file_records: List[dict], split_name: str) -> np.ndarray:
-    indices = [i for i, rec in enumerate(file_records) if rec.get("split") == split_name]
-    return np.asarray(indices, dtype=np.int64)
+def _indices_for_split(file_index: FileIndex, split_name: str) -> np.ndarray:
+    rows = file_index.split_positions(split_name)
+    return np.arange(rows.start, rows.stop, dtype=np.int64)
 
 
-def evaluate_model(model_type: str) -> Dict[str, object]:
-    """Evaluate unsupervised behavior for one model."""
+def evaluate_model(model_type: str, source: str = "artifacts") -> Dict[str, object]:
+    """Evaluate unsupervised behavior for one model.
+
+    `source="store"` derives per-file anomaly rates from the per-window
+    score store instead of `<model>_file_scores.npy`.
+    """
     model_name = _resolve_model_name(model_type)
     diagnostics_dir = os.path.join(CONFIG["processed_folder"], "diagnostics")
-    scores = _load_file_artifacts(model_name, diagnostics_dir)
-    split_meta = load_split_metadata() or {}
-    file_records = split_meta.get("file_records", [])
-    if len(file_records) != int(scores.shape[0]):
+    scores = _load_file_artifacts(model_name, diagnostics_dir, source=source)
+    file_index = FileIndex.load()
+    if len(file_index) != int(scores.shape[0]):
         raise ValueError(
-            f"split_metadata file_records ({len(file_records)}) does not match file artifacts ({scores.shape[0]})."
+            f"split_metadata file_records ({len(file_index)}) does not match file artifacts ({scores.shape[0]})."
         )
 
     healthy_split = str(CONFIG["healthy_reference_split"])
     late_split = str(CONFIG["late_life_split"])
-    healthy_idx = _indices_for_split(file_records, healthy_split)
-    late_idx = _indices_for_split(file_records, late_split)
+    healthy_idx = _indices_for_split(file_index, healthy_split)
+    late_idx = _indices_for_split(file_index, late_split)
     if healthy_idx.size == 0:
         raise ValueError(f"No files found for healthy reference split: {healthy_split}")
     late_start = int(late_idx[0]) if late_idx.size > 0 else 0
@@ -237,10 +243,10 @@ def evaluate_model(model_type: str) -> Dict[str, object]:
     }
 
 
-def evaluate_all_models() -> Dict[str, object]:
+def evaluate_all_models(source: str = "artifacts") -> Dict[str, object]:
     diagnostics_dir = os.path.join(CONFIG["processed_folder"], "diagnostics")
     models = ["isolation_forest", "dense_autoencoder", "lstm_autoencoder"]
-    rows = [evaluate_model(model) for model in models]
+    rows = [evaluate_model(model, source=source) for model in models]
     out_json = os.path.join(diagnostics_dir, "unsupervised_model_comparison.json")
     with open(out_json, "w", encoding="utf-8") as fh:
         json.dump(rows, fh)
@@ -271,17 +277,23 @@ def main() -> None:
         default=None,
     )
     parser.add_argument("--all-models", action="store_true", help="Evaluate all supported models")
+    parser.add_argument(
+        "--source",
+        choices=["artifacts", "store"],
+        default="artifacts",
+        help="Read per-file scores from *_file_scores.npy or the per-window score store",
+    )
     parser.add_argument("--verbose", action="store_true")
     args = parser.parse_args()
 
     configure_logging(logging.DEBUG if args.verbose else logging.INFO)
     if args.all_models:
-        result = evaluate_all_models()
+        result = evaluate_all_models(source=args.source)
         logging.info("Saved unsupervised comparison to %s and %s", result["json_path"], result["csv_path"])
         return
     if args.model_type is None:
         raise ValueError("Provide --model-type or use --all-models")
-    result = evaluate_model(args.model_type)
+    result = evaluate_model(args.model_type, source=args.source)
     logging.info(
         "[%s] unsupervised metrics saved: %s",
         result["model"],
@@ -0,0 +1,160 @@
+"""Compact binary index of per-file window ranges.
+
+Preprocessing saves the `file_records` from `split_metadata.json` a second
+time, as a structured NumPy array next to it (`split_metadata.index.npy`).
+One row per file holds its split code, global window range, split-local
+window range and snapshot timestamp, so evaluators and samplers can fetch
+the window slice of a file or split in O(1) (or a time range with one
+binary search) instead of re-scanning the JSON records.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+
+import numpy as np
+
+from .config import CONFIG
+
+SPLIT_CODES = {"healthy_train": 0, "healthy_val": 1, "test_mixed": 2}
+SPLIT_NAMES = {code: name for name, code in SPLIT_CODES.items()}
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("file_idx", np.int64),
+        ("split", np.int8),
+        ("global_start", np.int64),
+        ("global_end", np.int64),
+        # -1 for test_mixed files, which have no split memmap.
+        ("split_start", np.int64),
+        ("split_end", np.int64),
+        ("timestamp", "datetime64[s]"),
+    ]
+)
+
+_TIMESTAMP_RE = re.compile(r"^(\d{4})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})$")
+
+
+def file_index_path(split_metadata_file: str | None = None) -> str:
+    """Return the binary index path stored next to the split metadata."""
+    base = split_metadata_file or CONFIG["split_metadata_file"]
+    return f"{os.path.splitext(base)[0]}.index.npy"
+
+
+def snapshot_timestamp(file_path: str) -> np.datetime64:
+    """Parse an IMS snapshot name (`YYYY.MM.DD.hh.mm.ss`), or return NaT."""
+    match = _TIMESTAMP_RE.match(os.path.basename(file_path))
+    if match is None:
+        return np.datetime64("NaT", "s")
+    y, mo, d, h, mi, s = match.groups()
+    return np.datetime64(f"{y}-{mo}-{d}T{h}:{mi}:{s}", "s")
+
+
+def build_file_index(file_records) -> np.ndarray:
+    """Convert `split_metadata.json` file records into an index array."""
+    index = np.empty(len(file_records), dtype=INDEX_DTYPE)
+    for row, record in enumerate(file_records):
+        index[row] = (
+            int(record["file_idx"]),
+            SPLIT_CODES[record["split"]],
+            int(record["global_start_idx"]),
+            int(record["global_end_idx"]),
+            int(record.get("split_start_idx", -1)),
+            int(record.get("split_end_idx", -1)),
+            snapshot_timestamp(record["file_path"]),
+        )
+    return index
+
+
+def save_file_index(file_records, path: str | None = None) -> str:
+    """Build and persist the index for `file_records`; return its path."""
+    path = path or file_index_path()
+    np.save(path, build_file_index(file_records))
+    return path
+
+
+class FileIndex:
+    """Window-range lookups over the persisted file index.
+
+    Positions (`pos`) are row numbers in file order, i.e. the same order
+    as `file_records` and the per-file diagnostics arrays.
+    """
+
+    def __init__(self, index: np.ndarray):
+        self.records = np.asarray(index, dtype=INDEX_DTYPE)
+        n = len(self.records)
+        max_idx = int(self.records["file_idx"].max()) if n else -1
+        # Dense file_idx -> position table; files skipped at ingest map to -1.
+        self._pos_by_file = np.full(max_idx + 1, -1, dtype=np.int64)
+        self._pos_by_file[self.records["file_idx"]] = np.arange(n, dtype=np.int64)
+        self._split_bounds = {}
+        for name, code in SPLIT_CODES.items():
+            positions = np.flatnonzero(self.records["split"] == code)
+            self._split_bounds[name] = (int(positions[0]), int(positions[-1]) + 1) if positions.size else (0, 0)
+
+    @classmethod
+    def load(cls, path: str | None = None) -> "FileIndex":
+        """Load the index, rebuilding it from split metadata if it is missing."""
+        path = path or file_index_path()
+        if os.path.exists(path):
+            return cls(np.load(path))
+        from .dataset import load_split_metadata
+
+        split_meta = load_split_metadata()
+        if not split_meta:
+            raise FileNotFoundError(f"File index not found: {path}. Run preprocessing to create it.")
+        return cls(build_file_index(split_meta.get("file_records", [])))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def num_windows(self) -> int:
+        return int(self.records["global_end"][-1]) if len(self) else 0
+
+    def position(self, file_idx: int) -> int:
+        """Return the row of `file_idx`; raise KeyError if it has no windows."""
+        pos = int(self._pos_by_file[file_idx]) if 0 <= file_idx < len(self._pos_by_file) else -1
+        if pos < 0:
+            raise KeyError(f"file_idx {file_idx} is not in the index")
+        return pos
+
+    def file_slice(self, file_idx: int, split: str = "all") -> slice:
+        """Return the window slice of a file in the `all` or its split memmap."""
+        row = self.records[self.position(file_idx)]
+        if split == "all":
+            return slice(int(row["global_start"]), int(row["global_end"]))
+        if SPLIT_NAMES[int(row["split"])] != split or row["split_start"] < 0:
+            raise KeyError(f"file_idx {file_idx} is not stored in split {split}")
+        return slice(int(row["split_start"]), int(row["split_end"]))
+
+    def split_positions(self, split: str) -> slice:
+        """Return the rows of a split; files are assigned to splits in order."""
+        return slice(*self._split_bounds.get(split, (0, 0)))
+
+    def split_slice(self, split: str) -> slice:
+        """Return the windows of `split` within the `all` memmap."""
+        lo, hi = self._split_bounds.get(split, (0, 0))
+        if lo == hi:
+            return slice(0, 0)
+        return slice(int(self.records["global_start"][lo]), int(self.records["global_end"][hi - 1]))
+
+    def time_positions(self, start=None, end=None) -> slice:
+        """Return rows whose snapshot time falls in `[start, end)`."""
+        stamps = self.records["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(stamps, np.datetime64(start, "s"), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(stamps, np.datetime64(end, "s"), side="left"))
+        return slice(lo, max(lo, hi))
+
+    def time_slice(self, start=None, end=None) -> slice:
+        """Return the `all` window slice covering snapshots in `[start, end)`."""
+        rows = self.time_positions(start, end)
+        if rows.start == rows.stop:
+            return slice(0, 0)
+        return slice(int(self.records["global_start"][rows.start]), int(self.records["global_end"][rows.stop - 1]))
+
+    def window_bounds(self, positions: slice | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Return `(starts, ends)` of the global window ranges for rows."""
+        rows = self.records if positions is None else self.records[positions]
+        return rows["global_start"], rows["global_end"]
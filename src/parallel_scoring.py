@@ -0,0 +1,126 @@
+"""Process-parallel IsolationForest scoring over memmapped splits.
+
+`score_split_parallel` shards a split's window rows into contiguous
+ranges and scores them in a process pool. Each worker loads the model
+and opens the split dataset once, in its initializer. Datasets are
+memory-mapped, so workers read only their own rows, with nothing pickled
+across the pool. Each worker writes its scores straight into a
+preallocated float64 output memmap. Rows are scored independently, so
+the result is identical to serial `decision_function` for any worker count.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .compiled_forest import load_if_scorer
+from .config import CONFIG
+from .dataset import load_memmap_dataset
+from .logging_utils import fmt_seconds, log_progress
+
+_WORKER_STATE = {}
+
+
+def _init_score_worker(config, model_path, split, out_path, num_rows):
+    """Process-pool initializer: load the model and open input/output once."""
+    CONFIG.update(config)
+    model = load_if_scorer(model_path)
+    # Parallelism comes from the pool; keep each worker single-threaded.
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    _WORKER_STATE["model"] = model
+    _WORKER_STATE["data"] = load_memmap_dataset(flatten_for_tree=True, split=split)
+    _WORKER_STATE["out"] = np.memmap(out_path, dtype=np.float64, mode="r+", shape=(num_rows,))
+
+
+def _score_range(task):
+    """Score rows `[start, end)` into the shared output memmap."""
+    start, end, batch_size = task
+    model = _WORKER_STATE["model"]
+    data = _WORKER_STATE["data"]
+    out = _WORKER_STATE["out"]
+    for lo in range(start, end, batch_size):
+        hi = min(lo + batch_size, end)
+        out[lo:hi] = model.decision_function(data[lo:hi])
+    out.flush()
+    return end - start
+
+
+def score_ranges(num_rows: int, workers: int, batch_size: int) -> list[tuple[int, int, int]]:
+    """Split `num_rows` into contiguous tasks, several per worker for balance."""
+    if num_rows <= 0:
+        return []
+    chunk = max(1, min(batch_size, -(-num_rows // (workers * 4))))
+    return [(lo, min(lo + chunk, num_rows), batch_size) for lo in range(0, num_rows, chunk)]
+
+
+def score_split_parallel(
+    model_path: str,
+    split: str = "all",
+    workers: int | None = None,
+    batch_size: int | None = None,
+    out_path: str | None = None,
+    progress_label: str | None = None,
+    ranges: list[tuple[int, int]] | None = None,
+) -> np.ndarray:
+    """Return IsolationForest decision scores for every window of `split`.
+
+    Args:
+        model_path: joblib-saved IsolationForest (scored with
+            CONFIG["if_inference_engine"]).
+        split: dataset split to score.
+        workers: processes (defaults to CONFIG["if_score_workers"]).
+        batch_size: rows per `decision_function` call inside a worker.
+        out_path: output memmap path (defaults to
+            `<processed>/isolation_forest_<split>_scores.dat`).
+        ranges: only score these `[lo, hi)` row ranges into an existing
+            `out_path` (e.g. a score-store column); other rows are kept.
+    """
+    workers = max(1, int(workers or CONFIG.get("if_score_workers", 1)))
+    batch_size = int(batch_size or CONFIG.get("if_score_batch_size", 200_000))
+    out_path = out_path or os.path.join(CONFIG["processed_folder"], f"isolation_forest_{split}_scores.dat")
+    num_rows = len(load_memmap_dataset(flatten_for_tree=True, split=split))
+    if num_rows == 0:
+        return np.array([], dtype=np.float64)
+    if ranges is None:
+        out = np.memmap(out_path, dtype=np.float64, mode="w+", shape=(num_rows,))
+        out.flush()
+        ranges = [(0, num_rows)]
+    # Build the compiled-forest cache once here rather than racing in every worker.
+    load_if_scorer(model_path)
+
+    tasks = [
+        (lo + start, lo + end, size)
+        for lo, hi in ranges
+        for start, end, size in score_ranges(hi - lo, workers, batch_size)
+    ]
+    num_todo = sum(hi - lo for lo, hi in ranges)
+    start_time = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_score_worker,
+        initargs=(dict(CONFIG), model_path, split, out_path, num_rows),
+    ) as pool:
+        for task_idx, rows in enumerate(pool.map(_score_range, tasks), start=1):
+            done += rows
+            if progress_label and task_idx % max(1, len(tasks) // 10) == 0:
+                elapsed = time.perf_counter() - start_time
+                eta_sec = elapsed / done * (num_todo - done)
+                log_progress(
+                    f"{progress_label}: {done}/{num_todo} rows | "
+                    f"elapsed={fmt_seconds(elapsed)} | eta={fmt_seconds(eta_sec)}"
+                )
+    logging.info(
+        "Parallel IF scoring | split=%s rows=%s workers=%s | %.1f rows/s",
+        split,
+        num_todo,
+        workers,
+        num_todo / max(time.perf_counter() - start_time, 1e-9),
+    )
+    return np.memmap(out_path, dtype=np.float64, mode="r", shape=(num_rows,))
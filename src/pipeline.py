@@ -9,28 +9,81 @@ import os
 import shutil
 import time
 from datetime import datetime
+from functools import partial
 from typing import Any
 
 from .config import CONFIG, configure_logging, ensure_output_dirs
+from .discovery import raw_listing_digest
+from .eval_cache import cached_evaluation
 from .evaluate import machine_health_curve
 from .evaluate_autoencoder import evaluate as evaluate_autoencoder
 from .evaluate_unsupervised import evaluate_all_models
 from .logging_utils import fmt_seconds, log_note, log_ok, log_progress, log_section, log_step
-from .preprocessing import create_memmap_dataset, fit_global_scaler
+from .pipeline_dag import Step, run_dag
+from .preprocessing import run_ingest
 from .train_dense_autoencoder import train as train_dense_autoencoder
 from .train_isolation_forest import train as train_isolation_forest
 from .train_lstm_autoencoder import train as train_lstm_autoencoder
+from .trainer import add_trainer_arguments, apply_trainer_arguments
 from .utils import list_ims_files
 
-
-def _run_preprocessing(preprocess_limit: int | None = None, data_folder: str | None = None) -> dict[str, Any]:
+# CONFIG keys folded into each step's fingerprint; a change re-runs the step.
+_DATASET_KEYS = ("sequence_length", "stride", "dataset_layout", "channel_mode", "storage_dtype")
+_AE_TRAIN_KEYS = (
+    "random_seed",
+    "torch_batch_size",
+    "learning_rate",
+    "weight_decay",
+    "epochs",
+    "early_stopping_patience",
+    "torch_amp_bf16",
+    "grad_accumulation_steps",
+)
+_STEP_CONFIG_KEYS = {
+    "preprocessing": _DATASET_KEYS
+    + (
+        "batch_size",
+        "healthy_files",
+        "num_files_to_process",
+        "healthy_train_files",
+        "healthy_val_files",
+        "storage_int16_clip_sigma",
+        "memmap_shard_bytes",
+        "create_all_memmap",
+        "max_all_memmap_bytes",
+    ),
+    "if_train": ("n_estimators", "contamination", "max_train_samples", "random_seed"),
+    "if_eval": _DATASET_KEYS + ("score_threshold_percentile",),
+    "dense_train": _AE_TRAIN_KEYS + ("dense_latent_dim",),
+    "dense_eval": _DATASET_KEYS + ("ae_error_threshold_percentile",),
+    "lstm_train": _AE_TRAIN_KEYS + ("lstm_hidden_size", "lstm_num_layers", "lstm_dropout"),
+    "lstm_eval": _DATASET_KEYS + ("ae_error_threshold_percentile",),
+    "unsupervised_eval": (
+        "healthy_reference_split",
+        "late_life_split",
+        "unsup_alert_percentile",
+        "persistence_k",
+        "persistence_m",
+        "max_false_alarm_rate_healthy",
+        "trend_min_spearman",
+    ),
+}
+# Per-model diagnostics written by IF/AE evaluation that later steps read.
+_EVAL_OUTPUTS = ("file_scores.npy", "file_metrics.json", "threshold.json")
+
+
+def _run_preprocessing(
+    preprocess_limit: int | None = None,
+    data_folder: str | None = None,
+    ingest_mode: str | None = None,
+    workers: int | None = None,
+) -> dict[str, Any]:
     folder = data_folder or CONFIG["data_folder"]
     files = list_ims_files(folder, seq_length=CONFIG["sequence_length"])
     if preprocess_limit is not None and preprocess_limit > 0:
         files = files[:preprocess_limit]
-    scaler = fit_global_scaler(files)
-    outputs = create_memmap_dataset(files, scaler)
-    return {"num_files": len(files), "outputs": outputs}
+    _, outputs, ingest_stats = run_ingest(files, mode=ingest_mode, workers=workers)
+    return {"num_files": len(files), "outputs": outputs, "ingest_stats": ingest_stats}
 
 
 def _detect_device() -> str:
@@ -58,6 +111,8 @@ def run(
     preprocess: bool = True,
     preprocess_limit: int | None = None,
     data_folder: str | None = None,
+    ingest_mode: str | None = None,
+    preprocess_workers: int | None = None,
     run_if: bool = True,
     if_train_limit: int | None = None,
     if_eval_limit: int | None = None,
@@ -76,11 +131,21 @@ def run(
     save_run_artifacts: bool = True,
     log_path: str | None = None,
     cli_args: dict[str, Any] | None = None,
+    force: bool = False,
+    max_parallel_steps: int | None = None,
+    resume: bool = False,
 ) -> dict[str, Any]:
-    """Run selected pipeline steps with configurable limits."""
+    """Run selected pipeline steps with configurable limits.
+
+    Steps form a DAG (see `pipeline_dag.py`): independent branches run
+    concurrently, and steps whose outputs are newer than their inputs
+    with an unchanged config fingerprint are skipped unless `force`.
+    With `resume`, AE training steps that run continue from their last
+    full training checkpoint; a step interrupted mid-run is never
+    skipped, so its checkpoint is picked up on the next run.
+    """
     ensure_output_dirs()
     started_at = datetime.now().isoformat()
-    step_times: dict[str, float] = {}
     summary: dict[str, Any] = {
         "status": "ok",
         "run_tag": run_tag,
@@ -95,86 +160,168 @@ def run(
     if log_path:
         log_note(f"Log file: {log_path}")
 
-    def _run_step(step_name: str, fn):
-        log_step(f"Starting {step_name}")
-        step_start = time.perf_counter()
-        result = fn()
-        duration_sec = time.perf_counter() - step_start
-        step_times[step_name] = duration_sec
-        log_ok(f"Completed {step_name} in {fmt_seconds(duration_sec)}")
-        return result
+    processed = CONFIG["processed_folder"]
+    diagnostics_dir = os.path.join(processed, "diagnostics")
+    if_model_path = os.path.join(processed, "isolation_forest.model")
+    dataset_artifacts = [CONFIG["split_metadata_file"], CONFIG["scaler_file"]]
+
+    def _fingerprint(step_name: str, **params):
+        return {"config": {key: CONFIG.get(key) for key in _STEP_CONFIG_KEYS[step_name]}, "params": params}
 
+    def _eval_summary(result):
+        return {
+            "threshold": result.get("threshold"),
+            "diagnostics_dir": result.get("diagnostics_dir"),
+            "eval_cache_hit": result.get("cache_hit", False),
+        }
+
+    steps = []
     if preprocess:
-        summary["preprocessing"] = _run_step(
-            "preprocessing",
-            lambda: _run_preprocessing(
-                preprocess_limit=preprocess_limit,
-                data_folder=data_folder,
-            ),
+        steps.append(
+            Step(
+                "preprocessing",
+                lambda: _run_preprocessing(
+                    preprocess_limit=preprocess_limit,
+                    data_folder=data_folder,
+                    ingest_mode=ingest_mode,
+                    workers=preprocess_workers,
+                ),
+                # The raw listing is part of the fingerprint rather than an
+                # input: append mode leaves the scaler (and, with no new files,
+                # every output) untouched, so folder mtimes would re-run it forever.
+                outputs=dataset_artifacts,
+                fingerprint=_fingerprint(
+                    "preprocessing",
+                    limit=preprocess_limit,
+                    data_folder=data_folder,
+                    ingest_mode=ingest_mode,
+                    raw_files=raw_listing_digest(data_folder or CONFIG["data_folder"]),
+                ),
+            )
         )
-
     if run_if:
-        model_path = _run_step(
-            "if_train",
-            lambda: train_isolation_forest(limit=if_train_limit),
+        steps.append(
+            Step(
+                "if_train",
+                lambda: train_isolation_forest(limit=if_train_limit),
+                deps=["preprocessing"],
+                inputs=dataset_artifacts,
+                outputs=[if_model_path],
+                fingerprint=_fingerprint("if_train", limit=if_train_limit),
+            )
         )
-        if_result = _run_step(
-            "if_eval",
-            lambda: machine_health_curve(limit=if_eval_limit, log_interval_files=log_interval_files),
-        )
-        summary["isolation_forest"] = {
-            "model_path": model_path,
-            "threshold": if_result.get("threshold"),
-            "diagnostics_dir": if_result.get("diagnostics_dir"),
-        }
-
-    if run_dense:
-        dense_path = _run_step(
-            "dense_train",
-            lambda: train_dense_autoencoder(
-                epochs=dense_epochs,
-                max_train_batches=dense_max_train_batches,
-                max_val_batches=dense_max_val_batches,
-                log_interval_batches=log_interval_batches,
-            ),
+        steps.append(
+            Step(
+                "if_eval",
+                lambda: _eval_summary(
+                    cached_evaluation(
+                        "isolation_forest",
+                        lambda: machine_health_curve(limit=if_eval_limit, log_interval_files=log_interval_files),
+                        params={"limit": if_eval_limit},
+                    )
+                ),
+                deps=["if_train"],
+                inputs=dataset_artifacts + [if_model_path],
+                outputs=[os.path.join(diagnostics_dir, f"isolation_forest_{name}") for name in _EVAL_OUTPUTS],
+                fingerprint=_fingerprint("if_eval", limit=if_eval_limit),
+                resources=["diagnostics"],
+            )
         )
-        dense_eval = _run_step(
-            "dense_eval",
-            lambda: evaluate_autoencoder(model_type="dense", log_interval_files=log_interval_files),
+    for model_type, enabled, epochs, max_train_batches, max_val_batches, trainer in (
+        ("dense", run_dense, dense_epochs, dense_max_train_batches, dense_max_val_batches, train_dense_autoencoder),
+        ("lstm", run_lstm, lstm_epochs, lstm_max_train_batches, lstm_max_val_batches, train_lstm_autoencoder),
+    ):
+        if not enabled:
+            continue
+        checkpoint = CONFIG[f"{model_type}_autoencoder_model_file"]
+        steps.append(
+            Step(
+                f"{model_type}_train",
+                partial(
+                    trainer,
+                    epochs=epochs,
+                    max_train_batches=max_train_batches,
+                    max_val_batches=max_val_batches,
+                    log_interval_batches=log_interval_batches,
+                    resume=resume,
+                ),
+                deps=["preprocessing"],
+                inputs=dataset_artifacts,
+                outputs=[checkpoint],
+                fingerprint=_fingerprint(
+                    f"{model_type}_train",
+                    epochs=epochs,
+                    max_train_batches=max_train_batches,
+                    max_val_batches=max_val_batches,
+                ),
+                # Both trainers reseed the global torch RNG; running them one
+                # at a time keeps seeded runs reproducible.
+                resources=["torch_rng"],
+            )
         )
-        summary["dense_autoencoder"] = {
-            "model_path": dense_path,
-            "threshold": dense_eval.get("threshold"),
-            "diagnostics_dir": dense_eval.get("diagnostics_dir"),
-        }
-
-    if run_lstm:
-        lstm_path = _run_step(
-            "lstm_train",
-            lambda: train_lstm_autoencoder(
-                epochs=lstm_epochs,
-                max_train_batches=lstm_max_train_batches,
-                max_val_batches=lstm_max_val_batches,
-                log_interval_batches=log_interval_batches,
-            ),
+        steps.append(
+            Step(
+                f"{model_type}_eval",
+                partial(
+                    lambda kind: _eval_summary(
+                        cached_evaluation(
+                            f"{kind}_autoencoder",
+                            lambda: evaluate_autoencoder(model_type=kind, log_interval_files=log_interval_files),
+                        )
+                    ),
+                    model_type,
+                ),
+                deps=[f"{model_type}_train"],
+                inputs=dataset_artifacts + [checkpoint],
+                outputs=[os.path.join(diagnostics_dir, f"{model_type}_autoencoder_{name}") for name in _EVAL_OUTPUTS],
+                fingerprint=_fingerprint(f"{model_type}_eval"),
+                resources=["diagnostics"],
+            )
         )
-        lstm_eval = _run_step(
-            "lstm_eval",
-            lambda: evaluate_autoencoder(model_type="lstm", log_interval_files=log_interval_files),
+    if run_unsupervised_eval:
+        score_inputs = [
+            os.path.join(diagnostics_dir, f"{model}_{name}")
+            for model in ("isolation_forest", "dense_autoencoder", "lstm_autoencoder")
+            for name in _EVAL_OUTPUTS
+        ]
+        steps.append(
+            Step(
+                "unsupervised_eval",
+                evaluate_all_models,
+                deps=["if_eval", "dense_eval", "lstm_eval"],
+                inputs=[CONFIG["split_metadata_file"]] + score_inputs,
+                outputs=[os.path.join(diagnostics_dir, "unsupervised_model_comparison.json")],
+                fingerprint=_fingerprint("unsupervised_eval"),
+                resources=["diagnostics"],
+            )
         )
-        summary["lstm_autoencoder"] = {
-            "model_path": lstm_path,
-            "threshold": lstm_eval.get("threshold"),
-            "diagnostics_dir": lstm_eval.get("diagnostics_dir"),
-        }
 
-    if run_unsupervised_eval:
-        summary["unsupervised"] = _run_step("unsupervised_eval", evaluate_all_models)
+    log_note(f"Pipeline DAG: {', '.join(step.name for step in steps)}")
+    dag_start = time.perf_counter()
+    records = run_dag(steps, max_parallel=max_parallel_steps, force=force)
+    wall_duration_sec = time.perf_counter() - dag_start
+    step_times = {step.name: records[step.name]["duration_sec"] for step in steps}
+    summary["steps"] = {
+        name: {key: record[key] for key in ("cache_hit", "reason", "duration_sec")} for name, record in records.items()
+    }
+    if "preprocessing" in records:
+        summary["preprocessing"] = records["preprocessing"]["result"]
+    if "if_train" in records:
+        summary["isolation_forest"] = dict(model_path=records["if_train"]["result"], **records["if_eval"]["result"])
+    for model_type in ("dense", "lstm"):
+        if f"{model_type}_train" in records:
+            summary[f"{model_type}_autoencoder"] = dict(
+                model_path=records[f"{model_type}_train"]["result"], **records[f"{model_type}_eval"]["result"]
+            )
+    if "unsupervised_eval" in records:
+        summary["unsupervised"] = records["unsupervised_eval"]["result"]
 
     finished_at = datetime.now().isoformat()
     summary["finished_at"] = finished_at
     summary["step_durations_sec"] = step_times
     summary["total_duration_sec"] = float(sum(step_times.values()))
+    # Branches overlap, so wall time can be shorter than the sum of steps.
+    summary["wall_duration_sec"] = float(wall_duration_sec)
     summary["log_path"] = log_path
     summary["args"] = cli_args or {}
 
@@ -184,7 +331,14 @@ def run(
     with open(os.path.join(run_dir, "run_metadata.json"), "w", encoding="utf-8") as fh:
         json.dump(summary, fh)
     with open(os.path.join(run_dir, "timings.json"), "w", encoding="utf-8") as fh:
-        json.dump(step_times, fh)
+        json.dump(
+            dict(
+                step_times,
+                cache_hits={name: record["cache_hit"] for name, record in records.items()},
+                wall_duration_sec=wall_duration_sec,
+            ),
+            fh,
+        )
 
     if save_run_artifacts:
         diagnostics_src = os.path.join(CONFIG["processed_folder"], "diagnostics")
@@ -193,9 +347,10 @@ def run(
         _copy_if_exists(CONFIG["scaler_file"], os.path.join(run_dir, "global_scaler.save"))
 
     log_section(f"[{run_tag}] PIPELINE COMPLETE")
-    log_note(f"Total runtime: {fmt_seconds(summary['total_duration_sec'])}")
+    log_note(f"Total runtime: {fmt_seconds(wall_duration_sec)} (steps: {fmt_seconds(summary['total_duration_sec'])})")
     for step_name, seconds in step_times.items():
-        log_note(f"{step_name}: {fmt_seconds(seconds)}")
+        cached = " (up to date, skipped)" if records[step_name]["cache_hit"] else ""
+        log_note(f"{step_name}: {fmt_seconds(seconds)}{cached}")
     log_ok(f"Run outputs saved to {run_dir}")
     return summary
 
@@ -211,10 +366,18 @@ def main() -> None:
     parser.add_argument("--skip-preprocess", action="store_true")
     parser.add_argument("--preprocess-limit", type=int, default=None)
     parser.add_argument("--data-folder", type=str, default=None)
+    parser.add_argument("--ingest-mode", choices=["single_pass", "two_pass", "append"], default=None)
+    parser.add_argument("--dataset-layout", choices=["dense", "virtual"], default=None)
+    parser.add_argument("--channel-mode", choices=["flatten", "per_channel"], default=None)
+    parser.add_argument("--storage-dtype", choices=["float32", "float16", "int16"], default=None)
+    parser.add_argument("--shard-bytes", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for preprocessing")
 
     parser.add_argument("--skip-if", action="store_true")
     parser.add_argument("--if-train-limit", type=int, default=None)
     parser.add_argument("--if-eval-limit", type=int, default=None)
+    parser.add_argument("--if-score-workers", type=int, default=None, help="Processes for IF scoring of the all memmap")
+    parser.add_argument("--if-engine", choices=["compiled", "sklearn"], default=None, help="IsolationForest inference engine")
 
     parser.add_argument("--skip-dense", action="store_true")
     parser.add_argument("--dense-epochs", type=int, default=None)
@@ -227,11 +390,31 @@ def main() -> None:
     parser.add_argument("--lstm-max-val-batches", type=int, default=None)
 
     parser.add_argument("--skip-unsupervised", action="store_true")
+    parser.add_argument("--no-eval-cache", action="store_true", help="Always recompute IF/AE evaluation diagnostics")
+    parser.add_argument("--force", action="store_true", help="Re-run every step even if its outputs are up to date")
+    parser.add_argument("--max-parallel-steps", type=int, default=None, help="Pipeline steps run concurrently")
+    parser.add_argument("--resume", action="store_true", help="Resume AE training from the last full checkpoints")
+    add_trainer_arguments(parser)
     args = parser.parse_args()
 
     configure_logging(logging.DEBUG if args.verbose else logging.INFO)
     if args.seed is not None:
         CONFIG["random_seed"] = int(args.seed)
+    if args.dataset_layout is not None:
+        CONFIG["dataset_layout"] = args.dataset_layout
+    if args.channel_mode is not None:
+        CONFIG["channel_mode"] = args.channel_mode
+    if args.storage_dtype is not None:
+        CONFIG["storage_dtype"] = args.storage_dtype
+    if args.shard_bytes is not None:
+        CONFIG["memmap_shard_bytes"] = args.shard_bytes
+    if args.if_score_workers is not None:
+        CONFIG["if_score_workers"] = args.if_score_workers
+    if args.if_engine:
+        CONFIG["if_inference_engine"] = args.if_engine
+    if args.no_eval_cache:
+        CONFIG["eval_cache_enabled"] = False
+    apply_trainer_arguments(args)
     run_tag = args.run_tag or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_seed{CONFIG['random_seed']}"
 
     logs_dir = os.path.join(CONFIG["processed_folder"], "logs")
@@ -246,6 +429,8 @@ def main() -> None:
         preprocess=not args.skip_preprocess,
         preprocess_limit=args.preprocess_limit,
         data_folder=args.data_folder,
+        ingest_mode=args.ingest_mode,
+        preprocess_workers=args.workers,
         run_if=not args.skip_if,
         if_train_limit=args.if_train_limit,
         if_eval_limit=args.if_eval_limit,
@@ -264,6 +449,9 @@ def main() -> None:
         save_run_artifacts=not args.no_save_run_artifacts,
         log_path=log_path,
         cli_args=vars(args),
+        force=args.force,
+        max_parallel_steps=args.max_parallel_steps,
+        resume=args.resume,
     )
 
 
@@ -0,0 +1,207 @@
+"""Step-level DAG scheduler with artifact-based skipping.
+
+A pipeline is a list of `Step`s, each declaring:
+
+- the steps it depends on,
+- the artifact paths it reads (`inputs`) and writes (`outputs`),
+- a JSON-serializable config `fingerprint`.
+
+`run_dag` starts every step whose dependencies are done on a thread pool,
+so independent branches overlap. Steps that share a `resources` tag never
+overlap (e.g. matplotlib/diagnostics writers, or trainers that seed the
+global torch RNG).
+
+A step is skipped (a cache hit) when all of these hold:
+
+- every output exists and is at least as new as every input;
+- its fingerprint matches the one recorded when it last ran;
+- no dependency re-ran in this run.
+
+The result recorded when it last ran is then reused. A step's record is
+dropped before it starts, so a step that failed or was killed part way
+(possibly after writing some outputs) always runs again. State is kept
+in `<processed>/pipeline_state.json`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import CONFIG
+from .logging_utils import fmt_seconds, log_note, log_ok, log_step
+
+
+class Step:
+    """One pipeline step and its declared dependencies and artifacts."""
+
+    def __init__(self, name, fn, deps=(), inputs=(), outputs=(), fingerprint=None, resources=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.fingerprint = fingerprint_of(fingerprint or {})
+        self.resources = frozenset(resources)
+
+
+def fingerprint_of(payload) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def state_path() -> str:
+    return os.path.join(CONFIG["processed_folder"], "pipeline_state.json")
+
+
+def _load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        logging.warning("Ignoring unreadable pipeline state %s", path)
+        return {}
+
+
+def _save_state(path: str, state: dict) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _mtime(path: str) -> float | None:
+    """Newest mtime of a file, or of a directory and its direct entries."""
+    if not os.path.exists(path):
+        return None
+    newest = os.stat(path).st_mtime
+    if os.path.isdir(path):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                newest = max(newest, entry.stat().st_mtime)
+    return newest
+
+
+def skip_reason(step: Step, state: dict, rerun_deps: set[str]) -> str | None:
+    """Return why `step` must run, or None when its outputs are current."""
+    if not step.outputs:
+        return "no declared outputs"
+    previous = state.get(step.name)
+    if previous is None:
+        return "never ran"
+    if previous.get("fingerprint") != step.fingerprint:
+        return "config fingerprint changed"
+    changed_deps = sorted(rerun_deps.intersection(step.deps))
+    if changed_deps:
+        return f"upstream re-ran ({', '.join(changed_deps)})"
+    output_times = [_mtime(path) for path in step.outputs]
+    if any(stamp is None for stamp in output_times):
+        return "missing outputs"
+    input_times = [stamp for stamp in (_mtime(path) for path in step.inputs) if stamp is not None]
+    if input_times and max(input_times) > min(output_times):
+        return "inputs newer than outputs"
+    return None
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+def run_dag(steps, max_parallel: int | None = None, force: bool = False, path: str | None = None) -> dict:
+    """Run `steps` respecting dependencies; return per-step records.
+
+    Each record has `result`, `cache_hit`, `reason` and `duration_sec`.
+    Dependencies naming steps that are not in `steps` (disabled branches)
+    are ignored. The first step failure stops scheduling new steps; steps
+    already running finish, then the error is raised.
+    """
+    steps = list(steps)
+    names = {step.name for step in steps}
+    if len(names) != len(steps):
+        raise ValueError("Duplicate step names in pipeline DAG")
+    deps = {step.name: [dep for dep in step.deps if dep in names] for step in steps}
+    max_parallel = max(1, int(max_parallel or CONFIG.get("pipeline_max_parallel_steps", 2)))
+    path = path or state_path()
+    state = _load_state(path)
+
+    records: dict[str, dict] = {}
+    rerun: set[str] = set()
+    pending = list(steps)
+    running = {}
+    held: set[str] = set()
+    failure = None
+
+    def execute(step: Step, reason: str):
+        start = time.perf_counter()
+        log_step(f"Starting {step.name} ({reason})")
+        return {"result": step.fn(), "cache_hit": False, "reason": reason}, start
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            progressed = True
+            while failure is None and progressed:
+                progressed = False
+                for step in list(pending):
+                    if any(dep not in records for dep in deps[step.name]):
+                        continue
+                    # Skip checks run here, on the scheduler thread, so the
+                    # shared state is only touched between step completions.
+                    start = time.perf_counter()
+                    reason = "forced" if force else skip_reason(step, state, rerun)
+                    if reason is None:
+                        pending.remove(step)
+                        log_ok(f"Skipping {step.name} (outputs up to date)")
+                        records[step.name] = {
+                            "result": state[step.name].get("result"),
+                            "cache_hit": True,
+                            "reason": "up to date",
+                            "duration_sec": time.perf_counter() - start,
+                        }
+                        progressed = True
+                        continue
+                    if len(running) >= max_parallel or step.resources & held:
+                        continue
+                    pending.remove(step)
+                    held |= step.resources
+                    # Forget the last completion first: partial outputs of an
+                    # unfinished run must not look up to date next time.
+                    if state.pop(step.name, None) is not None:
+                        _save_state(path, state)
+                    running[pool.submit(execute, step, reason)] = step
+            if not running:
+                if pending and failure is None:
+                    raise ValueError(f"Unsatisfiable dependencies: {[step.name for step in pending]}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                held -= step.resources
+                try:
+                    record, start = future.result()
+                except Exception as exc:
+                    logging.exception("Step %s failed", step.name)
+                    failure = failure or exc
+                    continue
+                record["duration_sec"] = time.perf_counter() - start
+                records[step.name] = record
+                if not record["cache_hit"]:
+                    rerun.add(step.name)
+                    state[step.name] = {
+                        "fingerprint": step.fingerprint,
+                        "result": _jsonable(record["result"]),
+                        "completed_at": time.time(),
+                    }
+                    _save_state(path, state)
+                    log_ok(f"Completed {step.name} in {fmt_seconds(record['duration_sec'])}")
+    if failure is not None:
+        raise failure
+    skipped = [name for name, record in records.items() if record["cache_hit"]]
+    if skipped:
+        log_note(f"Up-to-date steps skipped: {', '.join(skipped)}")
+    return records
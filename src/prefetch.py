@@ -0,0 +1,80 @@
+"""Bounded, order-preserving prefetch for streaming evaluation.
+
+Streaming evaluators alternate between text/IO-bound loading and
+CPU-bound model scoring. `prefetch_map` overlaps the two: a thread (or
+process) pool loads up to `depth` items ahead while the caller consumes
+the current one. Results are yielded strictly in input order, and at
+most `depth` loaded items are held at a time, so memory stays bounded.
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from .config import CONFIG
+from .preprocessing import load_signal
+
+
+def prefetch_map(fn, items, workers: int = 1, depth: int = 2, executor: str = "thread", initializer=None, initargs=()):
+    """Yield `fn(item)` for each item in order, computing up to `depth` ahead.
+
+    `depth <= 0` or `workers <= 0` disables prefetching and runs inline.
+    With `executor="process"`, `fn` and its results must be picklable.
+    """
+    if depth <= 0 or workers <= 0:
+        yield from map(fn, items)
+        return
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown prefetch executor: {executor}")
+    pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    pool = pool_cls(max_workers=workers, initializer=initializer, initargs=initargs)
+    pending = collections.deque()
+    source = iter(items)
+    try:
+        for item in itertools.islice(source, depth):
+            pending.append(pool.submit(fn, item))
+        while pending:
+            result = pending.popleft().result()
+            # Refill before yielding so loading overlaps the consumer's work.
+            for item in itertools.islice(source, 1):
+                pending.append(pool.submit(fn, item))
+            yield result
+    finally:
+        # Early exit (break/exception in the consumer) drops queued loads.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _init_prefetch_worker(config):
+    CONFIG.update(config)
+
+
+def load_scaled_signal(record, scaler):
+    """Load and scale one file; windows are taken by the consumer as views."""
+    return scaler.transform(load_signal(record["file_path"]))
+
+
+def prefetch_scaled_signals(file_records, scaler, workers=None, depth=None, executor=None):
+    """Yield `(file_pos, record, scaled_signal)` with background prefetch.
+
+    Defaults come from CONFIG["eval_prefetch_workers"],
+    CONFIG["eval_prefetch_depth"] and CONFIG["eval_prefetch_executor"].
+    Signals (not windows) cross the worker boundary, so process workers
+    never pickle the overlapping window copies.
+    """
+    workers = int(CONFIG.get("eval_prefetch_workers", 1) if workers is None else workers)
+    depth = int(CONFIG.get("eval_prefetch_depth", 2) if depth is None else depth)
+    executor = executor or CONFIG.get("eval_prefetch_executor", "thread")
+    signals = prefetch_map(
+        partial(load_scaled_signal, scaler=scaler),
+        file_records,
+        workers=workers,
+        depth=depth,
+        executor=executor,
+        initializer=_init_prefetch_worker if executor == "process" else None,
+        initargs=(dict(CONFIG),) if executor == "process" else (),
+    )
+    for file_pos, (record, scaled) in enumerate(zip(file_records, signals)):
+        yield file_pos, record, scaled
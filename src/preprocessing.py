@@ -10,54 +10,76 @@ Preprocessing pipeline:
 import os
 import json
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 import joblib
 from .config import CONFIG
-from .utils import list_ims_files, write_memmap_metadata
+from .file_index import save_file_index
+from .quantization import quantize, storage_params
+from .raw_cache import cached_shape, load_raw_matrix
+from .scaler_fit import array_moments, fit_moments, merge_moments, scaler_from_moments
+from .sharded_memmap import ShardedMemmap, is_sharded, remove_shards, rows_per_shard_for
+from .utils import list_ims_files, scan_ims_shape, write_memmap_metadata
+from .virtual_windows import save_window_index, window_span
+from .windowing import count_sequences, window_view, write_windows
 
 def create_sequences(signal, seq_length, stride=5):
-    """Convert 1D vibration signal into overlapping sequences"""
-    sequences = []
+    """Convert vibration signal into an owned array of overlapping sequences.
+
+    Use `window_view`/`write_windows` when a copy is not needed.
+    """
     # include the final window so counts match arithmetic formula
-    for i in range(0, len(signal) - seq_length + 1, stride):
-        sequences.append(signal[i:i+seq_length])
-    return np.array(sequences, dtype=np.float32)
+    return np.array(window_view(signal, seq_length, stride), dtype=np.float32)
 
 
-def count_sequences(signal_length, seq_length, stride):
-    """Return number of sliding windows without materializing sequences."""
-    if signal_length < seq_length:
-        return 0
-    return ((signal_length - seq_length) // stride) + 1
+def new_ingest_stats(mode):
+    """Return a counter dict describing how much parsing a run performed."""
+    return {
+        "mode": mode,
+        "file_parses": 0,
+        "cache_hits": 0,
+        "row_scans": 0,
+        "parse_seconds": 0.0,
+        "total_seconds": 0.0,
+    }
 
-def fit_global_scaler(files):
-    """Fit a single scaler on early-life healthy files only.
 
-    Using one global scaler preserves absolute amplitude shifts that
-    anomaly models rely on during later-life scoring.
+def _channel_mode():
+    """Return how raw file columns map to model channels."""
+    mode = CONFIG.get("channel_mode", "flatten")
+    if mode not in ("flatten", "per_channel"):
+        raise ValueError(f"Unknown channel_mode: {mode}")
+    return mode
+
+
+def load_signal(file_path, stats=None):
+    """Load one IMS file as a float32 signal.
+
+    Returns `(samples, 1)` with all columns interleaved in "flatten"
+    channel mode, or `(rows, columns)` in "per_channel" mode. Reads go
+    through the raw-signal cache, so repeated runs only parse text for
+    new or modified files.
     """
-    healthy_cutoff = CONFIG["healthy_files"]
-    sample_files = files[:healthy_cutoff]
+    matrix = load_raw_matrix(file_path, stats=stats)
+    if _channel_mode() == "per_channel":
+        return matrix
+    return matrix.reshape(-1, 1)
 
+
+def _scaler_sample_files(files):
+    """Return the early-life files used for scaler fitting."""
+    sample_files = files[: CONFIG["healthy_files"]]
     if len(sample_files) == 0:
         raise ValueError(
             "No files were found. Check your data path."
         )
+    return sample_files
 
-    scaler = StandardScaler()
-    total_rows = 0
-    fit_files = 0
-
-    for file_path in sample_files:
-        try:
-            signal = np.loadtxt(file_path, dtype=np.float32).reshape(-1, 1)
-            scaler.partial_fit(signal)
-            total_rows += int(signal.shape[0])
-            fit_files += 1
-        except Exception as e:
-            logging.warning("Skipping %s: %s", file_path, e)
 
+def _save_global_scaler(scaler, fit_files, total_rows):
+    """Validate, log, and persist a fitted global scaler."""
     if fit_files == 0:
         raise ValueError(
             "Files were discovered but none could be loaded. Check file format."
@@ -69,6 +91,75 @@ def fit_global_scaler(files):
     os.makedirs(CONFIG["processed_folder"], exist_ok=True)
     joblib.dump(scaler, os.path.join(CONFIG["processed_folder"], "global_scaler.save"))
 
+
+def _scaler_engine():
+    engine = CONFIG.get("scaler_fit_engine", "moments")
+    if engine not in ("moments", "partial_fit"):
+        raise ValueError(f"Unknown scaler_fit_engine: {engine}")
+    return engine
+
+
+def _fit_scaler_parallel(sample_files, workers, stats=None):
+    """Fit the global scaler from per-file moments merged across workers."""
+    moments, fit_files = fit_moments(
+        sample_files,
+        workers=workers,
+        columns_as_features=_channel_mode() == "per_channel",
+        stats=stats,
+    )
+    if fit_files == 0:
+        _save_global_scaler(None, 0, 0)
+    scaler = scaler_from_moments(moments)
+    _save_global_scaler(scaler, fit_files, int(moments[0]))
+    return scaler
+
+
+def _fit_scaler_serial(sample_files, keep_paths=(), stats=None):
+    """Fit the global scaler in-process, returning signals in `keep_paths`.
+
+    Returns:
+        tuple: (fitted scaler, {path: parsed signal} for kept files)
+    """
+    engine = _scaler_engine()
+    scaler = StandardScaler()
+    merged = (0, None, None)
+    total_rows = 0
+    fit_files = 0
+    parsed = {}
+    for file_path in sample_files:
+        try:
+            signal = load_signal(file_path, stats)
+            if engine == "partial_fit":
+                scaler.partial_fit(signal)
+            else:
+                moments = array_moments(signal)
+                merged = moments if merged[0] == 0 else merge_moments(merged, moments)
+            total_rows += int(signal.shape[0])
+            fit_files += 1
+        except Exception as e:
+            logging.warning("Skipping %s: %s", file_path, e)
+            continue
+        if file_path in keep_paths:
+            parsed[file_path] = signal
+    if engine == "moments" and fit_files > 0:
+        scaler = scaler_from_moments(merged)
+    _save_global_scaler(scaler, fit_files, total_rows)
+    return scaler, parsed
+
+
+def fit_global_scaler(files, stats=None, workers=None):
+    """Fit a single scaler on early-life healthy files only.
+
+    Using one global scaler preserves absolute amplitude shifts that
+    anomaly models rely on during later-life scoring. The default
+    "moments" engine merges per-file moments, computed in parallel when
+    `workers > 1`; the "partial_fit" engine is the legacy serial fit.
+    """
+    sample_files = _scaler_sample_files(files)
+    workers = int(workers or 1)
+    if workers > 1 and _scaler_engine() == "moments":
+        return _fit_scaler_parallel(sample_files, workers, stats=stats)
+    scaler, _ = _fit_scaler_serial(sample_files, stats=stats)
     return scaler
 
 
@@ -94,15 +185,16 @@ def _validate_split_config():
         )
 
 
-def _save_split_metadata(file_records, split_counts):
+def _dataset_layout():
+    """Return the configured on-disk layout for sequence datasets."""
+    layout = CONFIG.get("dataset_layout", "dense")
+    if layout not in ("dense", "virtual"):
+        raise ValueError(f"Unknown dataset_layout: {layout}")
+    return layout
+
+
+def _save_split_metadata(file_records, split_counts, all_memmap_enabled, all_bytes, channels=1):
     """Persist split metadata used by downstream evaluation and reporting."""
-    create_all = bool(CONFIG.get("create_all_memmap", True))
-    all_bytes = (
-        int(split_counts["all"])
-        * int(CONFIG["sequence_length"])
-        * np.dtype("float32").itemsize
-    )
-    all_memmap_enabled = create_all and all_bytes <= int(CONFIG.get("max_all_memmap_bytes", 3_500_000_000))
     payload = {
         "healthy_train_files": int(CONFIG["healthy_train_files"]),
         "healthy_val_files": int(CONFIG["healthy_val_files"]),
@@ -110,132 +202,226 @@ def _save_split_metadata(file_records, split_counts):
         "num_files_to_process": int(CONFIG["num_files_to_process"]),
         "file_records": file_records,
         "split_sequence_counts": split_counts,
+        "dataset_layout": _dataset_layout(),
+        "channel_mode": _channel_mode(),
+        "n_channels": int(channels),
+        "storage_dtype": storage_params()["dtype"],
         "all_memmap_enabled": bool(all_memmap_enabled),
         "estimated_all_memmap_bytes": int(all_bytes),
     }
     with open(CONFIG["split_metadata_file"], "w", encoding="utf-8") as fh:
         json.dump(payload, fh)
+    save_file_index(file_records)
 
 
-def create_memmap_dataset(files, scaler):
-    """Save split-aware sequences to memory-mapped datasets.
+def _build_file_records(files_to_process, signal_lengths, first_file_idx=0, split_counts=None, signal_cursor=None):
+    """Assign splits and global/split window offsets from per-file lengths.
 
-    Returns:
-        dict: Paths to generated memmaps and metadata.
+    Offsets depend only on signal lengths, so they can be computed before
+    any file is scaled or windowed. The virtual layout additionally gets
+    the offset of each file's signal span inside the all/split memmaps.
+    Append mode passes the existing counts/cursors to continue from.
     """
-    _validate_split_config()
     seq_length = CONFIG["sequence_length"]
     stride = CONFIG["stride"]
-    files_to_process = files[: CONFIG["num_files_to_process"]]
-
+    virtual = _dataset_layout() == "virtual"
     file_records = []
-    split_counts = {"healthy_train": 0, "healthy_val": 0, "test_mixed": 0, "all": 0}
-    # First pass computes exact per-file sequence counts before any
-    # allocation, which keeps memmap shapes deterministic.
-    for file_idx, fpath in enumerate(files_to_process):
-        signal = np.loadtxt(fpath, dtype=np.float32).reshape(-1, 1)
-        n_seqs = count_sequences(len(signal), seq_length, stride)
+    split_counts = dict(split_counts or {"healthy_train": 0, "healthy_val": 0, "test_mixed": 0, "all": 0})
+    signal_cursor = dict(signal_cursor or {"healthy_train": 0, "healthy_val": 0, "all": 0})
+    for file_idx, (fpath, signal_length) in enumerate(zip(files_to_process, signal_lengths), start=first_file_idx):
+        n_seqs = count_sequences(signal_length, seq_length, stride)
         if n_seqs <= 0:
             continue
         split_name = _split_name_for_file_idx(file_idx)
-        file_records.append(
-            {
-                "file_idx": int(file_idx),
-                "file_path": fpath,
-                "num_sequences": int(n_seqs),
-                "split": split_name,
-            }
-        )
+        span = window_span(n_seqs, seq_length, stride)
+        record = {
+            "file_idx": int(file_idx),
+            "file_path": fpath,
+            "num_sequences": int(n_seqs),
+            "split": split_name,
+            "global_start_idx": int(split_counts["all"]),
+            "global_end_idx": int(split_counts["all"] + n_seqs),
+        }
+        if virtual:
+            record["global_signal_start_idx"] = int(signal_cursor["all"])
+            signal_cursor["all"] += span
+        if split_name in ("healthy_train", "healthy_val"):
+            record["split_start_idx"] = int(split_counts[split_name])
+            record["split_end_idx"] = int(split_counts[split_name] + n_seqs)
+            if virtual:
+                record["split_signal_start_idx"] = int(signal_cursor[split_name])
+                signal_cursor[split_name] += span
+        file_records.append(record)
         split_counts[split_name] += n_seqs
         split_counts["all"] += n_seqs
+    return file_records, split_counts
+
+
+def _storage_rows(file_records, split_counts):
+    """Return the leading memmap dimension per split for the active layout."""
+    if _dataset_layout() == "dense":
+        return {name: int(split_counts[name]) for name in ("all", "healthy_train", "healthy_val")}
+    seq_length = CONFIG["sequence_length"]
+    stride = CONFIG["stride"]
+    rows = {"all": 0, "healthy_train": 0, "healthy_val": 0}
+    for record in file_records:
+        span = window_span(record["num_sequences"], seq_length, stride)
+        rows["all"] += span
+        if record["split"] in rows:
+            rows[record["split"]] += span
+    return rows
+
+
+def _memmap_shape(rows, channels):
+    if _dataset_layout() == "virtual":
+        return (int(rows), int(channels))
+    return (int(rows), CONFIG["sequence_length"], int(channels))
+
+
+def _resolve_channels(shapes):
+    """Return the channel count for the active mode from `(rows, columns)` shapes."""
+    if _channel_mode() == "flatten":
+        return 1
+    columns = sorted({int(c) for _, c in shapes if c > 0})
+    if len(columns) > 1:
+        raise ValueError(f"per_channel mode needs a uniform column count; found {columns}")
+    return columns[0] if columns else 1
 
+
+def _shard_bytes():
+    return int(CONFIG.get("memmap_shard_bytes", 0) or 0)
+
+
+def _create_memmap(path, shape, dtype):
+    """Create a single-file memmap, or a `ShardedMemmap` when sharding is on."""
+    shard_bytes = _shard_bytes()
+    if shard_bytes > 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return ShardedMemmap.create(path, shape, dtype, rows_per_shard_for(shape[1:], dtype, shard_bytes))
+    remove_shards(path)
+    return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+
+
+def _allocate_memmaps(storage_rows, channels=1):
+    """Create output memmaps sized for the active layout and storage dtype.
+
+    Returns:
+        tuple: (memmaps dict, whether "all" is enabled, "all" size in bytes)
+    """
     # Healthy train/val memmaps are always materialized because training
     # depends on them. The full "all" memmap is optional on constrained
-    # platforms (e.g. Windows) and may fall back to streaming evaluation.
+    # platforms (e.g. Windows) and may fall back to streaming evaluation;
+    # sharded storage never maps one huge file, so it is exempt from the cap.
+    dtype = storage_params()["dtype"]
     memmaps = {
-        "healthy_train": np.memmap(
-            CONFIG["healthy_train_memmap_file"],
-            dtype="float32",
-            mode="w+",
-            shape=(split_counts["healthy_train"], seq_length, 1),
+        "healthy_train": _create_memmap(
+            CONFIG["healthy_train_memmap_file"], _memmap_shape(storage_rows["healthy_train"], channels), dtype
         ),
-        "healthy_val": np.memmap(
-            CONFIG["healthy_val_memmap_file"],
-            dtype="float32",
-            mode="w+",
-            shape=(split_counts["healthy_val"], seq_length, 1),
+        "healthy_val": _create_memmap(
+            CONFIG["healthy_val_memmap_file"], _memmap_shape(storage_rows["healthy_val"], channels), dtype
         ),
     }
-    all_bytes = int(split_counts["all"]) * int(seq_length) * np.dtype("float32").itemsize
-    allow_all_memmap = bool(CONFIG.get("create_all_memmap", True)) and all_bytes <= int(
-        CONFIG.get("max_all_memmap_bytes", 3_500_000_000)
+    all_bytes = int(np.prod(_memmap_shape(storage_rows["all"], channels))) * np.dtype(dtype).itemsize
+    allow_all_memmap = bool(CONFIG.get("create_all_memmap", True)) and (
+        _shard_bytes() > 0 or all_bytes <= int(CONFIG.get("max_all_memmap_bytes", 3_500_000_000))
     )
     if allow_all_memmap:
-        memmaps["all"] = np.memmap(
-            CONFIG["memmap_file"],
-            dtype="float32",
-            mode="w+",
-            shape=(split_counts["all"], seq_length, 1),
-        )
+        memmaps["all"] = _create_memmap(CONFIG["memmap_file"], _memmap_shape(storage_rows["all"], channels), dtype)
     else:
         logging.warning(
             "Skipping full 'all' memmap allocation (%s bytes). "
             "Evaluations will stream from raw files using split metadata.",
             all_bytes,
         )
+    return memmaps, allow_all_memmap, all_bytes
 
-    write_index = {"healthy_train": 0, "healthy_val": 0}
-    if allow_all_memmap:
-        write_index["all"] = 0
-    global_cursor = 0
 
-    # Second pass writes scaled sequences and records global/split indices
-    # so evaluators can aggregate per-file metrics deterministically.
-    for record in file_records:
-        fpath = record["file_path"]
-        signal = np.loadtxt(fpath, dtype=np.float32).reshape(-1, 1)
-        scaled = scaler.transform(signal)
-        seqs = create_sequences(scaled, seq_length, stride)
-        n_seqs = len(seqs)
-        if n_seqs <= 0:
-            continue
+def _write_window_rows(target, start, end, scaled):
+    """Write the windows of `scaled` into rows `[start, end)` of `target`."""
+    seq_length = CONFIG["sequence_length"]
+    stride = CONFIG["stride"]
+    if isinstance(target, ShardedMemmap):
+        # Shard slices may not be contiguous views; assign piecewise instead.
+        target[start:end] = window_view(scaled, seq_length, stride)
+        return
+    write_windows(scaled, seq_length, stride, target[start:end])
+
 
-        start = global_cursor
-        end = start + n_seqs
-        record["global_start_idx"] = int(start)
-        record["global_end_idx"] = int(end)
-        global_cursor = end
-        if allow_all_memmap:
-            memmaps["all"][start:end] = seqs
-            write_index["all"] = end
+def _write_file_sequences(record, scaled, memmaps):
+    """Write one scaled signal straight into its precomputed memmap slices.
 
-        split_name = record["split"]
+    Dense layouts receive windows; the virtual layout receives the signal
+    span those windows cover. The signal is encoded to the storage dtype
+    once, before windowing, so overlapping windows are not re-quantized.
+    """
+    scaled = quantize(scaled, storage_params())
+    seq_length = CONFIG["sequence_length"]
+    stride = CONFIG["stride"]
+    split_name = record["split"]
+    if _dataset_layout() == "virtual":
+        span = window_span(record["num_sequences"], seq_length, stride)
+        if "all" in memmaps:
+            start = record["global_signal_start_idx"]
+            memmaps["all"][start : start + span] = scaled[:span]
         if split_name in ("healthy_train", "healthy_val"):
-            local_start = write_index[split_name]
-            local_end = local_start + n_seqs
-            memmaps[split_name][local_start:local_end] = seqs
-            write_index[split_name] = local_end
-            record["split_start_idx"] = int(local_start)
-            record["split_end_idx"] = int(local_end)
-
-    # Flush and persist metadata once writes are complete.
+            start = record["split_signal_start_idx"]
+            memmaps[split_name][start : start + span] = scaled[:span]
+        return
+    if "all" in memmaps:
+        _write_window_rows(memmaps["all"], record["global_start_idx"], record["global_end_idx"], scaled)
+    if split_name in ("healthy_train", "healthy_val"):
+        _write_window_rows(memmaps[split_name], record["split_start_idx"], record["split_end_idx"], scaled)
+
+
+def _window_index_rows(file_records, split_name):
+    """Return `(signal_start, window_start, num_windows)` rows for a split."""
+    if split_name == "all":
+        return [
+            (r["global_signal_start_idx"], r["global_start_idx"], r["num_sequences"])
+            for r in file_records
+        ]
+    return [
+        (r["split_signal_start_idx"], r["split_start_idx"], r["num_sequences"])
+        for r in file_records
+        if r["split"] == split_name
+    ]
+
+
+def _finalize_memmaps(memmaps, allow_all_memmap, all_bytes, file_records, split_counts, channels=1):
+    """Flush memmaps, write metadata, and return artifact paths."""
+    seq_length = CONFIG["sequence_length"]
+    stride = CONFIG["stride"]
+    layout = _dataset_layout()
+    params = storage_params()
     for split_name, mmap_obj in memmaps.items():
         mmap_obj.flush()
         path_key = "memmap_file" if split_name == "all" else f"{split_name}_memmap_file"
-        write_memmap_metadata(
-            CONFIG[path_key],
-            {
-                "num_sequences": int(write_index[split_name]),
-                "sequence_length": int(seq_length),
-                "dtype": str(mmap_obj.dtype),
-                "stride": int(stride),
-                "split_name": split_name,
-            },
-        )
+        meta = {
+            "num_sequences": int(split_counts[split_name]),
+            "sequence_length": int(seq_length),
+            "dtype": str(mmap_obj.dtype),
+            "storage_scale": params["scale"],
+            "storage_offset": params["offset"],
+            "stride": int(stride),
+            "split_name": split_name,
+            "layout": layout,
+            "n_channels": int(channels),
+            "channel_mode": _channel_mode(),
+        }
+        if isinstance(mmap_obj, ShardedMemmap):
+            meta["sharded"] = True
+            meta["num_shards"] = mmap_obj.num_shards
+            meta["rows_per_shard"] = mmap_obj.rows_per_shard
+        if layout == "virtual":
+            meta["num_signal_samples"] = int(mmap_obj.shape[0])
+            save_window_index(CONFIG[path_key], _window_index_rows(file_records, split_name))
+        write_memmap_metadata(CONFIG[path_key], meta)
 
-    _save_split_metadata(file_records, split_counts)
+    _save_split_metadata(file_records, split_counts, allow_all_memmap, all_bytes, channels)
     logging.info(
-        "Memmaps created | all=%s (%s) healthy_train=%s healthy_val=%s",
+        "Memmaps created | layout=%s all=%s (%s) healthy_train=%s healthy_val=%s",
+        layout,
         split_counts["all"] if allow_all_memmap else 0,
         "enabled" if allow_all_memmap else "streaming-fallback",
         split_counts["healthy_train"],
@@ -247,3 +433,300 @@ def create_memmap_dataset(files, scaler):
         "healthy_val": CONFIG["healthy_val_memmap_file"],
         "split_metadata": CONFIG["split_metadata_file"],
     }
+
+
+def _check_signal_length(record, signal, expected_length):
+    """Fail loudly if a parsed file disagrees with its planned length."""
+    if len(signal) != expected_length:
+        raise ValueError(
+            f"{record['file_path']}: parsed {len(signal)} samples but planned "
+            f"{expected_length}; file changed during preprocessing?"
+        )
+
+
+def log_ingest_stats(stats):
+    """Log parse counts and timings collected during preprocessing."""
+    logging.info(
+        "Ingest stats | mode=%s file_parses=%s cache_hits=%s row_scans=%s parse=%.1fs total=%.1fs",
+        stats["mode"],
+        stats["file_parses"],
+        stats["cache_hits"],
+        stats["row_scans"],
+        stats["parse_seconds"],
+        stats["total_seconds"],
+    )
+
+
+def create_memmap_dataset(files, scaler, stats=None):
+    """Save split-aware sequences to memory-mapped datasets.
+
+    Returns:
+        dict: Paths to generated memmaps and metadata.
+    """
+    _validate_split_config()
+    files_to_process = files[: CONFIG["num_files_to_process"]]
+
+    # First pass computes exact per-file sequence counts before any
+    # allocation, which keeps memmap shapes deterministic.
+    shapes = [load_signal(fpath, stats).shape for fpath in files_to_process]
+    signal_lengths = [shape[0] for shape in shapes]
+    file_records, split_counts = _build_file_records(files_to_process, signal_lengths)
+    channels = _resolve_channels(shapes)
+    memmaps, allow_all_memmap, all_bytes = _allocate_memmaps(_storage_rows(file_records, split_counts), channels)
+
+    # Second pass writes scaled sequences at the global/split indices
+    # recorded above so evaluators can aggregate per-file metrics
+    # deterministically.
+    for record in file_records:
+        signal = load_signal(record["file_path"], stats)
+        _write_file_sequences(record, scaler.transform(signal), memmaps)
+
+    return _finalize_memmaps(memmaps, allow_all_memmap, all_bytes, file_records, split_counts, channels)
+
+
+_WORKER_STATE = {}
+
+
+def _scan_signal_shapes(files, stats=None):
+    """Return per-file signal lengths and the channel count.
+
+    Raw `(rows, columns)` shapes come from the raw cache or a byte scan;
+    lengths are `rows * columns` in flatten mode and `rows` per channel.
+
+    Returns:
+        tuple: (list of signal lengths, number of channels)
+    """
+    shapes = []
+    for fpath in files:
+        shape = cached_shape(fpath)
+        if shape is None:
+            shape = scan_ims_shape(fpath)
+            if stats is not None:
+                stats["row_scans"] += 1
+        shapes.append(shape)
+    if _channel_mode() == "per_channel":
+        signal_lengths = [rows for rows, _ in shapes]
+    else:
+        signal_lengths = [rows * columns for rows, columns in shapes]
+    return signal_lengths, _resolve_channels(shapes)
+
+
+def _merge_ingest_stats(stats, delta):
+    if stats is None:
+        return
+    for key in ("file_parses", "cache_hits", "row_scans", "parse_seconds"):
+        stats[key] += delta[key]
+
+
+def _init_write_worker(config, scaler, memmap_specs):
+    """Process-pool initializer: adopt parent config and open shared memmaps."""
+    # Spawned workers re-import config, so CLI overrides must be re-applied.
+    CONFIG.update(config)
+    _WORKER_STATE["scaler"] = scaler
+    _WORKER_STATE["memmaps"] = {
+        name: ShardedMemmap.open(path, mode="r+") if sharded else np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+        for name, (path, dtype, shape, sharded) in memmap_specs.items()
+    }
+
+
+def _write_record_worker(task):
+    """Load, scale and write one file into its precomputed memmap slices."""
+    record, expected_length = task
+    stats = new_ingest_stats("worker")
+    signal = load_signal(record["file_path"], stats)
+    _check_signal_length(record, signal, expected_length)
+    _write_file_sequences(record, _WORKER_STATE["scaler"].transform(signal), _WORKER_STATE["memmaps"])
+    return stats
+
+
+def _write_records_parallel(tasks, scaler, memmaps, workers, stats=None):
+    """Fan per-file writes out to a process pool.
+
+    Every record already carries disjoint global/split offsets, so workers
+    write straight into the shared memmaps without coordination and the
+    output is byte-identical to the serial path.
+    """
+    for mmap_obj in memmaps.values():
+        mmap_obj.flush()
+    memmap_specs = {
+        name: (mmap_obj.filename, str(mmap_obj.dtype), mmap_obj.shape, isinstance(mmap_obj, ShardedMemmap))
+        for name, mmap_obj in memmaps.items()
+    }
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_write_worker,
+        initargs=(dict(CONFIG), scaler, memmap_specs),
+    ) as pool:
+        for delta in pool.map(_write_record_worker, tasks, chunksize=4):
+            _merge_ingest_stats(stats, delta)
+
+
+def ingest_single_pass(files, stats=None, workers=None):
+    """Fit the global scaler and build memmaps while parsing each file once.
+
+    Memmap shapes come from a cheap byte-level row scan instead of a
+    parse. Scaler-fit files stay in memory (about 0.6 MB each) until
+    they are windowed, so no file is parsed twice. With `workers > 1`
+    the remaining files are loaded, scaled and written by a process pool.
+
+    Returns:
+        tuple: (fitted scaler, dict of generated artifact paths)
+    """
+    _validate_split_config()
+    files_to_process = files[: CONFIG["num_files_to_process"]]
+    sample_files = _scaler_sample_files(files)
+
+    signal_lengths, channels = _scan_signal_shapes(files_to_process, stats)
+    file_records, split_counts = _build_file_records(files_to_process, signal_lengths)
+    planned_paths = {record["file_path"] for record in file_records}
+
+    workers = int(workers or CONFIG.get("preprocess_workers", 1))
+    if workers > 1 and _scaler_engine() == "moments":
+        # Scaler files are parsed once by the moment workers; with the raw
+        # cache enabled the write workers then only reopen their .npy.
+        scaler = _fit_scaler_parallel(sample_files, workers, stats=stats)
+        parsed = {}
+    else:
+        scaler, parsed = _fit_scaler_serial(sample_files, keep_paths=planned_paths, stats=stats)
+
+    memmaps, allow_all_memmap, all_bytes = _allocate_memmaps(_storage_rows(file_records, split_counts), channels)
+    pending = []
+    for record in file_records:
+        signal = parsed.pop(record["file_path"], None)
+        if signal is None:
+            if workers > 1:
+                pending.append((record, signal_lengths[record["file_idx"]]))
+                continue
+            signal = load_signal(record["file_path"], stats)
+        _check_signal_length(record, signal, signal_lengths[record["file_idx"]])
+        _write_file_sequences(record, scaler.transform(signal), memmaps)
+    if pending:
+        logging.info("Writing %s files with %s worker processes", len(pending), workers)
+        _write_records_parallel(pending, scaler, memmaps, workers, stats=stats)
+
+    outputs = _finalize_memmaps(memmaps, allow_all_memmap, all_bytes, file_records, split_counts, channels)
+    return scaler, outputs
+
+
+def _open_for_append(split_name, rows, channels):
+    """Open an existing split memmap read-write, growing it to `rows`."""
+    path_key = "memmap_file" if split_name == "all" else f"{split_name}_memmap_file"
+    # np.memmap in r+ mode extends the file in place when the requested
+    # shape is larger, so existing windows are never rewritten. Sharded
+    # memmaps grow their last shard and add new ones the same way.
+    shape = _memmap_shape(rows, channels)
+    if is_sharded(CONFIG[path_key]):
+        return ShardedMemmap.open(CONFIG[path_key], mode="r+", rows=shape[0])
+    return np.memmap(CONFIG[path_key], dtype=storage_params()["dtype"], mode="r+", shape=shape)
+
+
+def append_new_files(files, stats=None, workers=None):
+    """Extend existing memmaps with files newer than the recorded history.
+
+    Files sorting after the last recorded file are scanned, scaled with
+    the saved global scaler (never refitted), and written after the
+    existing windows. Only the memmaps receiving new windows are touched,
+    so cost scales with the new files rather than the full history. The
+    initial `num_files_to_process` cap does not apply to appended files.
+
+    Returns:
+        dict: artifact paths plus `appended_files`.
+    """
+    split_meta = None
+    if os.path.exists(CONFIG["split_metadata_file"]):
+        with open(CONFIG["split_metadata_file"], "r", encoding="utf-8") as fh:
+            split_meta = json.load(fh)
+    if not split_meta or not split_meta.get("file_records"):
+        raise FileNotFoundError("No existing split metadata; run full preprocessing before appending.")
+    layout = split_meta.get("dataset_layout", "dense")
+    if layout != _dataset_layout():
+        raise ValueError(f"Existing datasets use layout '{layout}' but CONFIG requests '{_dataset_layout()}'")
+
+    storage_dtype = split_meta.get("storage_dtype", "float32")
+    if storage_dtype != storage_params()["dtype"]:
+        raise ValueError(
+            f"Existing datasets are stored as {storage_dtype} but CONFIG requests '{storage_params()['dtype']}'"
+        )
+
+    old_records = split_meta["file_records"]
+    last_path = old_records[-1]["file_path"]
+    new_files = [f for f in files if f > last_path]
+    if not new_files:
+        logging.info("Append: no new files after %s", last_path)
+        return {"appended_files": 0, "split_metadata": CONFIG["split_metadata_file"]}
+
+    scaler = joblib.load(CONFIG["scaler_file"])
+    split_counts = {k: int(v) for k, v in split_meta["split_sequence_counts"].items()}
+    old_rows = _storage_rows(old_records, split_counts)
+    signal_lengths, channels = _scan_signal_shapes(new_files, stats)
+    old_channels = int(split_meta.get("n_channels", 1))
+    if split_meta.get("channel_mode", "flatten") != _channel_mode() or channels != old_channels:
+        raise ValueError(
+            f"New files give {channels} channel(s) in '{_channel_mode()}' mode but existing datasets "
+            f"use {old_channels} in '{split_meta.get('channel_mode', 'flatten')}' mode"
+        )
+    new_records, split_counts = _build_file_records(
+        new_files,
+        signal_lengths,
+        first_file_idx=int(old_records[-1]["file_idx"]) + 1,
+        split_counts=split_counts,
+        signal_cursor=old_rows,
+    )
+    file_records = old_records + new_records
+    rows = _storage_rows(file_records, split_counts)
+
+    allow_all_memmap = bool(split_meta.get("all_memmap_enabled", True))
+    targets = {"all"} if allow_all_memmap else set()
+    targets.update(r["split"] for r in new_records if r["split"] in ("healthy_train", "healthy_val"))
+    memmaps = {name: _open_for_append(name, rows[name], channels) for name in sorted(targets)}
+    all_bytes = int(np.prod(_memmap_shape(rows["all"], channels))) * np.dtype(storage_params()["dtype"]).itemsize
+
+    workers = int(workers or CONFIG.get("preprocess_workers", 1))
+    lengths = dict(zip(new_files, signal_lengths))
+    tasks = [(record, lengths[record["file_path"]]) for record in new_records]
+    if workers > 1 and len(tasks) > 1:
+        _write_records_parallel(tasks, scaler, memmaps, workers, stats=stats)
+    else:
+        for record, expected_length in tasks:
+            signal = load_signal(record["file_path"], stats)
+            _check_signal_length(record, signal, expected_length)
+            _write_file_sequences(record, scaler.transform(signal), memmaps)
+
+    outputs = _finalize_memmaps(memmaps, allow_all_memmap, all_bytes, file_records, split_counts, channels)
+    outputs["appended_files"] = len(new_records)
+    logging.info("Append: added %s files (%s new windows)", len(new_records), sum(r["num_sequences"] for r in new_records))
+    return outputs
+
+
+def run_ingest(files, mode=None, workers=None):
+    """Fit the scaler and build datasets with the configured ingest mode.
+
+    Modes: "single_pass" (default), "two_pass" (legacy), and "append",
+    which extends existing datasets with newly arrived files using the
+    saved scaler. `workers` (default CONFIG["preprocess_workers"])
+    parallelizes per-file work except in two-pass mode.
+
+    Returns:
+        tuple: (fitted scaler, artifact paths, ingest stats dict)
+    """
+    mode = mode or CONFIG.get("ingest_mode", "single_pass")
+    if mode not in ("single_pass", "two_pass", "append"):
+        raise ValueError(f"Unknown ingest mode: {mode}")
+    stats = new_ingest_stats(mode)
+    workers = int(workers or CONFIG.get("preprocess_workers", 1))
+    stats["workers"] = workers
+    stats["scaler_fit_engine"] = _scaler_engine()
+    start = time.perf_counter()
+    if mode == "single_pass":
+        scaler, outputs = ingest_single_pass(files, stats=stats, workers=workers)
+    elif mode == "append":
+        outputs = append_new_files(files, stats=stats, workers=workers)
+        scaler = joblib.load(CONFIG["scaler_file"])
+    else:
+        if workers > 1:
+            logging.warning("two_pass ingest mode writes serially; workers only fit the scaler")
+        scaler = fit_global_scaler(files, stats=stats, workers=workers)
+        outputs = create_memmap_dataset(files, scaler, stats=stats)
+    stats["total_seconds"] = time.perf_counter() - start
+    log_ingest_stats(stats)
+    return scaler, outputs, stats
@@ -0,0 +1,108 @@
+"""Reduced-precision storage for sequence memmaps.
+
+CONFIG["storage_dtype"] selects how scaled windows are stored:
+
+- "float32": the legacy format, stored as-is.
+- "float16": half the size; relative error ~5e-4 on z-scored data.
+- "int16": half the size with a fixed absolute step. Values are stored
+  as `round((x - offset) / scale)`, where `scale = clip_sigma / 32767`,
+  so z-scores are clipped to `±storage_int16_clip_sigma`.
+
+The scale and offset are recorded in each memmap's `.meta.json`.
+Readers wrap non-float32 datasets in `DequantizedArray`, which returns
+float32 on every read, so models and loaders see the same values they
+would with float32 storage, up to quantization error.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .config import CONFIG
+
+STORAGE_DTYPES = ("float32", "float16", "int16")
+_INT16_LIMIT = 32767
+
+
+def storage_params(dtype: str | None = None) -> dict:
+    """Return `{"dtype", "scale", "offset"}` for the configured storage dtype."""
+    dtype = dtype or CONFIG.get("storage_dtype", "float32")
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unknown storage_dtype: {dtype}; expected one of {STORAGE_DTYPES}")
+    if dtype == "int16":
+        clip_sigma = float(CONFIG.get("storage_int16_clip_sigma", 8.0))
+        return {"dtype": dtype, "scale": clip_sigma / _INT16_LIMIT, "offset": 0.0}
+    return {"dtype": dtype, "scale": 1.0, "offset": 0.0}
+
+
+def params_from_meta(meta: dict) -> dict:
+    """Return storage params recorded in memmap metadata (legacy: float32)."""
+    return {
+        "dtype": meta.get("dtype", "float32"),
+        "scale": float(meta.get("storage_scale", 1.0)),
+        "offset": float(meta.get("storage_offset", 0.0)),
+    }
+
+
+def quantize(values, params: dict) -> np.ndarray:
+    """Encode float values into the storage dtype described by `params`."""
+    values = np.asarray(values)
+    if params["dtype"] != "int16":
+        return values.astype(params["dtype"], copy=False)
+    codes = np.rint((values - params["offset"]) / params["scale"])
+    np.clip(codes, -_INT16_LIMIT, _INT16_LIMIT, out=codes)
+    return codes.astype(np.int16)
+
+
+def dequantize(values, params: dict) -> np.ndarray:
+    """Decode stored values back to float32."""
+    values = np.asarray(values)
+    if params["dtype"] != "int16":
+        return values.astype(np.float32)
+    out = values.astype(np.float32)
+    out *= np.float32(params["scale"])
+    if params["offset"]:
+        out += np.float32(params["offset"])
+    return out
+
+
+class DequantizedArray:
+    """Read-only array-like that dequantizes a stored dataset on access.
+
+    Wraps a memmap or `VirtualWindowDataset`; indexing returns float32
+    arrays, `reshape((n, -1))` wraps the reshaped source, and
+    `np.asarray` materializes the full dequantized array.
+    """
+
+    def __init__(self, data, params: dict):
+        self._data = data
+        self._params = dict(params)
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(self._data.shape)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def storage_dtype(self):
+        return self._data.dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return int(self.shape[0])
+
+    def reshape(self, *shape):
+        return DequantizedArray(self._data.reshape(*shape), self._params)
+
+    def __getitem__(self, key):
+        return dequantize(self._data[key], self._params)
+
+    def __array__(self, dtype=None, copy=None):
+        out = dequantize(self._data[0 : len(self)], self._params)
+        return out if dtype is None else out.astype(dtype, copy=False)
@@ -0,0 +1,135 @@
+"""Binary cache of parsed IMS files.
+
+Each raw text file is parsed once and stored as a `.npy` under
+CONFIG["raw_cache_folder"], with a JSON sidecar recording the source
+path, size, mtime and (optionally) a content hash. Later reads validate
+the sidecar against `os.stat` and open the `.npy` with `mmap_mode="r"`,
+so a cache hit costs a stat plus an mmap open instead of a text parse.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from .config import CONFIG
+from .ims_reader import read_ims_file
+
+
+def _entry_paths(file_path: str) -> tuple[str, str]:
+    """Return (npy path, sidecar path) for a raw file."""
+    abs_path = os.path.abspath(file_path)
+    digest = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+    stem = f"{os.path.basename(abs_path)}-{digest}"
+    folder = CONFIG["raw_cache_folder"]
+    return os.path.join(folder, f"{stem}.npy"), os.path.join(folder, f"{stem}.json")
+
+
+def _content_hash(file_path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_sidecar(sidecar_path: str) -> dict | None:
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        logging.warning("Ignoring unreadable raw cache sidecar %s", sidecar_path)
+        return None
+
+
+def _valid_entry(file_path: str) -> tuple[str, dict] | None:
+    """Return (npy path, sidecar) when a fresh cache entry exists."""
+    npy_path, sidecar_path = _entry_paths(file_path)
+    meta = _read_sidecar(sidecar_path)
+    if meta is None or not os.path.exists(npy_path):
+        return None
+    st = os.stat(file_path)
+    if meta.get("size") != st.st_size or meta.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    if meta.get("source_path") != os.path.abspath(file_path):
+        return None
+    if CONFIG.get("raw_cache_verify_hash", False):
+        if meta.get("content_hash") != _content_hash(file_path):
+            return None
+    return npy_path, meta
+
+
+def cached_shape(file_path: str) -> tuple[int, int] | None:
+    """Return the cached `(rows, columns)` of a raw file, if cached and fresh."""
+    if not CONFIG.get("use_raw_cache", True):
+        return None
+    entry = _valid_entry(file_path)
+    if entry is None:
+        return None
+    rows, columns = entry[1]["shape"]
+    return int(rows), int(columns)
+
+
+def _write_entry(file_path: str, matrix: np.ndarray, st: os.stat_result) -> None:
+    npy_path, sidecar_path = _entry_paths(file_path)
+    os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+    # Write-then-rename keeps readers (and concurrent writers) from ever
+    # seeing a partial entry.
+    suffix = f".tmp{os.getpid()}"
+    with open(npy_path + suffix, "wb") as fh:
+        np.save(fh, matrix)
+    os.replace(npy_path + suffix, npy_path)
+    meta = {
+        "source_path": os.path.abspath(file_path),
+        "size": int(st.st_size),
+        "mtime_ns": int(st.st_mtime_ns),
+        "shape": [int(dim) for dim in matrix.shape],
+        "dtype": str(matrix.dtype),
+    }
+    if CONFIG.get("raw_cache_verify_hash", False):
+        meta["content_hash"] = _content_hash(file_path)
+    with open(sidecar_path + suffix, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(sidecar_path + suffix, sidecar_path)
+
+
+def load_raw_matrix(file_path: str, stats: dict | None = None, use_cache: bool | None = None) -> np.ndarray:
+    """Return the `(rows, columns)` float32 contents of a raw IMS file.
+
+    Fresh cache entries are returned as read-only memmaps. Misses parse the
+    text file, populate the cache, and return the in-memory array.
+
+    Args:
+        file_path: raw IMS file path.
+        stats: optional ingest-stats dict; updates `file_parses`,
+            `parse_seconds` and `cache_hits`.
+        use_cache: override CONFIG["use_raw_cache"].
+    """
+    if use_cache is None:
+        use_cache = bool(CONFIG.get("use_raw_cache", True))
+    if use_cache:
+        entry = _valid_entry(file_path)
+        if entry is not None:
+            if stats is not None:
+                stats["cache_hits"] = stats.get("cache_hits", 0) + 1
+            return np.load(entry[0], mmap_mode="r")
+
+    st = os.stat(file_path)
+    start = time.perf_counter()
+    matrix = read_ims_file(file_path)
+    if stats is not None:
+        stats["file_parses"] += 1
+        stats["parse_seconds"] += time.perf_counter() - start
+    if use_cache:
+        try:
+            _write_entry(file_path, matrix, st)
+        except OSError as exc:
+            logging.warning("Unable to cache %s: %s", file_path, exc)
+    return matrix
@@ -4,7 +4,7 @@ import argparse
 import logging
 
 from .utils import list_ims_files
-from .preprocessing import fit_global_scaler, create_memmap_dataset
+from .preprocessing import run_ingest
 from .config import CONFIG, ensure_output_dirs, configure_logging
 
 
@@ -13,10 +13,49 @@ def main():
     parser = argparse.ArgumentParser(description="Run preprocessing pipeline")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of files to process (demo)")
     parser.add_argument("--data-folder", type=str, default=None, help="Override data folder")
+    parser.add_argument(
+        "--ingest-mode",
+        choices=["single_pass", "two_pass", "append"],
+        default=None,
+        help="Override CONFIG ingest_mode (append only processes files newer than split metadata)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for per-file preprocessing")
+    parser.add_argument(
+        "--dataset-layout",
+        choices=["dense", "virtual"],
+        default=None,
+        help="Override CONFIG dataset_layout (virtual stores each signal once, ~20x smaller)",
+    )
+    parser.add_argument(
+        "--channel-mode",
+        choices=["flatten", "per_channel"],
+        default=None,
+        help="Override CONFIG channel_mode (per_channel keeps bearings/axes as separate channels)",
+    )
+    parser.add_argument(
+        "--storage-dtype",
+        choices=["float32", "float16", "int16"],
+        default=None,
+        help="Override CONFIG storage_dtype for the sequence memmaps",
+    )
+    parser.add_argument(
+        "--shard-bytes",
+        type=int,
+        default=None,
+        help="Override CONFIG memmap_shard_bytes (> 0 writes sharded memmaps)",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     args = parser.parse_args()
 
     configure_logging(logging.DEBUG if args.verbose else logging.INFO)
+    if args.dataset_layout is not None:
+        CONFIG["dataset_layout"] = args.dataset_layout
+    if args.channel_mode is not None:
+        CONFIG["channel_mode"] = args.channel_mode
+    if args.storage_dtype is not None:
+        CONFIG["storage_dtype"] = args.storage_dtype
+    if args.shard_bytes is not None:
+        CONFIG["memmap_shard_bytes"] = args.shard_bytes
     ensure_output_dirs()
 
     logging.info("Discovering IMS files...")
@@ -30,11 +69,8 @@ def main():
 
     logging.info("%d usable files found.", len(files))
 
-    logging.info("Fitting global scaler...")
-    scaler = fit_global_scaler(files)
-
-    logging.info("Creating split-aware memmap datasets...")
-    outputs = create_memmap_dataset(files, scaler)
+    logging.info("Fitting global scaler and creating split-aware memmap datasets...")
+    _, outputs, _ = run_ingest(files, mode=args.ingest_mode, workers=args.workers)
     logging.info("Created dataset artifacts: %s", outputs)
 
     logging.info("Preprocessing pipeline complete.")
@@ -0,0 +1,294 @@
+"""Persistent per-window score store shared by all evaluators.
+
+Scores live under `<processed>/score_store/` as one memmapped column per
+`(model, checkpoint hash)`:
+
+- `<model>-<hash>.dat` holds one score per window, aligned with the
+  global window index of the `all` memmap (see `file_index.py`).
+- `<model>-<hash>.mask` marks rows that are already computed.
+
+Evaluators ask a column for its `missing_ranges` and only score those
+windows, so re-running evaluation with an unchanged checkpoint does no
+model work. A new checkpoint gets a new column.
+
+`store.json` records a data key: a hash of the scaler and the windowing,
+storage and channel settings. A copy of the file index is kept next to it.
+On open:
+
+- a changed data key drops every column;
+- otherwise rows stay valid for the longest prefix of files whose window
+  ranges are unchanged, so append-mode ingest keeps existing scores;
+- rows past that prefix are marked missing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from numpy.lib.recfunctions import repack_fields
+
+from .config import CONFIG
+from .file_index import FileIndex
+
+STORE_VERSION = 1
+
+# Models whose alerts fire on low scores (IF decision_function); the
+# autoencoders alert on high reconstruction error.
+LOWER_IS_ANOMALOUS = {"isolation_forest"}
+
+_INDEX_FIELDS = ("file_idx", "global_start", "global_end", "timestamp")
+
+
+def store_dir() -> str:
+    return os.path.join(CONFIG["processed_folder"], "score_store")
+
+
+def checkpoint_hash(path: str, chunk_bytes: int = 1 << 20) -> str:
+    """Return a short content hash of a model/checkpoint file."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def data_key() -> str:
+    """Hash of everything besides the file list that changes window contents."""
+    digest = hashlib.sha1()
+    settings = {
+        name: CONFIG.get(name)
+        for name in ("sequence_length", "stride", "storage_dtype", "channel_mode", "storage_int16_clip_sigma")
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    if os.path.exists(CONFIG["scaler_file"]):
+        digest.update(checkpoint_hash(CONFIG["scaler_file"]).encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def file_means(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return the mean of `values[start:end]` for every file in one pass."""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if starts.size == 0:
+        return np.array([], dtype=np.float64)
+    hi = int(ends.max())
+    cumulative = np.concatenate([[0.0], np.cumsum(np.asarray(values[:hi], dtype=np.float64))])
+    counts = np.maximum(ends - starts, 1)
+    return (cumulative[ends] - cumulative[starts]) / counts
+
+
+def _mask_ranges(mask: np.ndarray, lo: int, hi: int) -> list[tuple[int, int]]:
+    """Return contiguous `[a, b)` runs of zero entries of `mask[lo:hi]`."""
+    missing = np.asarray(mask[lo:hi]) == 0
+    if not missing.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], missing, [False]]).astype(np.int8)))
+    return [(lo + int(a), lo + int(b)) for a, b in zip(edges[0::2], edges[1::2])]
+
+
+class ScoreColumn:
+    """One model/checkpoint column: `values` plus a computed-row `mask`."""
+
+    def __init__(self, values: np.ndarray, mask: np.ndarray, values_path: str | None = None):
+        self.values = values
+        self.mask = mask
+        self.values_path = values_path
+
+    @classmethod
+    def in_memory(cls, num_windows: int, dtype=np.float64) -> "ScoreColumn":
+        """Column for runs without split metadata; nothing is persisted."""
+        return cls(np.zeros(num_windows, dtype=dtype), np.zeros(num_windows, dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return int(self.values.shape[0])
+
+    def missing_ranges(self, lo: int = 0, hi: int | None = None) -> list[tuple[int, int]]:
+        return _mask_ranges(self.mask, lo, len(self) if hi is None else hi)
+
+    def is_complete(self, lo: int, hi: int) -> bool:
+        return bool(np.all(self.mask[lo:hi]))
+
+    def write(self, lo: int, scores: np.ndarray) -> None:
+        hi = lo + len(scores)
+        self.values[lo:hi] = scores
+        self.mask[lo:hi] = 1
+
+    def mark_computed(self, ranges) -> None:
+        """Mark rows written externally (e.g. by parallel workers) as computed."""
+        for lo, hi in ranges:
+            self.mask[lo:hi] = 1
+
+    def read(self, rows: slice) -> np.ndarray:
+        if not self.is_complete(rows.start, rows.stop):
+            raise ValueError(f"Scores for windows [{rows.start}, {rows.stop}) have not been computed")
+        return np.asarray(self.values[rows])
+
+    def flush(self) -> None:
+        for arr in (self.values, self.mask):
+            if isinstance(arr, np.memmap):
+                arr.flush()
+
+
+class ScoreStore:
+    """Columnar per-window score store aligned with the file index."""
+
+    def __init__(self, root: str, file_index: FileIndex, manifest: dict):
+        self.root = root
+        self.file_index = file_index
+        self.manifest = manifest
+
+    @property
+    def num_windows(self) -> int:
+        return int(self.manifest["num_windows"])
+
+    @classmethod
+    def open(cls, root: str | None = None, file_index: FileIndex | None = None) -> "ScoreStore":
+        """Open (creating or reconciling) the store for the current dataset."""
+        root = root or store_dir()
+        file_index = file_index or FileIndex.load()
+        os.makedirs(root, exist_ok=True)
+        manifest_path = os.path.join(root, "store.json")
+        index_path = os.path.join(root, "index.npy")
+        current_rows = repack_fields(file_index.records[list(_INDEX_FIELDS)])
+        num_windows = file_index.num_windows
+        key = data_key()
+
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        valid_until = 0
+        if manifest and manifest.get("version") == STORE_VERSION and manifest.get("data_key") == key:
+            stored_rows = np.load(index_path) if os.path.exists(index_path) else current_rows[:0]
+            common = min(len(stored_rows), len(current_rows))
+            same = stored_rows[:common] == current_rows[:common]
+            prefix = common if same.all() else int(np.argmin(same))
+            valid_until = int(current_rows["global_end"][prefix - 1]) if prefix else 0
+        else:
+            if manifest:
+                for name in manifest.get("columns", {}):
+                    cls._remove_column_files(root, name)
+            manifest = {"version": STORE_VERSION, "data_key": key, "columns": {}}
+
+        store = cls(root, file_index, manifest)
+        for name, info in manifest["columns"].items():
+            store._resize_column(name, np.dtype(info["dtype"]), num_windows, valid_until)
+        manifest["num_windows"] = int(num_windows)
+        np.save(index_path, current_rows)
+        store._save_manifest()
+        return store
+
+    # -- column files -------------------------------------------------
+
+    @staticmethod
+    def _column_paths(root: str, name: str) -> tuple[str, str]:
+        return os.path.join(root, f"{name}.dat"), os.path.join(root, f"{name}.mask")
+
+    @classmethod
+    def _remove_column_files(cls, root: str, name: str) -> None:
+        for path in cls._column_paths(root, name):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _resize_column(self, name: str, dtype: np.dtype, num_windows: int, valid_until: int) -> None:
+        values_path, mask_path = self._column_paths(self.root, name)
+        for path, itemsize in ((values_path, dtype.itemsize), (mask_path, 1)):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            os.truncate(path, num_windows * itemsize)
+        if valid_until < num_windows and num_windows > 0:
+            mask = np.memmap(mask_path, dtype=np.uint8, mode="r+", shape=(num_windows,))
+            mask[valid_until:] = 0
+            mask.flush()
+
+    def _save_manifest(self) -> None:
+        path = os.path.join(self.root, "store.json")
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=2)
+        os.replace(tmp_path, path)
+
+    def _open_column(self, name: str, mode: str = "r+") -> ScoreColumn:
+        info = self.manifest["columns"][name]
+        values_path, mask_path = self._column_paths(self.root, name)
+        shape = (self.num_windows,)
+        if self.num_windows == 0:
+            return ScoreColumn.in_memory(0, dtype=info["dtype"])
+        return ScoreColumn(
+            np.memmap(values_path, dtype=info["dtype"], mode=mode, shape=shape),
+            np.memmap(mask_path, dtype=np.uint8, mode=mode, shape=shape),
+            values_path=values_path,
+        )
+
+    # -- public API -----------------------------------------------------
+
+    def columns(self, model: str | None = None) -> list[dict]:
+        """Return column descriptors, most recently used first."""
+        rows = [dict(info, name=name) for name, info in self.manifest["columns"].items()]
+        if model is not None:
+            rows = [row for row in rows if row["model"] == model]
+        return sorted(rows, key=lambda row: row["updated"], reverse=True)
+
+    def column(self, model: str, checkpoint: str, dtype=np.float64) -> ScoreColumn:
+        """Return the writable column for `(model, checkpoint)`, creating it if needed.
+
+        Older checkpoints of the same model beyond
+        CONFIG["score_store_keep_columns"] are deleted.
+        """
+        name = f"{model}-{checkpoint}"
+        columns = self.manifest["columns"]
+        if name not in columns:
+            columns[name] = {"model": model, "checkpoint": checkpoint, "dtype": np.dtype(dtype).name}
+            self._resize_column(name, np.dtype(dtype), self.num_windows, 0)
+        # A monotonic use counter (not wall time) orders checkpoints by recency.
+        self.manifest["clock"] = int(self.manifest.get("clock", 0)) + 1
+        columns[name]["updated"] = self.manifest["clock"]
+        keep = max(1, int(CONFIG.get("score_store_keep_columns", 3)))
+        for stale in self.columns(model)[keep:]:
+            self._remove_column_files(self.root, stale["name"])
+            del columns[stale["name"]]
+        self._save_manifest()
+        return self._open_column(name)
+
+    def _read_column(self, model: str, checkpoint: str | None) -> ScoreColumn:
+        candidates = self.columns(model)
+        if checkpoint is not None:
+            candidates = [row for row in candidates if row["checkpoint"] == checkpoint]
+        if not candidates:
+            raise KeyError(f"No stored scores for model={model} checkpoint={checkpoint}")
+        return self._open_column(candidates[0]["name"], mode="r")
+
+    def read(self, model: str, rows: slice | None = None, checkpoint: str | None = None) -> np.ndarray:
+        """Return stored window scores (latest checkpoint unless given)."""
+        column = self._read_column(model, checkpoint)
+        return column.read(rows or slice(0, self.num_windows))
+
+    def file_scores(self, model: str, file_idx: int, checkpoint: str | None = None) -> np.ndarray:
+        return self.read(model, self.file_index.file_slice(file_idx), checkpoint)
+
+    def split_scores(self, model: str, split: str, checkpoint: str | None = None) -> np.ndarray:
+        return self.read(model, self.file_index.split_slice(split), checkpoint)
+
+    def file_anomaly_rates(self, model: str, threshold: float, checkpoint: str | None = None) -> np.ndarray:
+        """Per-file fraction of windows past `threshold`, in file-index order."""
+        scores = self.read(model, checkpoint=checkpoint)
+        alerts = scores <= threshold if model in LOWER_IS_ANOMALOUS else scores >= threshold
+        starts, ends = self.file_index.window_bounds()
+        return file_means(alerts, starts, ends)
+
+
+def stored_file_anomaly_rates(model: str, store: ScoreStore | None = None) -> np.ndarray:
+    """Per-file anomaly rates from stored scores and the saved healthy_val threshold.
+
+    Equivalent to `<model>_file_scores.npy`, but computed from the window
+    columns so downstream reports need no monolithic score arrays.
+    """
+    threshold_path = os.path.join(CONFIG["processed_folder"], "diagnostics", f"{model}_threshold.json")
+    if not os.path.exists(threshold_path):
+        raise FileNotFoundError(f"Missing {threshold_path}. Run model evaluation first.")
+    with open(threshold_path, "r", encoding="utf-8") as fh:
+        threshold = float(json.load(fh)["threshold"])
+    return (store or ScoreStore.open()).file_anomaly_rates(model, threshold)
@@ -0,0 +1,240 @@
+"""Sharded memmaps: one logical array stored as fixed-size shard files.
+
+With CONFIG["memmap_shard_bytes"] > 0, preprocessing writes each split
+memmap as `<memmap>.shard00000`, `<memmap>.shard00001`, ... Each shard
+holds `rows_per_shard` rows along axis 0, and the last shard may be
+shorter. A manifest (`<memmap>.shards.json`) records the logical shape,
+dtype and shard list. No single file has to be mapped whole, so the
+`all` dataset no longer needs the `max_all_memmap_bytes` fallback.
+
+`ShardedMemmap` exposes the shards as one array-like. It supports
+integer, slice and fancy indexing along axis 0 (gathers are grouped per
+shard), slice assignment for writers, and in-place growth for append
+mode. Workers open the same manifest in r+ mode and write disjoint rows
+in parallel.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+
+SHARD_SUFFIX = ".shard{:05d}"
+
+
+def manifest_path_for(memmap_path: str) -> str:
+    """Return the shard manifest path for a logical memmap path."""
+    return f"{memmap_path}.shards.json"
+
+
+def is_sharded(memmap_path: str) -> bool:
+    return os.path.exists(manifest_path_for(memmap_path))
+
+
+def rows_per_shard_for(row_shape, dtype, shard_bytes: int) -> int:
+    """Return how many rows of `row_shape` fit in `shard_bytes`."""
+    row_bytes = int(np.prod(row_shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+    return max(1, int(shard_bytes) // max(1, row_bytes))
+
+
+def remove_shards(memmap_path: str) -> None:
+    """Delete a sharded memmap's manifest and shard files, if present."""
+    manifest = manifest_path_for(memmap_path)
+    if not os.path.exists(manifest):
+        return
+    with open(manifest, "r", encoding="utf-8") as fh:
+        shards = json.load(fh).get("shards", [])
+    folder = os.path.dirname(memmap_path)
+    for name in shards:
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(manifest)
+
+
+class ShardedMemmap:
+    """Array-like view over fixed-size shard memmaps."""
+
+    def __init__(self, path: str, shards, shape, dtype, rows_per_shard: int, mode: str = "r"):
+        self.filename = path
+        self._shards = list(shards)
+        self._shape = tuple(int(dim) for dim in shape)
+        self._dtype = np.dtype(dtype)
+        self._rows_per_shard = int(rows_per_shard)
+        self._mode = mode
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _shard_rows(total_rows: int, rows_per_shard: int) -> list[int]:
+        full, rest = divmod(int(total_rows), int(rows_per_shard))
+        return [rows_per_shard] * full + ([rest] if rest else [])
+
+    @classmethod
+    def create(cls, path: str, shape, dtype, rows_per_shard: int) -> "ShardedMemmap":
+        """Allocate shard files for `shape` and write the manifest."""
+        remove_shards(path)
+        shape = tuple(int(dim) for dim in shape)
+        shards = []
+        for shard_idx, rows in enumerate(cls._shard_rows(shape[0], rows_per_shard)):
+            shard_path = path + SHARD_SUFFIX.format(shard_idx)
+            shards.append(np.memmap(shard_path, dtype=dtype, mode="w+", shape=(rows,) + shape[1:]))
+        sharded = cls(path, shards, shape, dtype, rows_per_shard, mode="w+")
+        sharded._write_manifest()
+        return sharded
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r", rows: int | None = None) -> "ShardedMemmap":
+        """Open a sharded memmap; in r+ mode `rows` grows it in place."""
+        with open(manifest_path_for(path), "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+        shape = tuple(manifest["shape"])
+        rows_per_shard = int(manifest["rows_per_shard"])
+        dtype = manifest["dtype"]
+        if rows is not None and int(rows) < shape[0]:
+            raise ValueError(f"Cannot shrink sharded memmap {path} from {shape[0]} to {rows} rows")
+        if rows is not None and mode == "r":
+            raise ValueError("Growing a sharded memmap requires mode='r+'")
+        target = shape if rows is None else (int(rows),) + shape[1:]
+        shards = []
+        for shard_idx, shard_rows in enumerate(cls._shard_rows(target[0], rows_per_shard)):
+            shard_path = path + SHARD_SUFFIX.format(shard_idx)
+            # r+ with a larger shape extends the last shard; new shards are created.
+            shard_mode = mode if os.path.exists(shard_path) else "w+"
+            shards.append(np.memmap(shard_path, dtype=dtype, mode=shard_mode, shape=(shard_rows,) + target[1:]))
+        sharded = cls(path, shards, target, dtype, rows_per_shard, mode=mode)
+        if target != shape:
+            sharded._write_manifest()
+        return sharded
+
+    def _write_manifest(self) -> None:
+        payload = {
+            "shape": list(self._shape),
+            "dtype": str(self._dtype),
+            "rows_per_shard": self._rows_per_shard,
+            "shards": [os.path.basename(self.filename + SHARD_SUFFIX.format(i)) for i in range(len(self._shards))],
+        }
+        with open(manifest_path_for(self.filename), "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+
+    # ------------------------------------------------------------------
+    # Array protocol
+    # ------------------------------------------------------------------
+    @property
+    def shape(self) -> tuple:
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self._shape)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self._shards)
+
+    @property
+    def rows_per_shard(self) -> int:
+        return self._rows_per_shard
+
+    def __len__(self) -> int:
+        return self._shape[0]
+
+    def flush(self) -> None:
+        for shard in self._shards:
+            if isinstance(shard, np.memmap):
+                shard.flush()
+
+    def reshape(self, *shape):
+        """Reshape trailing dimensions, e.g. `(n, -1)` for tree models."""
+        if len(shape) == 1 and isinstance(shape[0], tuple):
+            shape = shape[0]
+        if shape[0] != self._shape[0]:
+            raise ValueError("ShardedMemmap can only reshape trailing dimensions")
+        shards = [shard.reshape((len(shard),) + tuple(shape[1:])) for shard in self._shards]
+        new_shape = (self._shape[0],) + (shards[0].shape[1:] if shards else tuple(shape[1:]))
+        return ShardedMemmap(self.filename, shards, new_shape, self._dtype, self._rows_per_shard, self._mode)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[0 : len(self)]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def _pieces(self, start: int, stop: int):
+        """Yield `(shard, local_start, local_stop, out_start)` covering rows."""
+        rps = self._rows_per_shard
+        pos = start
+        while pos < stop:
+            shard_idx = pos // rps
+            local = pos - shard_idx * rps
+            take = min(stop - pos, rps - local)
+            yield self._shards[shard_idx], local, local + take, pos - start
+            pos += take
+
+    def _slice(self, start: int, stop: int) -> np.ndarray:
+        if stop <= start:
+            return np.empty((0,) + self._shape[1:], dtype=self._dtype)
+        pieces = list(self._pieces(start, stop))
+        if len(pieces) == 1:
+            shard, lo, hi, _ = pieces[0]
+            return shard[lo:hi]
+        return np.concatenate([shard[lo:hi] for shard, lo, hi, _ in pieces], axis=0)
+
+    def _gather(self, idx) -> np.ndarray:
+        idx = np.asarray(idx, dtype=np.int64)
+        flat = idx.reshape(-1)
+        n = self._shape[0]
+        if flat.size and (flat.min() < -n or flat.max() >= n):
+            raise IndexError("row index out of range")
+        flat = np.where(flat < 0, flat + n, flat)
+        out = np.empty((flat.size,) + self._shape[1:], dtype=self._dtype)
+        shard_ids = flat // self._rows_per_shard
+        # One vectorized gather per shard touched, in shard order.
+        order = np.argsort(shard_ids, kind="stable")
+        bounds = np.flatnonzero(np.diff(shard_ids[order])) + 1
+        for group in np.split(order, bounds):
+            if group.size == 0:
+                continue
+            shard_idx = int(shard_ids[group[0]])
+            out[group] = self._shards[shard_idx][flat[group] - shard_idx * self._rows_per_shard]
+        return out.reshape(idx.shape + self._shape[1:])
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            head, rest = key[0], key[1:]
+            out = self[head]
+            if isinstance(head, (int, np.integer)):
+                return out[rest]
+            return out[(slice(None),) + rest]
+        if isinstance(key, (int, np.integer)):
+            idx = int(key) + self._shape[0] if key < 0 else int(key)
+            if not 0 <= idx < self._shape[0]:
+                raise IndexError("row index out of range")
+            shard_idx = idx // self._rows_per_shard
+            return self._shards[shard_idx][idx - shard_idx * self._rows_per_shard]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._shape[0])
+            if step == 1:
+                return self._slice(start, stop)
+            return self._gather(np.arange(start, stop, step))
+        key = np.asarray(key)
+        if key.dtype == bool:
+            key = np.flatnonzero(key)
+        return self._gather(key)
+
+    def __setitem__(self, key, values):
+        if not isinstance(key, slice):
+            raise TypeError("ShardedMemmap supports assignment to contiguous row slices only")
+        start, stop, step = key.indices(self._shape[0])
+        if step != 1:
+            raise TypeError("ShardedMemmap supports assignment to contiguous row slices only")
+        values = np.asarray(values)
+        if values.shape[0] != stop - start:
+            raise ValueError(f"Cannot assign {values.shape[0]} rows to a slice of {stop - start}")
+        for shard, lo, hi, out_start in self._pieces(start, stop):
+            shard[lo:hi] = values[out_start : out_start + (hi - lo)]
@@ -0,0 +1,417 @@
+"""Shared training loop for the dense and LSTM autoencoders.
+
+`AutoencoderTrainer` runs reconstruction epochs for any model mapping a
+batch to a same-shaped reconstruction:
+
+- optional bf16 autocast (`torch_amp_bf16`), on CPU as well as CUDA;
+- optional `torch.compile` (`torch_compile`), falling back to eager mode
+  when compilation fails;
+- gradient accumulation over `grad_accumulation_steps` batches;
+- losses summed on-device and read once per epoch (and at log
+  intervals) instead of a `.item()` sync per batch;
+- per-epoch samples/sec;
+- resumable full checkpoints (`<model file>.resume.pt`): model and
+  optimizer state, epoch and batch cursor, RNG states, early-stopping
+  counters and the best validation loss. They are written after every
+  epoch and every `train_checkpoint_every_batches` train batches.
+  `fit(resume=True)` continues from there, replaying the interrupted
+  epoch's shuffle and skipping its completed batches.
+
+`configure_torch_threads` applies `torch_num_threads` and
+`torch_interop_threads` before training starts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import os
+import random
+import time
+
+import numpy as np
+import torch
+from torch import nn
+
+from .config import CONFIG
+from .dataset import load_split_metadata
+from .logging_utils import fmt_seconds, log_note, log_progress
+from .score_store import checkpoint_hash
+
+# CONFIG keys recorded in resumable checkpoints; resuming under different
+# values starts training over.
+RESUME_CONFIG_KEYS = (
+    "random_seed",
+    "torch_batch_size",
+    "learning_rate",
+    "weight_decay",
+    "grad_accumulation_steps",
+    "torch_amp_bf16",
+    "torch_loader",
+    "torch_batch_order",
+)
+
+
+def resume_data_fingerprint() -> dict:
+    """Identity of the preprocessed datasets, for resume fingerprints.
+
+    Re-running preprocessing (appended files, a refitted scaler) changes
+    it, so a checkpoint never continues on different training data.
+    """
+    meta = load_split_metadata() or {}
+    files = {"split_metadata": CONFIG["split_metadata_file"], "scaler": CONFIG["scaler_file"]}
+    return {
+        "split_sequence_counts": meta.get("split_sequence_counts"),
+        **{name: checkpoint_hash(path) if os.path.exists(path) else None for name, path in files.items()},
+    }
+
+
+def resume_checkpoint_path(model_file: str) -> str:
+    """Full training checkpoint kept next to a model checkpoint."""
+    return f"{model_file}.resume.pt"
+
+
+def _rng_state() -> dict:
+    state = {"torch": torch.get_rng_state(), "numpy": np.random.get_state(), "python": random.getstate()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def _set_rng_state(state: dict) -> None:
+    torch.set_rng_state(state["torch"])
+    np.random.set_state(state["numpy"])
+    random.setstate(state["python"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def configure_torch_threads() -> None:
+    """Apply CONFIG torch thread counts (0 keeps torch's defaults)."""
+    threads = int(CONFIG.get("torch_num_threads", 0) or 0)
+    if threads > 0:
+        torch.set_num_threads(threads)
+    interop = int(CONFIG.get("torch_interop_threads", 0) or 0)
+    if interop > 0 and torch.get_num_interop_threads() != interop:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError as exc:
+            # Only allowed once, before any inter-op parallel work started.
+            logging.warning("Unable to set torch inter-op threads to %s: %s", interop, exc)
+
+
+def add_trainer_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the shared training-engine flags to a CLI parser."""
+    parser.add_argument("--amp-bf16", action="store_true", default=None, help="Autocast forward passes to bfloat16")
+    parser.add_argument("--torch-compile", action="store_true", default=None, help="Compile models with torch.compile")
+    parser.add_argument("--grad-accum-steps", type=int, default=None, help="Batches per optimizer step")
+    parser.add_argument("--torch-threads", type=int, default=None, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--torch-interop-threads", type=int, default=None, help="torch inter-op threads (0 = default)")
+
+
+def apply_trainer_arguments(args: argparse.Namespace) -> None:
+    """Copy flags added by `add_trainer_arguments` into CONFIG."""
+    for attr, key in (
+        ("amp_bf16", "torch_amp_bf16"),
+        ("torch_compile", "torch_compile"),
+        ("grad_accum_steps", "grad_accumulation_steps"),
+        ("torch_threads", "torch_num_threads"),
+        ("torch_interop_threads", "torch_interop_threads"),
+    ):
+        value = getattr(args, attr)
+        if value is not None:
+            CONFIG[key] = value
+
+
+class AutoencoderTrainer:
+    """Fit a model to reconstruct its input batches.
+
+    `model` keeps the eager module (use it for `state_dict`); forward
+    passes go through the compiled module when `torch_compile` is set.
+    """
+
+    def __init__(self, model, optimizer, device, label: str, criterion=None):
+        self.model = model
+        self.optimizer = optimizer
+        self.device = torch.device(device)
+        self.label = label
+        self.criterion = criterion or nn.MSELoss()
+        self.amp = bool(CONFIG.get("torch_amp_bf16", False))
+        self.accum_steps = max(1, int(CONFIG.get("grad_accumulation_steps", 1)))
+        self._forward = model
+        self._compiled = False
+        if CONFIG.get("torch_compile", False):
+            try:
+                self._forward = torch.compile(model)
+                self._compiled = True
+            except Exception as exc:
+                logging.warning("torch.compile unavailable (%s); training %s eagerly", exc, label)
+
+    def _autocast(self):
+        if not self.amp:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=torch.bfloat16)
+
+    def _loss(self, x):
+        with self._autocast():
+            try:
+                recon = self._forward(x)
+            except Exception as exc:
+                if not self._compiled:
+                    raise
+                # Compilation happens on the first call; fall back to eager.
+                logging.warning("torch.compile failed (%s); training %s eagerly", exc, self.label)
+                self._forward = self.model
+                self._compiled = False
+                recon = self.model(x)
+            return self.criterion(recon.float(), x)
+
+    def _iterate(self, loader, resume: dict | None):
+        """Iterate `loader`, or replay it from a mid-epoch checkpoint.
+
+        The epoch-start RNG state is restored before the iterator is made,
+        so it draws the same shuffle; completed batches are skipped (by the
+        batch sampler when possible, else by reading and dropping them),
+        then the RNG state at the checkpoint is restored.
+        """
+        if resume is None:
+            return iter(loader)
+        from .dataset import MemmapBatchSampler
+
+        cursor = int(resume["batch_cursor"])
+        _set_rng_state(resume["epoch_rng"])
+        sampler = getattr(loader, "sampler", None)
+        if isinstance(sampler, MemmapBatchSampler):
+            sampler.skip_batches = cursor
+            cursor = 0
+        iterator = iter(loader)
+        try:
+            first = next(iterator)
+            for _ in range(cursor):
+                first = next(iterator)
+        except StopIteration:
+            _set_rng_state(resume["rng"])
+            return iter(())
+        _set_rng_state(resume["rng"])
+        return _chain_first(first, iterator)
+
+    def run_epoch(
+        self,
+        loader,
+        train: bool,
+        max_batches: int | None = None,
+        log_interval_batches: int | None = None,
+        resume: dict | None = None,
+        checkpoint=None,
+    ) -> dict:
+        """Run one epoch; return `loss` (per-sample mean), `samples`, `seconds`, `samples_per_sec`.
+
+        `resume` is a mid-epoch checkpoint to continue from. During
+        training, `checkpoint(batch_cursor, epoch_rng, total, count)` is
+        called at the first optimizer-step boundary once
+        `train_checkpoint_every_batches` batches have run since the last one.
+        """
+        self.model.train(mode=train)
+        target_batches = len(loader)
+        if max_batches is not None:
+            target_batches = min(target_batches, max_batches)
+        epoch_rng = resume["epoch_rng"] if resume else _rng_state()
+        start_batch = int(resume["batch_cursor"]) if resume else 0
+        total = torch.tensor(float(resume["total"]) if resume else 0.0, dtype=torch.float64, device=self.device)
+        count = int(resume["count"]) if resume else 0
+        seen = 0
+        every = int(CONFIG.get("train_checkpoint_every_batches", 0) or 0)
+        pending = 0
+        since_checkpoint = 0
+        stage = "train" if train else "val"
+        start = time.perf_counter()
+        if train:
+            self.optimizer.zero_grad(set_to_none=True)
+        with contextlib.nullcontext() if train else torch.no_grad():
+            for batch_idx, batch in enumerate(self._iterate(loader, resume), start=start_batch):
+                if max_batches is not None and batch_idx >= max_batches:
+                    break
+                # Safe with reused pinned buffers: MemmapBatchDataset waits on
+                # this copy before refilling the buffer it came from.
+                x = batch.to(self.device, non_blocking=True)
+                loss = self._loss(x)
+                if train:
+                    (loss / self.accum_steps).backward()
+                    pending += 1
+                    if pending == self.accum_steps:
+                        self.optimizer.step()
+                        self.optimizer.zero_grad(set_to_none=True)
+                        pending = 0
+                total += loss.detach().double() * x.shape[0]
+                count += x.shape[0]
+                seen += x.shape[0]
+                since_checkpoint += 1
+                # Counted rather than `batch_idx % every`: with accumulation
+                # steps that don't divide `every`, step boundaries would only
+                # line up every lcm batches.
+                if checkpoint is not None and every and not pending and since_checkpoint >= every:
+                    checkpoint(batch_idx + 1, epoch_rng, total.item(), count)
+                    since_checkpoint = 0
+                if log_interval_batches and (batch_idx + 1) % log_interval_batches == 0:
+                    elapsed = time.perf_counter() - start
+                    eta_sec = elapsed / (batch_idx + 1 - start_batch) * max(target_batches - (batch_idx + 1), 0)
+                    log_progress(
+                        f"{self.label} {stage}: batch {batch_idx + 1}/{target_batches} | "
+                        f"avg_loss={total.item() / max(count, 1):.6f} | elapsed={fmt_seconds(elapsed)} | "
+                        f"eta={fmt_seconds(eta_sec)}"
+                    )
+        if train and pending:
+            # Partial accumulation window at the end of the epoch.
+            self.optimizer.step()
+            self.optimizer.zero_grad(set_to_none=True)
+        seconds = time.perf_counter() - start
+        return {
+            "loss": total.item() / max(count, 1),
+            "samples": count,
+            "seconds": seconds,
+            "samples_per_sec": seen / seconds if seconds > 0 else 0.0,
+        }
+
+    def save_checkpoint(self, path: str, **cursor) -> None:
+        """Atomically write a full training checkpoint to `path`."""
+        state = {
+            "model_state_dict": self.model.state_dict(),
+            "optimizer_state_dict": self.optimizer.state_dict(),
+            "best_val": self.best_val,
+            "best_epoch": self.best_epoch,
+            "no_improve": self.no_improve,
+            "history": self.history,
+            "fingerprint": self.fingerprint,
+            "rng": _rng_state(),
+            **cursor,
+        }
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path: str) -> dict | None:
+        """Restore model, optimizer and counters from `path`.
+
+        Returns the checkpoint, or None (start fresh) when it is missing or
+        was written with a different training configuration.
+        """
+        if not os.path.exists(path):
+            log_note(f"{self.label}: no resume checkpoint at {path}; starting fresh")
+            return None
+        state = torch.load(path, map_location=self.device, weights_only=False)
+        if state.get("fingerprint") != self.fingerprint:
+            logging.warning("%s: resume checkpoint %s has a different training config; starting fresh", self.label, path)
+            return None
+        self.model.load_state_dict(state["model_state_dict"])
+        self.optimizer.load_state_dict(state["optimizer_state_dict"])
+        self.best_val = state["best_val"]
+        self.best_epoch = state["best_epoch"]
+        self.no_improve = state["no_improve"]
+        self.history = list(state["history"])
+        return state
+
+    def fit(
+        self,
+        train_loader,
+        val_loader,
+        epochs: int,
+        patience: int,
+        on_improve,
+        max_train_batches: int | None = None,
+        max_val_batches: int | None = None,
+        log_interval_batches: int | None = None,
+        log_tag: str = "ae",
+        checkpoint_path: str | None = None,
+        resume: bool = False,
+        fingerprint: dict | None = None,
+    ) -> dict:
+        """Train with early stopping on validation loss.
+
+        `on_improve(epoch, best_val)` is called whenever validation loss
+        improves (the trainers save their checkpoint there). With
+        `checkpoint_path`, full checkpoints are written there; `resume`
+        continues from one whose `fingerprint` matches. Returns
+        `best_val`, `best_epoch`, `epochs_run` and per-epoch `history`.
+        """
+        self.best_val = float("inf")
+        self.best_epoch = 0
+        self.no_improve = 0
+        self.history = []
+        self.fingerprint = fingerprint or {}
+        state = self.load_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+        start_epoch = 1
+        mid_epoch = None
+        if state is not None:
+            start_epoch = int(state["epoch"])
+            if state["batch_cursor"]:
+                mid_epoch = state
+            else:
+                _set_rng_state(state["rng"])
+            log_note(
+                f"{self.label}: resuming at epoch {start_epoch}, batch {state['batch_cursor']} "
+                f"(best epoch {self.best_epoch}, val_loss={self.best_val:.6f})"
+            )
+            if state.get("stopped_early"):
+                log_note(f"{self.label}: checkpoint already stopped early; nothing to resume")
+                start_epoch = epochs + 1
+
+        def checkpoint(epoch, batch_cursor, epoch_rng, total, count):
+            self.save_checkpoint(
+                checkpoint_path,
+                epoch=epoch,
+                batch_cursor=batch_cursor,
+                epoch_rng=epoch_rng,
+                total=total,
+                count=count,
+            )
+
+        for epoch in range(start_epoch, epochs + 1):
+            train_stats = self.run_epoch(
+                train_loader,
+                train=True,
+                max_batches=max_train_batches,
+                log_interval_batches=log_interval_batches,
+                resume=mid_epoch,
+                checkpoint=(lambda *cursor, epoch=epoch: checkpoint(epoch, *cursor)) if checkpoint_path else None,
+            )
+            mid_epoch = None
+            val_stats = self.run_epoch(
+                val_loader, train=False, max_batches=max_val_batches, log_interval_batches=log_interval_batches
+            )
+            self.history.append({"epoch": epoch, "train": train_stats, "val": val_stats})
+            logging.info(
+                "[%s] epoch=%s train_loss=%.6f val_loss=%.6f train_samples_per_sec=%.0f epoch_time=%s",
+                log_tag,
+                epoch,
+                train_stats["loss"],
+                val_stats["loss"],
+                train_stats["samples_per_sec"],
+                fmt_seconds(train_stats["seconds"] + val_stats["seconds"]),
+            )
+
+            stop = False
+            if val_stats["loss"] < self.best_val:
+                self.best_val = val_stats["loss"]
+                self.best_epoch = epoch
+                self.no_improve = 0
+                on_improve(epoch, self.best_val)
+            else:
+                self.no_improve += 1
+                stop = self.no_improve >= patience
+            if checkpoint_path:
+                self.save_checkpoint(checkpoint_path, epoch=epoch + 1, batch_cursor=0, stopped_early=stop)
+            if stop:
+                logging.info("[%s] early stopping at epoch %s (best epoch %s)", log_tag, epoch, self.best_epoch)
+                break
+        return {
+            "best_val": self.best_val,
+            "best_epoch": self.best_epoch,
+            "epochs_run": len(self.history),
+            "history": self.history,
+        }
+
+
+def _chain_first(first, iterator):
+    yield first
+    yield from iterator
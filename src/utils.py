@@ -14,6 +14,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+from .config import CONFIG
+from .discovery import discover_ims_files, walk_ims_names
+
 
 def _has_min_rows(file_path, min_rows):
     """Return True if text file has at least `min_rows` non-empty lines."""
@@ -31,18 +34,16 @@ def _has_min_rows(file_path, min_rows):
 def list_ims_files(folder, seq_length=100):
     """Return IMS file paths that can produce at least one sequence.
 
-    Files that cannot be read are skipped with a logged warning.
+    With CONFIG["discovery_engine"] == "manifest" (default) files are
+    classified by size plus a bounded head read and cached in a manifest
+    (see `discovery.py`); "scan" keeps the line-by-line check. Files that
+    cannot be read are skipped with a logged warning.
     """
-    files = []
-    for root, dirs, filenames in os.walk(folder):
-        for f in filenames:
-            # ends with .## where ## are digits
-            if len(f) >= 3 and f[-3] == "." and f[-2:].isdigit():
-                files.append(os.path.join(root, f))
-    files.sort()
+    if CONFIG.get("discovery_engine", "manifest") == "manifest":
+        return discover_ims_files(folder, seq_length=seq_length)
 
     valid_files = []
-    for fpath in files:
+    for fpath in walk_ims_names(folder):
         try:
             # Quick pass: avoid loading full numeric arrays just to ensure
             # enough timesteps exist for one sequence.
@@ -53,6 +54,33 @@ def list_ims_files(folder, seq_length=100):
 
     return valid_files
 
+
+def scan_ims_shape(file_path):
+    """Return `(rows, columns)` of an IMS text file without parsing floats.
+
+    Tokens are counted with a vectorized byte scan, which is far cheaper
+    than `np.loadtxt` and matches its whitespace tokenization. Ragged
+    files raise ValueError, mirroring `np.loadtxt`.
+    """
+    with open(file_path, "rb") as fh:
+        data = fh.read()
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size == 0:
+        return 0, 0
+    # Space, tab, LF, VT, FF, CR.
+    is_space = (raw == 32) | ((raw >= 9) & (raw <= 13))
+    starts = np.count_nonzero(is_space[:-1] & ~is_space[1:]) + int(not is_space[0])
+    first_line = data.lstrip().split(b"\n", 1)[0]
+    columns = len(first_line.split())
+    if columns == 0:
+        return 0, 0
+    if starts % columns != 0:
+        raise ValueError(
+            f"{file_path}: {starts} values do not form rows of {columns} columns"
+        )
+    return int(starts // columns), int(columns)
+
+
 def plot_health_curve(scores, title="Machine Health Curve"):
     """Plot file-level mean anomaly scores"""
     fig, ax = plt.subplots(figsize=(12, 5))
@@ -0,0 +1,182 @@
+"""Virtual window storage: keep each scaled signal once, window on demand.
+
+With `dataset_layout="virtual"` preprocessing stores, per split, the
+contiguous scaled signal span that each file's windows cover, plus a
+small offset index saved next to it (`<memmap>.index.npy`). With
+stride 5 and 100-sample windows this is ~20x smaller than the dense
+`(n, seq_len, 1)` layout.
+
+`VirtualWindowDataset` serves the same `(n, seq_len, channels)` windows
+as a read-only array-like: slices within one file are strided views,
+and anything spanning files is gathered with one vectorized fancy-index.
+"""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+from .sharded_memmap import ShardedMemmap
+from .windowing import window_view
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("signal_start", np.int64),
+        ("window_start", np.int64),
+        ("num_windows", np.int64),
+    ]
+)
+
+
+def index_path_for(memmap_path: str) -> str:
+    """Return the offset index path stored next to a virtual memmap."""
+    return f"{memmap_path}.index.npy"
+
+
+def window_span(num_windows: int, seq_length: int, stride: int) -> int:
+    """Return how many signal samples `num_windows` windows cover."""
+    if num_windows <= 0:
+        return 0
+    return (int(num_windows) - 1) * int(stride) + int(seq_length)
+
+
+def save_window_index(memmap_path: str, rows) -> None:
+    """Persist `(signal_start, window_start, num_windows)` rows."""
+    index = np.array([tuple(int(v) for v in row) for row in rows], dtype=INDEX_DTYPE)
+    np.save(index_path_for(memmap_path), index)
+
+
+class VirtualWindowDataset:
+    """Array-like view of sliding windows over a stored signal.
+
+    Supports `len`, `.shape`, integer/slice/array indexing, `reshape` to
+    `(n, -1)` for tree models, and `np.asarray` (which materializes).
+    Returned windows are read-only when they are views.
+    """
+
+    def __init__(self, signal, index, seq_length: int, stride: int, flatten: bool = False):
+        self._signal = signal if signal.ndim == 2 else signal.reshape(-1, 1)
+        self._index = np.asarray(index, dtype=INDEX_DTYPE)
+        self._seq_length = int(seq_length)
+        self._stride = int(stride)
+        self._flatten = bool(flatten)
+        self._window_starts = self._index["window_start"]
+        self._signal_starts = self._index["signal_start"]
+        self._num_windows = int(self._index["num_windows"].sum()) if self._index.size else 0
+        self._offsets = np.arange(self._seq_length, dtype=np.int64)
+
+    @classmethod
+    def open(cls, memmap_path: str, meta: dict, flatten: bool = False) -> "VirtualWindowDataset":
+        """Open a virtual dataset from its signal memmap and metadata."""
+        channels = int(meta.get("n_channels", 1))
+        n_samples = int(meta["num_signal_samples"])
+        dtype = meta.get("dtype", "float32")
+        if meta.get("sharded"):
+            signal = ShardedMemmap.open(memmap_path)
+        elif n_samples > 0:
+            signal = np.memmap(memmap_path, dtype=dtype, mode="r", shape=(n_samples, channels))
+        else:
+            signal = np.empty((0, channels), dtype=dtype)
+        index_path = index_path_for(memmap_path)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Virtual window index not found: {index_path}")
+        index = np.load(index_path)
+        return cls(signal, index, meta["sequence_length"], meta["stride"], flatten=flatten)
+
+    @property
+    def channels(self) -> int:
+        return int(self._signal.shape[1])
+
+    @property
+    def dtype(self):
+        return self._signal.dtype
+
+    @property
+    def shape(self) -> tuple:
+        if self._flatten:
+            return (self._num_windows, self._seq_length * self.channels)
+        return (self._num_windows, self._seq_length, self.channels)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self._num_windows
+
+    def reshape(self, *shape):
+        """Support the `(n, -1)` flattening used by tree-model loaders."""
+        if len(shape) == 1 and isinstance(shape[0], tuple):
+            shape = shape[0]
+        if len(shape) == 2 and shape[0] == self._num_windows and shape[1] in (-1, self._seq_length * self.channels):
+            return VirtualWindowDataset(self._signal, self._index, self._seq_length, self._stride, flatten=True)
+        if tuple(shape) == self.shape:
+            return self
+        raise ValueError(f"VirtualWindowDataset cannot be reshaped to {shape}")
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[0 : self._num_windows]
+        return np.asarray(out, dtype=dtype) if dtype is not None else np.asarray(out)
+
+    def _shape_out(self, windows: np.ndarray) -> np.ndarray:
+        if self._flatten:
+            return windows.reshape(windows.shape[0], -1)
+        return windows
+
+    def _file_pos(self, window_idx):
+        return np.searchsorted(self._window_starts, window_idx, side="right") - 1
+
+    def _gather(self, idx: np.ndarray) -> np.ndarray:
+        idx = np.asarray(idx, dtype=np.int64)
+        if idx.size and (idx.min() < -self._num_windows or idx.max() >= self._num_windows):
+            raise IndexError("window index out of range")
+        idx = np.where(idx < 0, idx + self._num_windows, idx)
+        pos = self._file_pos(idx)
+        base = self._signal_starts[pos] + (idx - self._window_starts[pos]) * self._stride
+        windows = np.asarray(self._signal[base[:, None] + self._offsets])
+        return self._shape_out(windows)
+
+    def _slice(self, start: int, stop: int) -> np.ndarray:
+        if stop <= start:
+            return self._shape_out(np.empty((0, self._seq_length, self.channels), dtype=self.dtype))
+        first = int(self._file_pos(start))
+        last = int(self._file_pos(stop - 1))
+        parts = []
+        for pos in range(first, last + 1):
+            w0 = int(self._window_starts[pos])
+            lo = max(start, w0) - w0
+            hi = min(stop, w0 + int(self._index["num_windows"][pos])) - w0
+            sig0 = int(self._signal_starts[pos]) + lo * self._stride
+            sig1 = sig0 + window_span(hi - lo, self._seq_length, self._stride)
+            parts.append(window_view(self._signal[sig0:sig1], self._seq_length, self._stride))
+        windows = parts[0] if len(parts) == 1 else np.concatenate(parts, axis=0)
+        if self._flatten and len(parts) == 1:
+            # Flattening a strided view needs a copy; keep it explicit.
+            return np.ascontiguousarray(windows).reshape(windows.shape[0], -1)
+        return self._shape_out(windows)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            head, rest = key[0], key[1:]
+            out = self[head]
+            if isinstance(head, (int, np.integer)):
+                return out[rest]
+            return out[(slice(None),) + rest]
+        if isinstance(key, (int, np.integer)):
+            idx = int(key) + self._num_windows if key < 0 else int(key)
+            if not 0 <= idx < self._num_windows:
+                raise IndexError("window index out of range")
+            pos = int(self._file_pos(idx))
+            base = int(self._signal_starts[pos]) + (idx - int(self._window_starts[pos])) * self._stride
+            window = self._signal[base : base + self._seq_length]
+            return window.reshape(-1) if self._flatten else window
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._num_windows)
+            if step == 1:
+                return self._slice(start, stop)
+            return self._gather(np.arange(start, stop, step))
+        key = np.asarray(key)
+        if key.dtype == bool:
+            key = np.flatnonzero(key)
+        return self._gather(key)
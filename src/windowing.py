@@ -0,0 +1,51 @@
+"""Vectorized sliding-window helpers.
+
+Windows are exposed as strided views over the source signal
+(`sliding_window_view` plus stride slicing), so no per-window Python
+objects are created. Callers that need owned memory either copy once
+with `create_sequences` or write straight into a destination buffer
+with `write_windows`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def count_sequences(signal_length, seq_length, stride):
+    """Return number of sliding windows without materializing sequences."""
+    if signal_length < seq_length:
+        return 0
+    return ((signal_length - seq_length) // stride) + 1
+
+
+def window_view(signal, seq_length, stride):
+    """Return a read-only `(n, seq_length, ...)` view of sliding windows.
+
+    Trailing signal dimensions (e.g. channels) are preserved after the
+    window axis. The final window is included when it lands exactly on
+    the tail, matching `count_sequences`.
+    """
+    signal = np.asarray(signal)
+    n_seqs = count_sequences(len(signal), seq_length, stride)
+    if n_seqs == 0:
+        return np.empty((0, seq_length) + signal.shape[1:], dtype=signal.dtype)
+    # sliding_window_view appends the window axis last: (n, ..., seq).
+    view = sliding_window_view(signal, seq_length, axis=0)[::stride]
+    return np.moveaxis(view, -1, 1)
+
+
+def write_windows(signal, seq_length, stride, out):
+    """Write sliding windows of `signal` into `out` and return the count.
+
+    `out` is typically a memmap slice sized from `count_sequences`, so the
+    windows are copied exactly once, straight to their destination.
+    """
+    windows = window_view(signal, seq_length, stride)
+    if out.shape[0] != windows.shape[0]:
+        raise ValueError(
+            f"Destination holds {out.shape[0]} windows but signal yields {windows.shape[0]}"
+        )
+    np.copyto(out, windows, casting="same_kind")
+    return windows.shape[0]
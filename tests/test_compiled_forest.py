@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from src.compiled_forest import CompiledForest, compile_forest, compiled_path_for, load_if_scorer
+from src.config import CONFIG
+
+
+class TestCompiledForest(unittest.TestCase):
+    """Compiled inference must reproduce sklearn scores bit for bit."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.train = rng.normal(size=(600, 12)).astype(np.float32)
+        self.test = np.vstack([rng.normal(size=(300, 12)), rng.normal(scale=4.0, size=(50, 12))])
+
+    def test_matches_sklearn(self):
+        for max_features in (1.0, 0.5):
+            for max_samples in ("auto", 37):
+                with self.subTest(max_features=max_features, max_samples=max_samples):
+                    model = IsolationForest(
+                        n_estimators=25, max_features=max_features, max_samples=max_samples, random_state=1
+                    ).fit(self.train)
+                    compiled = compile_forest(model)
+                    np.testing.assert_array_equal(
+                        compiled.decision_function(self.test), model.decision_function(self.test)
+                    )
+                    np.testing.assert_array_equal(
+                        compiled.score_samples(self.test, batch_size=7), model.score_samples(self.test)
+                    )
+
+    def test_rejects_wrong_feature_count(self):
+        compiled = compile_forest(IsolationForest(n_estimators=3, random_state=0).fit(self.train))
+        with self.assertRaises(ValueError):
+            compiled.decision_function(self.test[:, :5])
+
+    def test_cache_round_trip_and_rebuild(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "isolation_forest.model")
+            model = IsolationForest(n_estimators=5, random_state=0).fit(self.train)
+            joblib.dump(model, model_path)
+            with mock.patch.dict(CONFIG, {"if_inference_engine": "compiled"}):
+                scorer = load_if_scorer(model_path)
+            self.assertIsInstance(scorer, CompiledForest)
+            self.assertTrue(os.path.exists(compiled_path_for(model_path)))
+            np.testing.assert_array_equal(scorer.decision_function(self.test), model.decision_function(self.test))
+
+            # An unchanged model is served from the cache without recompiling.
+            cache_stat = os.stat(compiled_path_for(model_path))
+            with mock.patch("src.compiled_forest.compile_forest", side_effect=AssertionError("recompiled")):
+                cached = load_if_scorer(model_path, engine="compiled")
+                load_if_scorer(model_path, engine="compiled")
+            np.testing.assert_array_equal(cached.decision_function(self.test), model.decision_function(self.test))
+            self.assertEqual(os.stat(compiled_path_for(model_path)).st_mtime_ns, cache_stat.st_mtime_ns)
+
+            # A retrained model invalidates the cached arrays.
+            retrained = IsolationForest(n_estimators=8, random_state=3).fit(self.train)
+            joblib.dump(retrained, model_path)
+            os.utime(model_path, ns=(0, 12345))
+            rebuilt = load_if_scorer(model_path, engine="compiled")
+            self.assertEqual(rebuilt.n_estimators, 8)
+            np.testing.assert_array_equal(rebuilt.decision_function(self.test), retrained.decision_function(self.test))
+
+            self.assertIsInstance(load_if_scorer(model_path, engine="sklearn"), IsolationForest)
+            with self.assertRaises(ValueError):
+                load_if_scorer(model_path, engine="onnx")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,24 @@
 import os
+import pickle
 import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
+import torch
 
 from src.config import CONFIG
-from src.dataset import load_memmap_dataset
+from src.dataset import (
+    MemmapBatchDataset,
+    MemmapBatchSampler,
+    MemmapTorchDataset,
+    load_memmap_dataset,
+    make_torch_dataloaders,
+    resolve_num_workers,
+)
+from src.preprocessing import run_ingest
 from src.utils import write_memmap_metadata
+from tests.test_preprocessing import _toy_config, _write_ims_files
 
 
 class TestDataset(unittest.TestCase):
@@ -32,6 +44,146 @@ class TestDataset(unittest.TestCase):
             finally:
                 CONFIG["memmap_file"] = old_path
 
+    def test_batch_sampler_covers_each_window_once(self):
+        for order in ("sorted", "blocks"):
+            with self.subTest(order=order):
+                generator = torch.Generator().manual_seed(0)
+                sampler = MemmapBatchSampler(23, 5, shuffle=True, order=order, generator=generator)
+                batches = [np.arange(23)[key] for key in sampler]
+                self.assertEqual(len(batches), len(sampler))
+                self.assertEqual(sorted(np.concatenate(batches).tolist()), list(range(23)))
+                for batch in batches:
+                    self.assertTrue(np.all(np.diff(batch) > 0))
+        sequential = list(MemmapBatchSampler(7, 3, shuffle=False))
+        self.assertEqual(sequential, [slice(0, 3), slice(3, 6), slice(6, 7)])
+
+    def test_batched_loader_matches_memmap_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            cases = [("dense", "float32", "memmap"), ("virtual", "float32", "memmap"), ("dense", "int16", "memmap")]
+            cases += [("dense", "float32", "ram"), ("virtual", "int16", "ram")]
+            for layout, storage, cache in cases:
+                config = dict(
+                    _toy_config(out_dir),
+                    dataset_layout=layout,
+                    storage_dtype=storage,
+                    torch_batch_size=5,
+                    torch_data_cache=cache,
+                )
+                with self.subTest(layout=layout, storage=storage, cache=cache), mock.patch.dict(CONFIG, config):
+                    run_ingest(files)
+                    data = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                    dataset = MemmapBatchDataset("healthy_train", flatten=True, batch_size=5)
+                    self.assertEqual(dataset.in_memory, cache == "ram")
+                    np.testing.assert_array_equal(dataset[np.array([0, 3, 4])].numpy(), data[[0, 3, 4]])
+                    np.testing.assert_array_equal(dataset[slice(2, 6)].numpy(), data[2:6])
+
+                    train_loader, val_loader = make_torch_dataloaders(flatten=True)
+                    seen = torch.cat([batch.clone() for batch in train_loader]).numpy()
+                    self.assertEqual(len(train_loader), -(-len(data) // 5))
+                    order = np.lexsort(seen.T[::-1])
+                    np.testing.assert_array_equal(seen[order], data[np.lexsort(data.T[::-1])])
+                    val = np.asarray(load_memmap_dataset(flatten_for_tree=False, split="healthy_val"))
+                    with mock.patch.dict(CONFIG, {"torch_loader": "item"}):
+                        _, item_val = make_torch_dataloaders(flatten=False)
+                    _, batched_val = make_torch_dataloaders(flatten=False)
+                    np.testing.assert_array_equal(torch.cat(list(item_val)).numpy(), val)
+                    np.testing.assert_array_equal(torch.cat([b.clone() for b in batched_val]).numpy(), val)
+
+    def test_ram_cache_fit_check_and_zero_copy_slices(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, dict(_toy_config(out_dir), torch_data_cache="auto")):
+                run_ingest(files)
+                nbytes = load_memmap_dataset(flatten_for_tree=False, split="healthy_train").size * 4
+                with mock.patch("src.dataset.available_memory_bytes", return_value=nbytes - 1):
+                    self.assertFalse(MemmapBatchDataset("healthy_train", flatten=False, batch_size=4).in_memory)
+                with mock.patch("src.dataset.available_memory_bytes", return_value=None):
+                    self.assertFalse(MemmapBatchDataset("healthy_train", flatten=False, batch_size=4).in_memory)
+                with mock.patch("src.dataset.available_memory_bytes", return_value=4 * nbytes):
+                    dataset = MemmapBatchDataset("healthy_train", flatten=False, batch_size=4)
+                self.assertTrue(dataset.in_memory)
+                batch = dataset[slice(4, 8)]
+                self.assertEqual(batch.untyped_storage().data_ptr(), dataset._tensor.untyped_storage().data_ptr())
+                np.testing.assert_array_equal(
+                    batch.numpy(), load_memmap_dataset(flatten_for_tree=False, split="healthy_train")[4:8]
+                )
+
+    def test_pinned_batches_are_double_buffered(self):
+        log = []
+
+        class FakeEvent:
+            def __init__(self):
+                self.id = len([entry for entry in log if entry[0] == "record"])
+
+            def record(self):
+                log.append(("record", self.id))
+
+            def synchronize(self):
+                log.append(("sync", self.id))
+
+        real_empty = torch.empty
+
+        def unpinned_empty(*args, pin_memory=False, **kwargs):
+            return real_empty(*args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, dict(_toy_config(out_dir), torch_data_cache="memmap")):
+                run_ingest(files)
+                dataset = MemmapBatchDataset("healthy_train", flatten=False, batch_size=2)
+                dataset._pin = True
+                with mock.patch("torch.cuda.Event", FakeEvent), mock.patch("torch.empty", unpinned_empty):
+                    first, second, third = (dataset[np.array([row])] for row in range(3))
+        # Alternating buffers: a batch survives the next gather, so its
+        # non_blocking copy can still be in flight.
+        self.assertNotEqual(first.data_ptr(), second.data_ptr())
+        self.assertEqual(first.data_ptr(), third.data_ptr())
+        # The third gather reuses the first buffer only after waiting on the
+        # event recorded once the first batch's copy was queued.
+        self.assertEqual(log, [("record", 0), ("record", 1), ("sync", 0)])
+
+    def test_worker_count_and_lazy_memmaps_in_workers(self):
+        with mock.patch("os.sched_getaffinity", return_value=set(range(8))):
+            self.assertEqual(resolve_num_workers("auto"), 4)
+            with mock.patch.dict(CONFIG, {"torch_max_auto_workers": 16}):
+                self.assertEqual(resolve_num_workers("auto"), 7)
+        with mock.patch("os.sched_getaffinity", return_value={0}):
+            self.assertEqual(resolve_num_workers("auto"), 0)
+        self.assertEqual(resolve_num_workers(3), 3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            config = dict(_toy_config(out_dir), torch_batch_size=4, torch_data_cache="memmap", num_workers=2)
+            with mock.patch.dict(CONFIG, config):
+                run_ingest(files)
+                data = np.asarray(load_memmap_dataset(flatten_for_tree=False, split="healthy_val"))
+                datasets = (
+                    MemmapTorchDataset("healthy_val", flatten=False),
+                    MemmapBatchDataset("healthy_val", flatten=False, batch_size=4),
+                )
+                for dataset in datasets:
+                    # Pickles carry the split name, not the mapped data.
+                    payload = pickle.dumps(dataset)
+                    self.assertLess(len(payload), data.nbytes)
+                    np.testing.assert_array_equal(np.asarray(pickle.loads(payload)[slice(0, 3)]), data[:3])
+
+                for loader_mode in ("item", "batched"):
+                    with self.subTest(loader=loader_mode), mock.patch.dict(CONFIG, {"torch_loader": loader_mode}):
+                        _, val_loader = make_torch_dataloaders(flatten=False)
+                        self.assertEqual(val_loader.num_workers, 2)
+                        self.assertTrue(val_loader.persistent_workers)
+                        for _ in range(2):
+                            np.testing.assert_array_equal(torch.cat(list(val_loader)).numpy(), data)
+
 
 if __name__ == "__main__":
     unittest.main()
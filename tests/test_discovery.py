@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src import discovery
+from src.discovery import discover_ims_files, load_manifest
+from src.utils import list_ims_files
+
+
+def _write_file(path, rows, columns=4):
+    np.savetxt(path, np.zeros((rows, columns)), fmt="%.3f", delimiter="\t")
+
+
+class TestDiscovery(unittest.TestCase):
+    """Tests for manifest-backed IMS file discovery."""
+
+    def _config(self, tmp, **overrides):
+        return dict(
+            {"discovery_manifest_file": os.path.join(tmp, "manifest.json"), "discovery_probe_bytes": 256},
+            **overrides,
+        )
+
+    def _make_tree(self, tmp):
+        data = os.path.join(tmp, "raw", "1st_test")
+        os.makedirs(data)
+        for idx, rows in enumerate([12, 3, 40, 0, 11]):
+            _write_file(os.path.join(data, f"2003.10.22.12.{idx:02d}.00"), rows)
+        _write_file(os.path.join(data, "notes.txt"), 50)
+        return data
+
+    def test_manifest_matches_line_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = self._make_tree(tmp)
+            for workers in (1, 4):
+                with mock.patch.dict(CONFIG, self._config(tmp, discovery_engine="scan")):
+                    expected = list_ims_files(data, seq_length=11)
+                with mock.patch.dict(CONFIG, self._config(tmp, discovery_workers=workers)):
+                    found = list_ims_files(data, seq_length=11)
+                self.assertEqual(found, expected)
+                self.assertEqual([os.path.basename(p)[-5:-3] for p in found], ["00", "02", "04"])
+
+    def test_warm_run_does_not_read_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = self._make_tree(tmp)
+            with mock.patch.dict(CONFIG, self._config(tmp)):
+                stats = {}
+                cold = discover_ims_files(data, seq_length=11, stats=stats)
+                self.assertEqual(stats["probed"], 5)
+                self.assertEqual(len(load_manifest()), 5)
+                with mock.patch.object(discovery, "probe_rows", side_effect=AssertionError("file was read")):
+                    warm = discover_ims_files(data, seq_length=11, stats=stats)
+                self.assertEqual(warm, cold)
+                self.assertEqual(stats["probed"], 0)
+
+                # A changed file is probed again; the others stay cached.
+                target = os.path.join(data, "2003.10.22.12.01.00")
+                _write_file(target, 30)
+                os.utime(target, ns=(time.time_ns(), time.time_ns() + 10**9))
+                refreshed = discover_ims_files(data, seq_length=11, stats=stats)
+                self.assertEqual(stats["probed"], 1)
+                self.assertIn(target, refreshed)
+
+    def test_raw_listing_digest_sees_same_size_rewrites(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = self._make_tree(tmp)
+            before = discovery.raw_listing_digest(data)
+            self.assertEqual(discovery.raw_listing_digest(data), before)
+            target = os.path.join(data, "2003.10.22.12.02.00")
+            size = os.path.getsize(target)
+            np.savetxt(target, np.ones((40, 4)), fmt="%.3f", delimiter="\t")
+            os.utime(target, ns=(time.time_ns(), time.time_ns() + 10**9))
+            self.assertEqual(os.path.getsize(target), size)
+            self.assertNotEqual(discovery.raw_listing_digest(data), before)
+
+    def test_probe_rows_handles_long_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wide.01")
+            _write_file(path, 7, columns=200)
+            with mock.patch.dict(CONFIG, {"discovery_probe_bytes": 64}):
+                self.assertEqual(discovery.probe_rows(path, os.path.getsize(path), 100), (7, True))
+                self.assertGreaterEqual(discovery.probe_rows(path, os.path.getsize(path), 3)[0], 3)
+
+    def test_probe_rows_counts_last_row_without_newline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "short.01")
+            with open(path, "wb") as fh:
+                fh.write(b"1\n2\n3")
+            self.assertEqual(discovery.probe_rows(path, os.path.getsize(path), 3), (3, True))
+            self.assertEqual(discovery.probe_rows(path, os.path.getsize(path), 4), (0, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+import matplotlib.pyplot as plt
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.eval_cache import EvalCache, cached_evaluation
+from src.evaluate import machine_health_curve
+from src.preprocessing import run_ingest
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class TestEvalCache(unittest.TestCase):
+    """Tests for checkpoint-aware evaluation memoization."""
+
+    def test_hit_restores_diagnostics_and_keys_on_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, _toy_config(out_dir)):
+                run_ingest(files)
+                train = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                model_path = os.path.join(out_dir, "isolation_forest.model")
+                joblib.dump(IsolationForest(n_estimators=10, random_state=0).fit(train), model_path)
+                calls = []
+
+                def evaluate():
+                    calls.append(1)
+                    result = machine_health_curve()
+                    plt.close("all")
+                    return result
+
+                first = cached_evaluation("isolation_forest", evaluate)
+                self.assertFalse(first["cache_hit"])
+                diagnostics_dir = first["diagnostics_dir"]
+                metrics_path = os.path.join(diagnostics_dir, "isolation_forest_file_metrics.json")
+                with open(metrics_path, "rb") as fh:
+                    metrics = fh.read()
+
+                shutil.rmtree(diagnostics_dir)
+                second = cached_evaluation("isolation_forest", evaluate)
+                self.assertTrue(second["cache_hit"])
+                self.assertEqual(second["threshold"], first["threshold"])
+                self.assertEqual(len(calls), 1)
+                with open(metrics_path, "rb") as fh:
+                    self.assertEqual(fh.read(), metrics)
+                self.assertTrue(os.path.exists(os.path.join(diagnostics_dir, "isolation_forest_scores.npy")))
+
+                # Eval config, call params and the checkpoint are all part of the key.
+                with mock.patch.dict(CONFIG, {"score_threshold_percentile": 5.0}):
+                    self.assertFalse(cached_evaluation("isolation_forest", evaluate)["cache_hit"])
+                self.assertFalse(cached_evaluation("isolation_forest", evaluate, params={"limit": 3})["cache_hit"])
+                joblib.dump(IsolationForest(n_estimators=11, random_state=0).fit(train), model_path)
+                self.assertFalse(cached_evaluation("isolation_forest", evaluate)["cache_hit"])
+                self.assertEqual(len(calls), 4)
+
+                with mock.patch.dict(CONFIG, {"eval_cache_enabled": False}):
+                    self.assertFalse(cached_evaluation("isolation_forest", evaluate)["cache_hit"])
+                self.assertEqual(len(calls), 5)
+
+    def test_lru_eviction_by_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "diagnostics")
+            os.makedirs(source)
+            with open(os.path.join(source, "a.bin"), "wb") as fh:
+                fh.write(b"x" * 100)
+            cache = EvalCache(root=os.path.join(tmp, "cache"), max_bytes=250)
+            for key in ("k1", "k2"):
+                cache.store(key, "isolation_forest", source, ["a.bin"], {"threshold": 1.0})
+            # Using k1 makes k2 the least recently used entry.
+            self.assertEqual(cache.restore("k1", os.path.join(tmp, "restored")), {"threshold": 1.0})
+            cache.store("k3", "isolation_forest", source, ["a.bin"], {"threshold": 2.0})
+
+            reloaded = EvalCache(root=os.path.join(tmp, "cache"), max_bytes=250)
+            self.assertEqual(sorted(reloaded.index["entries"]), ["k1", "k3"])
+            self.assertEqual(reloaded.total_bytes, 200)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "cache", "k2")))
+            self.assertIsNone(reloaded.restore("k2", source))
+
+
+if __name__ == "__main__":
+    unittest.main()
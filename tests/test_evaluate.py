@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+import matplotlib.pyplot as plt
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.evaluate import machine_health_curve
+from src.preprocessing import run_ingest
+from src.score_store import stored_file_anomaly_rates
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class _CountingForest:
+    """Delegate to a fitted forest while counting scored windows."""
+
+    def __init__(self, model):
+        self.model = model
+        self.windows_scored = 0
+
+    def decision_function(self, X):
+        self.windows_scored += len(X)
+        return self.model.decision_function(X)
+
+
+class TestMachineHealthCurve(unittest.TestCase):
+    """Memmap and streaming IF evaluation must agree."""
+
+    def test_streaming_scores_each_window_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            metrics = {}
+            for name, create_all in (("memmap", True), ("stream", False)):
+                out_dir = os.path.join(tmp, name)
+                os.makedirs(out_dir)
+                config = dict(_toy_config(out_dir), create_all_memmap=create_all, if_inference_engine="sklearn")
+                with mock.patch.dict(CONFIG, config):
+                    _, paths, _ = run_ingest(files)
+                    self.assertEqual(paths["all"] is not None, create_all)
+                    train = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                    forest = _CountingForest(IsolationForest(n_estimators=10, random_state=0).fit(train))
+                    joblib.dump(forest.model, os.path.join(out_dir, "isolation_forest.model"))
+                    loads = [forest, joblib.load(CONFIG["scaler_file"])]
+                    with mock.patch("src.evaluate.joblib.load", side_effect=loads):
+                        result = machine_health_curve(save_path=os.path.join(out_dir, "curve.png"))
+                    plt.close("all")
+                    with open(os.path.join(result["diagnostics_dir"], "isolation_forest_file_metrics.json")) as fh:
+                        metrics[name] = json.load(fh)
+                    scores = np.load(os.path.join(result["diagnostics_dir"], "isolation_forest_scores.npy"))
+                # healthy_val threshold windows + every `all` window, each scored once.
+                self.assertEqual(forest.windows_scored, 25 + 5 * 25)
+                self.assertEqual(len(scores), 5 * 25)
+
+            self.assertEqual(len(metrics["stream"]), 5)
+            for a, b in zip(metrics["memmap"], metrics["stream"]):
+                self.assertAlmostEqual(a["mean_score"], b["mean_score"], places=5)
+                self.assertEqual(a["anomaly_rate"], b["anomaly_rate"])
+
+    def test_rerun_reads_window_scores_from_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            for name, create_all in (("memmap", True), ("stream", False)):
+                out_dir = os.path.join(tmp, name)
+                os.makedirs(out_dir)
+                config = dict(_toy_config(out_dir), create_all_memmap=create_all, if_inference_engine="sklearn")
+                with self.subTest(mode=name), mock.patch.dict(CONFIG, config):
+                    run_ingest(files)
+                    train = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                    model = IsolationForest(n_estimators=10, random_state=0).fit(train)
+                    joblib.dump(model, os.path.join(out_dir, "isolation_forest.model"))
+                    scaler = joblib.load(CONFIG["scaler_file"])
+                    runs = []
+                    for _ in range(2):
+                        forest = _CountingForest(model)
+                        with mock.patch("src.evaluate.joblib.load", side_effect=[forest, scaler]):
+                            result = machine_health_curve(save_path=os.path.join(out_dir, "curve.png"))
+                        plt.close("all")
+                        scores = np.load(os.path.join(result["diagnostics_dir"], "isolation_forest_scores.npy"))
+                        runs.append((forest.windows_scored, scores))
+                    # The second run only scores healthy_val for the threshold.
+                    self.assertEqual(runs[0][0], 25 + 5 * 25)
+                    self.assertEqual(runs[1][0], 25)
+                    np.testing.assert_array_equal(runs[0][1], runs[1][1])
+                    file_scores = np.load(os.path.join(result["diagnostics_dir"], "isolation_forest_file_scores.npy"))
+                    np.testing.assert_allclose(stored_file_anomaly_rates("isolation_forest"), file_scores)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.file_index import FileIndex, build_file_index, file_index_path, snapshot_timestamp
+from src.preprocessing import run_ingest
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class TestFileIndex(unittest.TestCase):
+    """Tests for the binary per-file window index."""
+
+    def test_snapshot_timestamp(self):
+        self.assertEqual(snapshot_timestamp("/x/2004.02.12.10.32.39"), np.datetime64("2004-02-12T10:32:39"))
+        self.assertTrue(np.isnat(snapshot_timestamp("/x/readme.txt")))
+
+    def test_index_matches_split_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, _toy_config(out_dir)):
+                _, paths, _ = run_ingest(files)
+                index = FileIndex.load()
+                self.assertTrue(os.path.exists(file_index_path()))
+            with open(paths["split_metadata"], "r", encoding="utf-8") as fh:
+                records = json.load(fh)["file_records"]
+
+            np.testing.assert_array_equal(index.records, build_file_index(records))
+            for record in records:
+                self.assertEqual(
+                    index.file_slice(record["file_idx"]),
+                    slice(record["global_start_idx"], record["global_end_idx"]),
+                )
+                if record["split"] != "test_mixed":
+                    self.assertEqual(
+                        index.file_slice(record["file_idx"], split=record["split"]),
+                        slice(record["split_start_idx"], record["split_end_idx"]),
+                    )
+            self.assertEqual(index.split_positions("healthy_train"), slice(0, 2))
+            self.assertEqual(index.split_slice("healthy_val"), index.file_slice(2))
+            self.assertEqual(index.split_slice("test_mixed"), slice(records[3]["global_start_idx"], index.num_windows))
+            with self.assertRaises(KeyError):
+                index.file_slice(4, split="healthy_train")
+
+    def test_time_range_lookup(self):
+        records = [
+            {
+                "file_idx": idx,
+                "file_path": f"/data/2003.10.22.12.{idx:02d}.00",
+                "split": "test_mixed",
+                "global_start_idx": 10 * idx,
+                "global_end_idx": 10 * idx + 10,
+            }
+            for idx in range(4)
+        ]
+        index = FileIndex(build_file_index(records))
+        self.assertEqual(index.time_positions("2003-10-22T12:01:00", "2003-10-22T12:03:00"), slice(1, 3))
+        self.assertEqual(index.time_slice("2003-10-22T12:01:30"), slice(20, 40))
+        self.assertEqual(index.time_slice("2003-10-23"), slice(0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
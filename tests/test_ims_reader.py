@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.ims_reader import ENGINES, read_ims_file
+
+
+class TestImsReader(unittest.TestCase):
+    """Parity checks between the IMS reader engines and np.loadtxt."""
+
+    def _write(self, folder, name, text):
+        path = os.path.join(folder, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        return path
+
+    def test_engines_match_loadtxt(self):
+        rng = np.random.default_rng(7)
+        values = rng.normal(scale=0.2, size=(257, 8))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "2003.10.22.12.06.24")
+            np.savetxt(path, values, fmt="%.3f", delimiter="\t")
+            expected = np.loadtxt(path, dtype=np.float32)
+            for engine in ENGINES:
+                with self.subTest(engine=engine):
+                    parsed = read_ims_file(path, engine=engine)
+                    self.assertEqual(parsed.dtype, np.float32)
+                    np.testing.assert_array_equal(parsed, expected)
+
+    def test_single_column_and_trailing_blank_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self._write(tmp, "single.01", "0.1\n-0.25\n1e-3\n\n")
+            expected = np.loadtxt(path, dtype=np.float32).reshape(-1, 1)
+            for engine in ENGINES:
+                with self.subTest(engine=engine):
+                    np.testing.assert_array_equal(read_ims_file(path, engine=engine), expected)
+
+    def test_malformed_file_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self._write(tmp, "bad.01", "0.1\t0.2\n0.3\tnope\n")
+            for engine in ENGINES:
+                with self.subTest(engine=engine):
+                    with self.assertRaises(ValueError):
+                        read_ims_file(path, engine=engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from src.compiled_forest import compiled_path_for, load_if_scorer
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.parallel_scoring import score_ranges, score_split_parallel
+from src.preprocessing import run_ingest
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class TestParallelScoring(unittest.TestCase):
+    """Parallel IF scoring must reproduce serial decision_function exactly."""
+
+    def test_score_ranges_cover_rows_once(self):
+        tasks = score_ranges(1003, workers=3, batch_size=100)
+        covered = np.concatenate([np.arange(lo, hi) for lo, hi, _ in tasks])
+        np.testing.assert_array_equal(covered, np.arange(1003))
+        self.assertEqual(score_ranges(0, workers=3, batch_size=100), [])
+
+    def test_parallel_matches_serial(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 6)
+            for layout in ("dense", "virtual"):
+                out_dir = os.path.join(tmp, layout)
+                os.makedirs(out_dir)
+                with mock.patch.dict(CONFIG, dict(_toy_config(out_dir), num_files_to_process=6, dataset_layout=layout)):
+                    run_ingest(files)
+                    X_all = load_memmap_dataset(flatten_for_tree=True, split="all")
+                    train = np.asarray(load_memmap_dataset(flatten_for_tree=True, split="healthy_train"))
+                    model = IsolationForest(n_estimators=10, random_state=0).fit(train)
+                    model_path = os.path.join(out_dir, "isolation_forest.model")
+                    joblib.dump(model, model_path)
+                    expected = model.decision_function(np.asarray(X_all))
+                    load_if_scorer(model_path, engine="compiled")
+                    cache_stat = os.stat(compiled_path_for(model_path))
+                    for workers in (1, 3):
+                        with self.subTest(layout=layout, workers=workers):
+                            scores = score_split_parallel(model_path, split="all", workers=workers, batch_size=7)
+                            np.testing.assert_array_equal(np.asarray(scores), expected)
+                    # Workers reuse the cache built up front instead of each rewriting it.
+                    cached = os.stat(compiled_path_for(model_path))
+                    self.assertEqual((cached.st_ino, cached.st_mtime_ns), (cache_stat.st_ino, cache_stat.st_mtime_ns))
+                    with self.subTest(layout=layout, ranges=True):
+                        out_path = os.path.join(out_dir, "partial.dat")
+                        np.full(len(expected), np.nan).tofile(out_path)
+                        ranges = [(0, 10), (50, 61)]
+                        scores = np.asarray(
+                            score_split_parallel(model_path, split="all", workers=2, out_path=out_path, ranges=ranges)
+                        )
+                        filled = np.zeros(len(expected), dtype=bool)
+                        for lo, hi in ranges:
+                            filled[lo:hi] = True
+                        np.testing.assert_array_equal(scores[filled], expected[filled])
+                        self.assertTrue(np.isnan(scores[~filled]).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader
+
+from src.config import CONFIG
+from src.dataset import MemmapBatchSampler
+from src.discovery import raw_listing_digest, walk_ims_names
+from src.pipeline_dag import Step, run_dag
+from src.preprocessing import run_ingest
+from src.trainer import AutoencoderTrainer, resume_checkpoint_path
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+def _touch(path, content="x"):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(content)
+    return path
+
+
+class TestPipelineDag(unittest.TestCase):
+    """Tests for the step-level pipeline scheduler."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.state = os.path.join(self.tmp, "state.json")
+        self.calls = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def _steps(self, seed=1):
+        raw, data, model = self._path("raw.txt"), self._path("data.txt"), self._path("model.txt")
+
+        def make(name, out):
+            def fn():
+                self.calls.append(name)
+                _touch(out)
+                return {"out": out}
+
+            return fn
+
+        return [
+            Step("prep", make("prep", data), inputs=[raw], outputs=[data]),
+            Step("train", make("train", model), deps=["prep"], inputs=[data], outputs=[model], fingerprint={"seed": seed}),
+            Step("report", lambda: self.calls.append("report"), deps=["train", "disabled_step"]),
+        ]
+
+    def test_skips_up_to_date_steps(self):
+        _touch(self._path("raw.txt"))
+        records = run_dag(self._steps(), path=self.state)
+        self.assertEqual(self.calls, ["prep", "train", "report"])
+        self.assertFalse(any(record["cache_hit"] for record in records.values()))
+
+        self.calls.clear()
+        records = run_dag(self._steps(), path=self.state)
+        # Steps without declared outputs always run.
+        self.assertEqual(self.calls, ["report"])
+        self.assertTrue(records["train"]["cache_hit"])
+        self.assertEqual(records["train"]["result"], {"out": self._path("model.txt")})
+
+        self.calls.clear()
+        records = run_dag(self._steps(seed=2), path=self.state)
+        self.assertEqual(self.calls, ["train", "report"])
+        self.assertEqual(records["train"]["reason"], "config fingerprint changed")
+
+        # A newer input re-runs its step and, transitively, its dependents.
+        self.calls.clear()
+        time.sleep(0.01)
+        _touch(self._path("raw.txt"), "new")
+        records = run_dag(self._steps(seed=2), path=self.state)
+        self.assertEqual(self.calls, ["prep", "train", "report"])
+        self.assertEqual(records["prep"]["reason"], "inputs newer than outputs")
+        self.assertTrue(records["train"]["reason"].startswith("upstream re-ran"))
+
+        self.calls.clear()
+        run_dag(self._steps(seed=2), path=self.state, force=True)
+        self.assertEqual(self.calls, ["prep", "train", "report"])
+
+    def test_independent_steps_overlap_and_resources_serialize(self):
+        barrier = threading.Barrier(2, timeout=5)
+        active = {"count": 0, "max": 0}
+        lock = threading.Lock()
+
+        def exclusive():
+            with lock:
+                active["count"] += 1
+                active["max"] = max(active["max"], active["count"])
+            time.sleep(0.05)
+            with lock:
+                active["count"] -= 1
+
+        steps = [
+            # Would time out on the barrier unless both run at the same time.
+            Step("a", barrier.wait),
+            Step("b", barrier.wait),
+            Step("c", exclusive, deps=["a"], resources=["diagnostics"]),
+            Step("d", exclusive, deps=["b"], resources=["diagnostics"]),
+        ]
+        run_dag(steps, max_parallel=4, path=self.state)
+        self.assertEqual(active["max"], 1)
+
+    def test_failure_stops_dependents(self):
+        def boom():
+            raise RuntimeError("boom")
+
+        steps = [Step("a", boom), Step("b", lambda: self.calls.append("b"), deps=["a"])]
+        with self.assertRaises(RuntimeError):
+            run_dag(steps, path=self.state)
+        self.assertEqual(self.calls, [])
+
+    def test_unfinished_step_reruns_despite_fresh_outputs(self):
+        _touch(self._path("raw.txt"))
+        run_dag(self._steps(), path=self.state)
+        model = self._path("model.txt")
+
+        def crash():
+            # e.g. a trainer that saved an improved checkpoint, then died.
+            _touch(model, "partial")
+            raise RuntimeError("killed")
+
+        steps = self._steps()
+        inputs = [self._path("data.txt")]
+        steps[1] = Step("train", crash, deps=["prep"], inputs=inputs, outputs=[model], fingerprint={"seed": 1})
+        time.sleep(0.01)
+        _touch(self._path("raw.txt"), "new")
+        with self.assertRaises(RuntimeError):
+            run_dag(steps, path=self.state)
+        self.calls.clear()
+        records = run_dag(self._steps(), path=self.state)
+        self.assertEqual(self.calls, ["train", "report"])
+        self.assertEqual(records["train"]["reason"], "never ran")
+
+    def test_interrupted_train_step_resumes_on_next_run(self):
+        data_path, model_path = self._path("data.pt"), self._path("toy.pt")
+        kill = {"at": None}
+
+        def train():
+            torch.manual_seed(0)
+            model = nn.Sequential(nn.Linear(6, 4), nn.Tanh(), nn.Linear(4, 6))
+            trainer = AutoencoderTrainer(model, torch.optim.Adam(model.parameters(), lr=1e-2), "cpu", "toy")
+            real_loss, calls = trainer._loss, []
+
+            def counted(x):
+                calls.append(1)
+                if len(calls) == kill["at"]:
+                    raise RuntimeError("killed")
+                return real_loss(x)
+
+            trainer._loss = counted
+            data = torch.load(data_path)
+            train_loader = DataLoader(data, sampler=MemmapBatchSampler(23, 4, shuffle=True), batch_size=None)
+            val_loader = DataLoader(data, sampler=MemmapBatchSampler(23, 4, shuffle=False), batch_size=None)
+            trainer.fit(
+                train_loader,
+                val_loader,
+                epochs=3,
+                patience=10,
+                on_improve=lambda *args: torch.save(model.state_dict(), model_path),
+                checkpoint_path=resume_checkpoint_path(model_path),
+                resume=True,
+                # New data never resumes an old checkpoint.
+                fingerprint={"data": float(data.sum())},
+            )
+            return len(calls)
+
+        steps = [Step("train", train, inputs=[data_path], outputs=[model_path], fingerprint={"lr": 1e-2})]
+        with mock.patch.dict(CONFIG, {"train_checkpoint_every_batches": 2}):
+            torch.save(torch.randn(23, 6, generator=torch.Generator().manual_seed(2)), data_path)
+            self.assertEqual(run_dag(steps, path=self.state)["train"]["result"], 36)
+            time.sleep(0.01)
+            torch.save(torch.randn(23, 6, generator=torch.Generator().manual_seed(3)), data_path)
+            # 6 train + 6 val batches per epoch: call 16 is epoch 2, batch 4,
+            # after epoch 1 already rewrote the model.
+            kill["at"] = 16
+            with self.assertRaises(RuntimeError):
+                run_dag(steps, path=self.state)
+            kill["at"] = None
+            records = run_dag(steps, path=self.state)
+        self.assertFalse(records["train"]["cache_hit"])
+        # Only the rest of epoch 2 (4 train + 6 val) and epoch 3 ran.
+        self.assertEqual(records["train"]["result"], 22)
+
+    def test_append_ingest_is_cached_once_caught_up(self):
+        raw, staged, processed = self._path("raw"), self._path("staged"), self._path("processed")
+        for folder in (raw, staged, processed):
+            os.makedirs(folder)
+        files = _write_ims_files(staged, 6)
+
+        def arrive(paths):
+            for path in paths:
+                shutil.copy(path, raw)
+
+        def ingest():
+            self.calls.append("preprocessing")
+            return run_ingest(walk_ims_names(raw), mode="append")[1]["appended_files"]
+
+        def steps():
+            # Mirrors the pipeline's preprocessing step in append mode.
+            outputs = [CONFIG["split_metadata_file"], CONFIG["scaler_file"]]
+            return [Step("preprocessing", ingest, outputs=outputs, fingerprint={"raw_files": raw_listing_digest(raw)})]
+
+        with mock.patch.dict(CONFIG, _toy_config(processed)):
+            arrive(files[:4])
+            run_ingest(walk_ims_names(raw))
+            arrive(files[4:5])
+            records = run_dag(steps(), path=self.state)
+            self.assertEqual(records["preprocessing"]["result"], 1)
+            # Nothing new arrived: the append writes nothing, so the step must be skipped.
+            records = run_dag(steps(), path=self.state)
+            self.assertTrue(records["preprocessing"]["cache_hit"])
+            arrive(files[5:])
+            records = run_dag(steps(), path=self.state)
+            self.assertEqual(records["preprocessing"]["reason"], "config fingerprint changed")
+            self.assertEqual(records["preprocessing"]["result"], 1)
+        self.assertEqual(self.calls, ["preprocessing", "preprocessing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
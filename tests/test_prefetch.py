@@ -0,0 +1,76 @@
+import random
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import joblib
+import numpy as np
+
+from src.config import CONFIG
+from src.dataset import load_split_metadata
+from src.prefetch import prefetch_map, prefetch_scaled_signals
+from src.preprocessing import run_ingest
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+def _square(value):
+    return value * value
+
+
+class TestPrefetch(unittest.TestCase):
+    """Tests for the bounded, ordered prefetch pipeline."""
+
+    def test_results_keep_input_order(self):
+        def slow_square(value):
+            time.sleep(random.random() * 0.005)
+            return value * value
+
+        for workers, depth in ((1, 0), (1, 1), (4, 3)):
+            with self.subTest(workers=workers, depth=depth):
+                results = list(prefetch_map(slow_square, range(30), workers=workers, depth=depth))
+                self.assertEqual(results, [v * v for v in range(30)])
+        self.assertEqual(list(prefetch_map(_square, range(10), workers=2, depth=2, executor="process")), [v * v for v in range(10)])
+
+    def test_loads_stay_within_depth(self):
+        lock = threading.Lock()
+        state = {"produced": 0, "consumed": 0, "max_ahead": 0}
+
+        def load(value):
+            with lock:
+                state["produced"] += 1
+                state["max_ahead"] = max(state["max_ahead"], state["produced"] - state["consumed"])
+            return value
+
+        for _ in prefetch_map(load, range(50), workers=4, depth=3):
+            time.sleep(0.001)
+            with lock:
+                state["consumed"] += 1
+        self.assertLessEqual(state["max_ahead"], 4)
+
+    def test_early_exit_stops_loading(self):
+        calls = []
+        for value in prefetch_map(calls.append, range(100), workers=2, depth=2):
+            break
+        self.assertLessEqual(len(calls), 4)
+
+    def test_scaled_signals_match_across_executors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            with mock.patch.dict(CONFIG, _toy_config(tmp)):
+                run_ingest(files)
+                scaler = joblib.load(CONFIG["scaler_file"])
+                records = load_split_metadata()["file_records"]
+                inline = list(prefetch_scaled_signals(records, scaler, depth=0))
+                for executor in ("thread", "process"):
+                    with self.subTest(executor=executor):
+                        prefetched = list(prefetch_scaled_signals(records, scaler, workers=2, depth=2, executor=executor))
+                        self.assertEqual([pos for pos, _, _ in prefetched], list(range(len(records))))
+                        for (_, a_rec, a), (_, b_rec, b) in zip(inline, prefetched):
+                            self.assertEqual(a_rec["file_path"], b_rec["file_path"])
+                            np.testing.assert_array_equal(a, b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,47 @@
+import json
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 
-from src.preprocessing import create_sequences, count_sequences, _split_name_for_file_idx
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.preprocessing import create_sequences, count_sequences, run_ingest, _split_name_for_file_idx
+from src.utils import scan_ims_shape
+
+
+def _write_ims_files(folder, num_files, rows=40, columns=2, seed=0):
+    """Write small tab-separated files shaped like IMS snapshots."""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for idx in range(num_files):
+        path = os.path.join(folder, f"2003.10.22.12.{idx:02d}.00")
+        values = rng.normal(scale=0.1 * (idx + 1), size=(rows, columns))
+        np.savetxt(path, values, fmt="%.3f", delimiter="\t")
+        paths.append(path)
+    return paths
+
+
+def _toy_config(tmp):
+    """CONFIG overrides that keep preprocessing artifacts in `tmp`."""
+    return {
+        "sequence_length": 8,
+        "stride": 3,
+        "healthy_files": 3,
+        "healthy_train_files": 2,
+        "healthy_val_files": 1,
+        "num_files_to_process": 5,
+        "processed_folder": tmp,
+        "memmap_file": os.path.join(tmp, "all.dat"),
+        "healthy_train_memmap_file": os.path.join(tmp, "train.dat"),
+        "healthy_val_memmap_file": os.path.join(tmp, "val.dat"),
+        "split_metadata_file": os.path.join(tmp, "split_metadata.json"),
+        "scaler_file": os.path.join(tmp, "global_scaler.save"),
+        "raw_cache_folder": os.path.join(tmp, "raw_cache"),
+        "use_raw_cache": False,
+    }
 
 
 class TestPreprocessing(unittest.TestCase):
@@ -28,6 +67,113 @@ class TestPreprocessing(unittest.TestCase):
         self.assertEqual(count_sequences(signal_length=4, seq_length=4, stride=2), 1)
         self.assertEqual(count_sequences(signal_length=3, seq_length=4, stride=1), 0)
 
+    def test_scan_ims_shape_matches_loadtxt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            (path,) = _write_ims_files(tmp, 1, rows=13, columns=4)
+            self.assertEqual(scan_ims_shape(path), np.loadtxt(path).shape)
+
+    def test_single_pass_matches_two_pass_with_fewer_parses(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 6)
+            outputs = {}
+            for mode in ("two_pass", "single_pass"):
+                out_dir = os.path.join(tmp, mode)
+                os.makedirs(out_dir)
+                with mock.patch.dict(CONFIG, _toy_config(out_dir)):
+                    scaler, paths, stats = run_ingest(files, mode=mode)
+                    with open(paths["split_metadata"], "r", encoding="utf-8") as fh:
+                        meta = json.load(fh)
+                    arrays = {
+                        name: np.fromfile(paths[name], dtype=np.float32)
+                        for name in ("all", "healthy_train", "healthy_val")
+                    }
+                outputs[mode] = (scaler, meta, arrays, stats)
+
+            legacy, single = outputs["two_pass"], outputs["single_pass"]
+            np.testing.assert_array_equal(legacy[0].mean_, single[0].mean_)
+            np.testing.assert_array_equal(legacy[0].scale_, single[0].scale_)
+            self.assertEqual(
+                [(r["global_start_idx"], r["split"]) for r in legacy[1]["file_records"]],
+                [(r["global_start_idx"], r["split"]) for r in single[1]["file_records"]],
+            )
+            for name in legacy[2]:
+                np.testing.assert_array_equal(legacy[2][name], single[2][name])
+            # Legacy: 3 scaler parses + 5 count parses + 5 write parses.
+            self.assertEqual(legacy[3]["file_parses"], 13)
+            self.assertEqual(single[3]["file_parses"], 5)
+
+    def test_parallel_workers_match_serial_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 9)
+            for layout in ("dense", "virtual"):
+                blobs = {}
+                for workers in (1, 3):
+                    out_dir = os.path.join(tmp, f"{layout}_{workers}")
+                    os.makedirs(out_dir)
+                    # With the raw cache on, workers reopen scaler-fit files instead of re-parsing.
+                    overrides = dict(
+                        _toy_config(out_dir), num_files_to_process=9, dataset_layout=layout, use_raw_cache=True
+                    )
+                    with mock.patch.dict(CONFIG, overrides):
+                        _, paths, stats = run_ingest(files, workers=workers)
+                    self.assertEqual(stats["file_parses"], 9)
+                    blobs[workers] = {}
+                    for name in ("all", "healthy_train", "healthy_val"):
+                        with open(paths[name], "rb") as fh:
+                            blobs[workers][name] = fh.read()
+                    with open(paths["split_metadata"], "r", encoding="utf-8") as fh:
+                        blobs[workers]["split_metadata"] = json.load(fh)
+                with self.subTest(layout=layout):
+                    self.assertEqual(blobs[1], blobs[3])
+
+    def test_append_matches_full_rebuild(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 7)
+            for layout in ("dense", "virtual"):
+                full_dir = os.path.join(tmp, f"{layout}_full")
+                inc_dir = os.path.join(tmp, f"{layout}_inc")
+                os.makedirs(full_dir)
+                os.makedirs(inc_dir)
+                with mock.patch.dict(CONFIG, dict(_toy_config(full_dir), num_files_to_process=7, dataset_layout=layout)):
+                    _, full_paths, _ = run_ingest(files)
+                with mock.patch.dict(CONFIG, dict(_toy_config(inc_dir), dataset_layout=layout)):
+                    run_ingest(files[:5])
+                    _, inc_paths, stats = run_ingest(files, mode="append")
+                    self.assertEqual(inc_paths["appended_files"], 2)
+                    self.assertEqual(stats["file_parses"], 2)
+                    _, noop_paths, _ = run_ingest(files, mode="append")
+                    self.assertEqual(noop_paths["appended_files"], 0)
+                with self.subTest(layout=layout):
+                    for name in ("all", "healthy_train", "healthy_val"):
+                        with open(full_paths[name], "rb") as a, open(inc_paths[name], "rb") as b:
+                            self.assertEqual(a.read(), b.read())
+                    with open(full_paths["split_metadata"], encoding="utf-8") as a, open(
+                        inc_paths["split_metadata"], encoding="utf-8"
+                    ) as b:
+                        full_meta, inc_meta = json.load(a), json.load(b)
+                    self.assertEqual(full_meta["file_records"], inc_meta["file_records"])
+                    self.assertEqual(full_meta["split_sequence_counts"], inc_meta["split_sequence_counts"])
+
+    def test_per_channel_keeps_columns_as_channels(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            counts = {}
+            for mode in ("flatten", "per_channel"):
+                out_dir = os.path.join(tmp, mode)
+                os.makedirs(out_dir)
+                with mock.patch.dict(CONFIG, dict(_toy_config(out_dir), channel_mode=mode)):
+                    scaler, paths, _ = run_ingest(files)
+                    dataset = load_memmap_dataset(flatten_for_tree=False, split="all")
+                counts[mode] = len(dataset)
+                if mode == "per_channel":
+                    self.assertEqual(dataset.shape[1:], (8, 2))
+                    self.assertEqual(scaler.mean_.shape, (2,))
+                    expected = scaler.transform(np.loadtxt(files[0]).astype(np.float32))
+                    np.testing.assert_allclose(dataset[1], expected[3:11], rtol=1e-5, atol=1e-5)
+            # 40 rows x 2 columns: 25 flattened windows vs 11 per-channel windows per file.
+            self.assertEqual(counts["flatten"], 5 * 25)
+            self.assertEqual(counts["per_channel"], 5 * 11)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.preprocessing import run_ingest
+from src.quantization import DequantizedArray, dequantize, quantize, storage_params
+from src.utils import read_memmap_metadata
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class TestQuantization(unittest.TestCase):
+    """Tests for reduced-precision memmap storage."""
+
+    def test_int16_roundtrip_error_is_half_a_step(self):
+        with mock.patch.dict(CONFIG, {"storage_int16_clip_sigma": 4.0}):
+            params = storage_params("int16")
+        values = np.linspace(-3.9, 3.9, 1001, dtype=np.float32)
+        restored = dequantize(quantize(values, params), params)
+        self.assertEqual(restored.dtype, np.float32)
+        self.assertLessEqual(np.max(np.abs(restored - values)), params["scale"] / 2 + 1e-7)
+        clipped = dequantize(quantize(np.array([-10.0, 10.0]), params), params)
+        np.testing.assert_allclose(clipped, [-4.0, 4.0], rtol=1e-6)
+
+    def test_unknown_dtype_rejected(self):
+        with self.assertRaises(ValueError):
+            storage_params("int8")
+
+    def test_ingest_dequantizes_on_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            for layout in ("dense", "virtual"):
+                loaded = {}
+                for dtype in ("float32", "float16", "int16"):
+                    out_dir = os.path.join(tmp, f"{layout}_{dtype}")
+                    os.makedirs(out_dir)
+                    overrides = dict(_toy_config(out_dir), dataset_layout=layout, storage_dtype=dtype)
+                    with mock.patch.dict(CONFIG, overrides):
+                        run_ingest(files)
+                        meta = read_memmap_metadata(CONFIG["memmap_file"])
+                        windows = load_memmap_dataset(flatten_for_tree=False, split="all")
+                        flat = load_memmap_dataset(flatten_for_tree=True, split="healthy_train")
+                        self.assertEqual(meta["dtype"], dtype)
+                        self.assertEqual(windows[3:7].dtype, np.float32)
+                        self.assertEqual(flat.shape[1], 8)
+                        if dtype != "float32":
+                            self.assertIsInstance(windows, DequantizedArray)
+                            self.assertEqual(os.path.getsize(CONFIG["memmap_file"]) * 2, loaded["float32"][1])
+                        loaded[dtype] = (np.asarray(windows), os.path.getsize(CONFIG["memmap_file"]))
+                with self.subTest(layout=layout):
+                    reference = loaded["float32"][0]
+                    np.testing.assert_allclose(loaded["float16"][0], reference, rtol=1e-3, atol=1e-3)
+                    step = storage_params("int16")["scale"]
+                    np.testing.assert_allclose(loaded["int16"][0], reference, rtol=0, atol=step / 2 + 1e-6)
+
+    def test_append_rejects_storage_dtype_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 6)
+            with mock.patch.dict(CONFIG, dict(_toy_config(tmp), storage_dtype="int16")):
+                run_ingest(files[:5])
+            with mock.patch.dict(CONFIG, dict(_toy_config(tmp), storage_dtype="float32")):
+                with self.assertRaises(ValueError):
+                    run_ingest(files, mode="append")
+
+
+if __name__ == "__main__":
+    unittest.main()
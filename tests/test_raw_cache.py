@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.raw_cache import cached_shape, load_raw_matrix
+
+
+class TestRawCache(unittest.TestCase):
+    """Raw-signal cache hits, invalidation, and optional hash checks."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.path = os.path.join(self.tmp, "2003.10.22.12.06.24")
+        np.savetxt(self.path, np.arange(12, dtype=np.float32).reshape(6, 2) / 10, fmt="%.3f", delimiter="\t")
+        patcher = mock.patch.dict(CONFIG, {"raw_cache_folder": os.path.join(self.tmp, "cache"), "use_raw_cache": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+    def _stats(self):
+        return {"file_parses": 0, "parse_seconds": 0.0, "cache_hits": 0}
+
+    def test_second_read_is_memmapped_hit(self):
+        stats = self._stats()
+        first = load_raw_matrix(self.path, stats=stats)
+        second = load_raw_matrix(self.path, stats=stats)
+        self.assertIsInstance(second, np.memmap)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual((stats["file_parses"], stats["cache_hits"]), (1, 1))
+        self.assertEqual(cached_shape(self.path), (6, 2))
+
+    def test_modified_file_is_reparsed(self):
+        load_raw_matrix(self.path)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write("9.000\t9.000\n")
+        self.assertIsNone(cached_shape(self.path))
+        stats = self._stats()
+        matrix = load_raw_matrix(self.path, stats=stats)
+        self.assertEqual(matrix.shape, (7, 2))
+        self.assertEqual(stats["file_parses"], 1)
+
+    def test_content_hash_catches_same_size_and_mtime(self):
+        with mock.patch.dict(CONFIG, {"raw_cache_verify_hash": True}):
+            load_raw_matrix(self.path)
+            st = os.stat(self.path)
+            with open(self.path, "r+b") as fh:
+                fh.write(b"7")
+            os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            stats = self._stats()
+            matrix = load_raw_matrix(self.path, stats=stats)
+        self.assertEqual(stats["file_parses"], 1)
+        self.assertAlmostEqual(float(matrix[0, 0]), 7.0, places=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
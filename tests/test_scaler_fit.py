@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from src.config import CONFIG
+from src.raw_cache import load_raw_matrix
+from src.scaler_fit import array_moments, fit_moments, fit_scaler_from_arrays, merge_moments, scaler_from_moments
+
+
+class TestScalerFit(unittest.TestCase):
+    """Merged moments must reproduce StandardScaler.partial_fit."""
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.chunks = [
+            rng.normal(loc=0.3 * idx, scale=1.0 + idx, size=(200 + 37 * idx, 1)).astype(np.float32)
+            for idx in range(6)
+        ]
+
+    def _reference(self):
+        scaler = StandardScaler()
+        for chunk in self.chunks:
+            scaler.partial_fit(chunk)
+        return scaler
+
+    def _assert_matches(self, scaler, reference):
+        self.assertEqual(int(scaler.n_samples_seen_), int(reference.n_samples_seen_))
+        np.testing.assert_allclose(scaler.mean_, reference.mean_, rtol=1e-12)
+        np.testing.assert_allclose(scaler.var_, reference.var_, rtol=1e-10)
+        np.testing.assert_allclose(scaler.scale_, reference.scale_, rtol=1e-10)
+        np.testing.assert_allclose(
+            scaler.transform(self.chunks[2]), reference.transform(self.chunks[2]), rtol=1e-6, atol=1e-7
+        )
+
+    def test_merge_is_order_independent(self):
+        forward = (0, None, None)
+        for chunk in self.chunks:
+            m = array_moments(chunk)
+            forward = m if forward[0] == 0 else merge_moments(forward, m)
+        left = merge_moments(array_moments(np.concatenate(self.chunks[:3])), array_moments(np.concatenate(self.chunks[3:])))
+        self.assertEqual(forward[0], left[0])
+        np.testing.assert_allclose(forward[1], left[1], rtol=1e-12)
+        np.testing.assert_allclose(forward[2], left[2], rtol=1e-10)
+
+    def test_arrays_match_partial_fit(self):
+        self._assert_matches(fit_scaler_from_arrays(self.chunks), self._reference())
+
+    def test_parallel_files_from_cache_match_partial_fit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for idx, chunk in enumerate(self.chunks):
+                path = os.path.join(tmp, f"2003.10.22.12.{idx:02d}.00")
+                np.savetxt(path, chunk.reshape(-1, 1), fmt="%.9g")
+                paths.append(path)
+            with mock.patch.dict(CONFIG, {"raw_cache_folder": os.path.join(tmp, "cache"), "use_raw_cache": True}):
+                # Populate the cache, then fit from it without re-parsing text.
+                self.chunks = [np.asarray(load_raw_matrix(p)) for p in paths]
+                stats = {"file_parses": 0, "cache_hits": 0, "row_scans": 0, "parse_seconds": 0.0}
+                moments, fit_files = fit_moments(paths, workers=2, stats=stats)
+            self.assertEqual(fit_files, len(paths))
+            self.assertEqual((stats["file_parses"], stats["cache_hits"]), (0, len(paths)))
+            self._assert_matches(scaler_from_moments(moments), self._reference())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.file_index import FileIndex, build_file_index
+from src.score_store import ScoreColumn, ScoreStore, file_means
+
+
+def _index(num_files, windows_per_file=10):
+    records = [
+        {
+            "file_idx": idx,
+            "file_path": f"/data/2003.10.22.12.{idx:02d}.00",
+            "split": "healthy_train" if idx < 2 else "test_mixed",
+            "global_start_idx": windows_per_file * idx,
+            "global_end_idx": windows_per_file * (idx + 1),
+        }
+        for idx in range(num_files)
+    ]
+    return FileIndex(build_file_index(records))
+
+
+class TestScoreStore(unittest.TestCase):
+    """Tests for the persistent per-window score store."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        scaler_file = os.path.join(self.tmp, "scaler.save")
+        with open(scaler_file, "wb") as fh:
+            fh.write(b"scaler-v1")
+        self._config = mock.patch.dict(CONFIG, {"processed_folder": self.tmp, "scaler_file": scaler_file})
+        self._config.start()
+
+    def tearDown(self):
+        self._config.stop()
+        self._tmp.cleanup()
+
+    def test_column_helpers(self):
+        column = ScoreColumn.in_memory(10)
+        self.assertEqual(column.missing_ranges(), [(0, 10)])
+        column.write(2, np.arange(3.0))
+        column.mark_computed([(7, 9)])
+        self.assertEqual(column.missing_ranges(), [(0, 2), (5, 7), (9, 10)])
+        self.assertEqual(column.missing_ranges(3, 6), [(5, 6)])
+        self.assertTrue(column.is_complete(2, 5))
+        with self.assertRaises(ValueError):
+            column.read(slice(0, 5))
+        np.testing.assert_allclose(file_means(np.arange(6.0), [0, 2], [2, 6]), [0.5, 3.5])
+
+    def test_scores_persist_and_read_by_file_and_split(self):
+        store = ScoreStore.open(file_index=_index(4))
+        column = store.column("isolation_forest", "ckpt-a")
+        column.write(0, np.linspace(-1.0, 1.0, 40))
+        column.flush()
+
+        reopened = ScoreStore.open(file_index=_index(4))
+        self.assertEqual(reopened.column("isolation_forest", "ckpt-a").missing_ranges(), [])
+        np.testing.assert_array_equal(reopened.file_scores("isolation_forest", 1), np.linspace(-1.0, 1.0, 40)[10:20])
+        self.assertEqual(len(reopened.split_scores("isolation_forest", "test_mixed")), 20)
+        rates = reopened.file_anomaly_rates("isolation_forest", threshold=0.0)
+        np.testing.assert_array_equal(rates, [1.0, 1.0, 0.0, 0.0])
+        with self.assertRaises(KeyError):
+            reopened.read("dense_autoencoder")
+
+        # A new checkpoint gets a fresh column; reads default to the latest.
+        fresh = reopened.column("isolation_forest", "ckpt-b")
+        self.assertEqual(fresh.missing_ranges(), [(0, 40)])
+        with self.assertRaises(ValueError):
+            reopened.read("isolation_forest")
+        self.assertEqual(len(reopened.read("isolation_forest", checkpoint="ckpt-a")), 40)
+
+    def test_append_keeps_prefix_and_changes_reset(self):
+        column = ScoreStore.open(file_index=_index(3)).column("dense_autoencoder", "c", dtype=np.float32)
+        column.write(0, np.ones(30, dtype=np.float32))
+        column.flush()
+
+        # Appended files only add missing rows at the end.
+        grown = ScoreStore.open(file_index=_index(5)).column("dense_autoencoder", "c", dtype=np.float32)
+        self.assertEqual(grown.missing_ranges(), [(30, 50)])
+        np.testing.assert_array_equal(grown.values[:30], 1.0)
+
+        # Changing an earlier file's windows invalidates rows from that file on.
+        records = _index(5).records.copy()
+        records["global_end"][1] -= 1
+        records["global_start"][2:] -= 1
+        records["global_end"][2:] -= 1
+        shifted = ScoreStore.open(file_index=FileIndex(records)).column("dense_autoencoder", "c", dtype=np.float32)
+        self.assertEqual(shifted.missing_ranges(), [(10, 49)])
+
+        # A refitted scaler changes every window, so all columns are dropped.
+        with open(CONFIG["scaler_file"], "wb") as fh:
+            fh.write(b"scaler-v2")
+        store = ScoreStore.open(file_index=_index(5))
+        self.assertEqual(store.columns(), [])
+
+    def test_keeps_limited_checkpoints_per_model(self):
+        with mock.patch.dict(CONFIG, {"score_store_keep_columns": 2}):
+            store = ScoreStore.open(file_index=_index(2))
+            for checkpoint in ("a", "b", "c"):
+                store.column("lstm_autoencoder", checkpoint)
+        self.assertEqual([row["checkpoint"] for row in store.columns("lstm_autoencoder")], ["c", "b"])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "score_store", "lstm_autoencoder-a.dat")))
+
+
+if __name__ == "__main__":
+    unittest.main()
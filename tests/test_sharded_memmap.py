@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.preprocessing import run_ingest
+from src.sharded_memmap import ShardedMemmap, manifest_path_for
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+class TestShardedMemmap(unittest.TestCase):
+    """Tests for the sharded memmap array and its use in preprocessing."""
+
+    def test_indexing_across_shards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.dat")
+            expected = np.arange(40, dtype=np.float32).reshape(10, 4, 1)
+            sharded = ShardedMemmap.create(path, expected.shape, "float32", rows_per_shard=3)
+            sharded[0:10] = expected
+            sharded.flush()
+            self.assertEqual(sharded.num_shards, 4)
+
+            reopened = ShardedMemmap.open(path)
+            np.testing.assert_array_equal(reopened[2:8], expected[2:8])
+            np.testing.assert_array_equal(reopened[-1], expected[-1])
+            np.testing.assert_array_equal(reopened[[9, 0, 4, 4]], expected[[9, 0, 4, 4]])
+            index = np.array([[1, 7], [3, 9]])
+            np.testing.assert_array_equal(reopened[index], expected[index])
+            np.testing.assert_array_equal(reopened[::4, 2], expected[::4, 2])
+            np.testing.assert_array_equal(reopened[expected[:, 0, 0] > 20], expected[expected[:, 0, 0] > 20])
+            np.testing.assert_array_equal(np.asarray(reopened.reshape(10, -1)), expected.reshape(10, -1))
+
+            grown = ShardedMemmap.open(path, mode="r+", rows=14)
+            grown[10:14] = expected[:4] + 100
+            grown.flush()
+            final = ShardedMemmap.open(path)
+            self.assertEqual(final.shape, (14, 4, 1))
+            np.testing.assert_array_equal(final[:10], expected)
+            np.testing.assert_array_equal(final[10:], expected[:4] + 100)
+
+    def test_sharded_ingest_matches_single_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 7)
+            for layout in ("dense", "virtual"):
+                loaded = {}
+                for name, shard_bytes, workers in (("single", 0, 1), ("sharded", 256, 1), ("sharded_par", 256, 3)):
+                    out_dir = os.path.join(tmp, f"{layout}_{name}")
+                    os.makedirs(out_dir)
+                    overrides = dict(_toy_config(out_dir), dataset_layout=layout, memmap_shard_bytes=shard_bytes)
+                    with mock.patch.dict(CONFIG, overrides):
+                        run_ingest(files[:5], workers=workers)
+                        run_ingest(files, mode="append", workers=workers)
+                        loaded[name] = {
+                            split: np.asarray(load_memmap_dataset(flatten_for_tree=False, split=split))
+                            for split in ("all", "healthy_train", "healthy_val")
+                        }
+                        if shard_bytes:
+                            self.assertTrue(os.path.exists(manifest_path_for(CONFIG["memmap_file"])))
+                            self.assertFalse(os.path.exists(CONFIG["memmap_file"]))
+                with self.subTest(layout=layout):
+                    for split in loaded["single"]:
+                        np.testing.assert_array_equal(loaded["sharded"][split], loaded["single"][split])
+                        np.testing.assert_array_equal(loaded["sharded_par"][split], loaded["single"][split])
+
+    def test_sharding_lifts_all_memmap_cap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 5)
+            with mock.patch.dict(CONFIG, dict(_toy_config(tmp), max_all_memmap_bytes=16, memmap_shard_bytes=512)):
+                _, paths, _ = run_ingest(files)
+                self.assertEqual(paths["all"], CONFIG["memmap_file"])
+                self.assertEqual(len(load_memmap_dataset(flatten_for_tree=True, split="all")), 5 * 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+from torch import nn
+from torch.utils.data import DataLoader
+
+from src.config import CONFIG
+from src.dataset import MemmapBatchSampler
+from src.preprocessing import run_ingest
+from src.trainer import AutoencoderTrainer, configure_torch_threads, resume_data_fingerprint
+from tests.test_preprocessing import _toy_config, _write_ims_files
+
+
+def _model(features=6):
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(features, 3), nn.Tanh(), nn.Linear(3, features))
+
+
+def _batches(count=4, rows=5, features=6):
+    generator = torch.Generator().manual_seed(1)
+    return [torch.randn(rows, features, generator=generator) for _ in range(count)]
+
+
+class TestTrainer(unittest.TestCase):
+    """Tests for the shared autoencoder training engine."""
+
+    def test_deferred_loss_matches_per_batch_mean(self):
+        model = _model()
+        batches = _batches()
+        trainer = AutoencoderTrainer(model, torch.optim.SGD(model.parameters(), lr=0.1), "cpu", label="toy")
+        stats = trainer.run_epoch(batches, train=False)
+        with torch.no_grad():
+            expected = sum(float(nn.functional.mse_loss(model(x), x)) * len(x) for x in batches) / 20
+        self.assertAlmostEqual(stats["loss"], expected, places=6)
+        self.assertEqual(stats["samples"], 20)
+        self.assertGreater(stats["samples_per_sec"], 0)
+        self.assertEqual(trainer.run_epoch(batches, train=False, max_batches=2)["samples"], 10)
+
+    def test_grad_accumulation_matches_larger_batches(self):
+        batches = _batches()
+        accumulated = _model()
+        with mock.patch.dict(CONFIG, {"grad_accumulation_steps": 2}):
+            trainer = AutoencoderTrainer(accumulated, torch.optim.SGD(accumulated.parameters(), lr=0.1), "cpu", "toy")
+            trainer.run_epoch(batches, train=True)
+        merged = _model()
+        trainer = AutoencoderTrainer(merged, torch.optim.SGD(merged.parameters(), lr=0.1), "cpu", "toy")
+        trainer.run_epoch([torch.cat(batches[:2]), torch.cat(batches[2:])], train=True)
+        for left, right in zip(accumulated.parameters(), merged.parameters()):
+            torch.testing.assert_close(left, right)
+
+    def test_checkpoints_fire_at_first_step_boundary_after_interval(self):
+        model = _model()
+        cursors = []
+        with mock.patch.dict(CONFIG, {"grad_accumulation_steps": 3, "train_checkpoint_every_batches": 2}):
+            trainer = AutoencoderTrainer(model, torch.optim.SGD(model.parameters(), lr=0.1), "cpu", "toy")
+            trainer.run_epoch(_batches(10), train=True, checkpoint=lambda cursor, *args: cursors.append(cursor))
+        # Steps land after batches 3, 6 and 9; each is at least 2 batches on.
+        self.assertEqual(cursors, [3, 6, 9])
+
+    def test_bf16_autocast_keeps_fp32_weights(self):
+        model = _model()
+        with mock.patch.dict(CONFIG, {"torch_amp_bf16": True}):
+            trainer = AutoencoderTrainer(model, torch.optim.Adam(model.parameters(), lr=1e-2), "cpu", "toy")
+            stats = trainer.run_epoch(_batches(), train=True)
+        self.assertTrue(torch.isfinite(torch.tensor(stats["loss"])))
+        self.assertTrue(all(param.dtype == torch.float32 for param in model.parameters()))
+
+    def test_compile_failure_falls_back_to_eager(self):
+        model = _model()
+
+        def broken(x):
+            raise RuntimeError("no compiler")
+
+        with mock.patch.dict(CONFIG, {"torch_compile": True}), mock.patch("torch.compile", return_value=broken):
+            trainer = AutoencoderTrainer(model, torch.optim.SGD(model.parameters(), lr=0.1), "cpu", "toy")
+            stats = trainer.run_epoch(_batches(), train=True)
+        self.assertEqual(stats["samples"], 20)
+        self.assertIs(trainer._forward, model)
+
+    def test_fit_early_stops_and_reports_improvements(self):
+        model = _model()
+        trainer = AutoencoderTrainer(model, torch.optim.SGD(model.parameters(), lr=0.0), "cpu", "toy")
+        improved = []
+        # lr=0 keeps the loss flat: only epoch 1 improves, then patience runs out.
+        result = trainer.fit(_batches(), _batches(), epochs=10, patience=2, on_improve=lambda *args: improved.append(args))
+        self.assertEqual([epoch for epoch, _ in improved], [1])
+        self.assertEqual(result["best_epoch"], 1)
+        self.assertEqual(result["epochs_run"], 3)
+
+    def test_configure_threads(self):
+        before = torch.get_num_threads()
+        try:
+            with mock.patch.dict(CONFIG, {"torch_num_threads": 1, "torch_interop_threads": 0}):
+                configure_torch_threads()
+            self.assertEqual(torch.get_num_threads(), 1)
+        finally:
+            torch.set_num_threads(before)
+
+    def _fit_toy(self, checkpoint_path, loaders, kill_at=None, resume=False, fingerprint=None, patience=10):
+        torch.manual_seed(0)
+        model = nn.Sequential(nn.Linear(6, 4), nn.Dropout(0.3), nn.Tanh(), nn.Linear(4, 6))
+        trainer = AutoencoderTrainer(model, torch.optim.Adam(model.parameters(), lr=1e-2), "cpu", "toy")
+        calls = []
+        real_loss = trainer._loss
+
+        def counted(x):
+            calls.append(1)
+            if len(calls) == kill_at:
+                raise KeyboardInterrupt
+            return real_loss(x)
+
+        trainer._loss = counted
+        train_loader, val_loader = loaders()
+        result = trainer.fit(
+            train_loader,
+            val_loader,
+            epochs=3,
+            patience=patience,
+            on_improve=lambda *args: None,
+            checkpoint_path=checkpoint_path,
+            resume=resume,
+            fingerprint=fingerprint or {"toy": 1},
+        )
+        return model, dict(result, batches=len(calls))
+
+    def test_resume_mid_epoch_matches_uninterrupted_run(self):
+        data = torch.randn(23, 6, generator=torch.Generator().manual_seed(2))
+
+        def batched():
+            train = DataLoader(data, sampler=MemmapBatchSampler(23, 4, shuffle=True), batch_size=None)
+            val = DataLoader(data, sampler=MemmapBatchSampler(23, 4, shuffle=False), batch_size=None)
+            return train, val
+
+        def item():
+            return DataLoader(data, batch_size=4, shuffle=True), DataLoader(data, batch_size=4)
+
+        for name, loaders in (("batch sampler", batched), ("item loader", item)):
+            with self.subTest(loader=name), tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "toy.pt.resume.pt")
+                with mock.patch.dict(CONFIG, {"train_checkpoint_every_batches": 2}):
+                    reference, expected = self._fit_toy(path, loaders)
+                    # 6 train + 6 val batches per epoch: call 16 is epoch 2, batch 4.
+                    with self.assertRaises(KeyboardInterrupt):
+                        self._fit_toy(path, loaders, kill_at=16)
+                    self.assertEqual(torch.load(path, weights_only=False)["batch_cursor"], 2)
+                    resumed, result = self._fit_toy(path, loaders, resume=True)
+                for left, right in zip(reference.parameters(), resumed.parameters()):
+                    torch.testing.assert_close(left, right, rtol=0, atol=0)
+                self.assertEqual(result["best_val"], expected["best_val"])
+                self.assertEqual(result["epochs_run"], 3)
+                # Only the rest of epoch 2 (4 train + 6 val) and epoch 3 ran.
+                self.assertEqual((expected["batches"], result["batches"]), (36, 22))
+
+    def test_resume_ignores_other_configs_and_finished_runs(self):
+        data = torch.randn(8, 6, generator=torch.Generator().manual_seed(3))
+
+        def loaders():
+            return DataLoader(data, batch_size=4), DataLoader(data, batch_size=4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "toy.pt.resume.pt")
+            _, first = self._fit_toy(path, loaders)
+            # Every epoch is complete, so resuming trains nothing more.
+            _, again = self._fit_toy(path, loaders, resume=True)
+            self.assertEqual((len(again["history"]), again["batches"]), (3, 0))
+            self.assertEqual(again["best_val"], first["best_val"])
+            _, fresh = self._fit_toy(path, loaders, resume=True, fingerprint={"toy": 2})
+            self.assertEqual([row["epoch"] for row in fresh["history"]], [1, 2, 3])
+            with mock.patch.object(AutoencoderTrainer, "run_epoch", side_effect=AssertionError("trained")):
+                state = torch.load(path, weights_only=False)
+                state.update(stopped_early=True, epoch=2)
+                torch.save(state, path)
+                _, stopped = self._fit_toy(path, loaders, resume=True, fingerprint={"toy": 2})
+            self.assertEqual(stopped["best_epoch"], fresh["best_epoch"])
+
+    def test_resume_data_fingerprint_tracks_preprocessing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = _write_ims_files(tmp, 7)
+            out_dir = os.path.join(tmp, "out")
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, _toy_config(out_dir)):
+                run_ingest(files[:5])
+                first = resume_data_fingerprint()
+                run_ingest(files[:5])
+                self.assertEqual(resume_data_fingerprint(), first)
+                # Appended windows keep the scaler but change the data.
+                run_ingest(files, mode="append")
+                appended = resume_data_fingerprint()
+                self.assertNotEqual(appended["split_sequence_counts"], first["split_sequence_counts"])
+                self.assertEqual(appended["scaler"], first["scaler"])
+                # Rebuilding from other snapshots refits the scaler.
+                other = os.path.join(tmp, "other")
+                os.makedirs(other)
+                run_ingest(_write_ims_files(other, 5, seed=1))
+                rebuilt = resume_data_fingerprint()
+                self.assertEqual(rebuilt["split_sequence_counts"], first["split_sequence_counts"])
+                self.assertNotEqual(rebuilt["scaler"], first["scaler"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.config import CONFIG
+from src.dataset import load_memmap_dataset
+from src.preprocessing import run_ingest
+from src.virtual_windows import VirtualWindowDataset
+
+
+def _layout_config(tmp, layout):
+    return {
+        "sequence_length": 8,
+        "stride": 3,
+        "healthy_files": 3,
+        "healthy_train_files": 2,
+        "healthy_val_files": 1,
+        "num_files_to_process": 5,
+        "dataset_layout": layout,
+        "use_raw_cache": False,
+        "processed_folder": tmp,
+        "memmap_file": os.path.join(tmp, "all.dat"),
+        "healthy_train_memmap_file": os.path.join(tmp, "train.dat"),
+        "healthy_val_memmap_file": os.path.join(tmp, "val.dat"),
+        "split_metadata_file": os.path.join(tmp, "split_metadata.json"),
+        "scaler_file": os.path.join(tmp, "global_scaler.save"),
+    }
+
+
+class TestVirtualWindowDataset(unittest.TestCase):
+    """The virtual layout must serve exactly the dense layout's windows."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        tmp = cls._tmp.name
+        rng = np.random.default_rng(11)
+        files = []
+        for idx in range(6):
+            path = os.path.join(tmp, f"2003.10.22.12.{idx:02d}.00")
+            # Ragged lengths so file boundaries and trailing samples differ.
+            np.savetxt(path, rng.normal(size=(20 + 3 * idx, 2)), fmt="%.3f", delimiter="\t")
+            files.append(path)
+        cls.loaded = {}
+        for layout in ("dense", "virtual"):
+            out_dir = os.path.join(tmp, layout)
+            os.makedirs(out_dir)
+            with mock.patch.dict(CONFIG, _layout_config(out_dir, layout)):
+                run_ingest(files)
+                cls.loaded[layout] = {
+                    split: (
+                        load_memmap_dataset(flatten_for_tree=False, split=split),
+                        load_memmap_dataset(flatten_for_tree=True, split=split),
+                    )
+                    for split in ("all", "healthy_train", "healthy_val")
+                }
+                cls.sizes = getattr(cls, "sizes", {})
+                cls.sizes[layout] = os.path.getsize(os.path.join(out_dir, "all.dat"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_all_access_patterns_match_dense(self):
+        for split in ("all", "healthy_train", "healthy_val"):
+            (dense, dense_flat), (virtual, virtual_flat) = self.loaded["dense"][split], self.loaded["virtual"][split]
+            with self.subTest(split=split):
+                self.assertIsInstance(virtual, VirtualWindowDataset)
+                self.assertEqual(virtual.shape, dense.shape)
+                self.assertEqual(virtual_flat.shape, dense_flat.shape)
+                np.testing.assert_array_equal(np.asarray(virtual), dense)
+                n = dense.shape[0]
+                np.testing.assert_array_equal(virtual[n - 1], dense[n - 1])
+                np.testing.assert_array_equal(virtual[-2], dense[-2])
+                np.testing.assert_array_equal(virtual[1 : n - 1], dense[1 : n - 1])
+                np.testing.assert_array_equal(virtual[::4], dense[::4])
+                idx = np.array([n - 1, 0, 3, 3])
+                np.testing.assert_array_equal(virtual[idx], dense[idx])
+                np.testing.assert_array_equal(virtual_flat[2:n], dense_flat[2:n])
+                np.testing.assert_array_equal(virtual_flat[idx], dense_flat[idx])
+
+    def test_virtual_storage_is_smaller(self):
+        self.assertLess(self.sizes["virtual"] * 2, self.sizes["dense"])
+
+
+if __name__ == "__main__":
+    unittest.main()
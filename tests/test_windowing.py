@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.windowing import count_sequences, window_view, write_windows
+
+
+def _loop_windows(signal, seq_length, stride):
+    """Reference implementation matching the original Python loop."""
+    return np.array(
+        [signal[i : i + seq_length] for i in range(0, len(signal) - seq_length + 1, stride)],
+        dtype=np.float32,
+    )
+
+
+class TestWindowing(unittest.TestCase):
+    """Strided windowing must stay bit-identical to the loop it replaced."""
+
+    def test_view_matches_loop_reference(self):
+        rng = np.random.default_rng(3)
+        for length, seq_length, stride, channels in [(103, 10, 5, 1), (64, 8, 1, 2), (40, 40, 3, 1), (57, 9, 4, 3)]:
+            signal = rng.normal(size=(length, channels)).astype(np.float32)
+            with self.subTest(length=length, seq_length=seq_length, stride=stride):
+                view = window_view(signal, seq_length, stride)
+                self.assertEqual(view.shape[0], count_sequences(length, seq_length, stride))
+                np.testing.assert_array_equal(view, _loop_windows(signal, seq_length, stride))
+                self.assertFalse(view.flags.writeable)
+                self.assertTrue(np.shares_memory(view, signal))
+
+    def test_short_signal_yields_no_windows(self):
+        view = window_view(np.zeros((3, 1), dtype=np.float32), seq_length=4, stride=1)
+        self.assertEqual(view.shape, (0, 4, 1))
+
+    def test_write_windows_into_memmap_slice(self):
+        signal = np.arange(20, dtype=np.float32).reshape(-1, 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = np.memmap(os.path.join(tmp, "w.dat"), dtype="float32", mode="w+", shape=(10, 4, 1))
+            written = write_windows(signal, 4, 3, out[2:8])
+            self.assertEqual(written, 6)
+            np.testing.assert_array_equal(out[2:8], _loop_windows(signal, 4, 3))
+            self.assertFalse(out[:2].any())
+            with self.assertRaises(ValueError):
+                write_windows(signal, 4, 3, out[:5])
+
+
+if __name__ == "__main__":
+    unittest.main()